@@ -1,28 +1,83 @@
-import requests
+from time import perf_counter
+from typing import Optional
+
+import httpx
 from pybreaker import CircuitBreakerError
 
 from app.core.http_circuit_breaker import HttpCircuitBreaker
 from app.core.logger import Logger
+from app.core.metrics import UPSTREAM_LATENCY
 from app.core.settings import Settings
 from app.schemas.currency_conversion_rates_schema import \
     CurrencyConversionRatesSchema
 
 
 class ExchangeRatesApiClient:
+    _http_client: Optional[httpx.AsyncClient] = None
+    _transport: Optional[httpx.AsyncHTTPTransport] = None
+
     def __init__(self):
         self.__api_url = Settings.API_URL
         self.__access_key = Settings.API_ACCESS_KEY
 
-    def fetch_all_conversion_rates(self) -> CurrencyConversionRatesSchema:
+    @classmethod
+    def get_http_client(cls) -> httpx.AsyncClient:
+        if cls._http_client is None:
+            cls._transport = httpx.AsyncHTTPTransport(
+                retries=Settings.API_RETRIES,
+                limits=httpx.Limits(
+                    max_connections=Settings.API_MAX_CONNECTIONS,
+                    max_keepalive_connections=Settings.API_MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=Settings.API_KEEPALIVE_EXPIRY_SECONDS
+                )
+            )
+            cls._http_client = httpx.AsyncClient(
+                transport=cls._transport,
+                timeout=Settings.API_TIMEOUT_SECONDS
+            )
+        return cls._http_client
+
+    @classmethod
+    def pool_stats(cls) -> dict[str, int]:
+        if cls._transport is None:
+            return {}
+
+        connections = cls._transport._pool.connections
+        idle = sum(connection.is_idle() for connection in connections)
+        return {
+            "max_connections": Settings.API_MAX_CONNECTIONS,
+            "connections": len(connections),
+            "in_use": len(connections) - idle
+        }
+
+    @classmethod
+    async def close(cls):
+        if cls._http_client is not None:
+            await cls._http_client.aclose()
+            cls._http_client = None
+            cls._transport = None
+
+    async def fetch_all_conversion_rates(
+        self
+    ) -> Optional[CurrencyConversionRatesSchema]:
         Logger.info('Start fetching all currency conversion rates')
+        start_time = perf_counter()
+        outcome = "success"
 
         try:
-            result = HttpCircuitBreaker().fetch_data(
-                self.__api_url, params={"access_key": self.__access_key}
+            result = await HttpCircuitBreaker().fetch_data(
+                self.get_http_client(),
+                self.__api_url,
+                params={"access_key": self.__access_key}
             )
             Logger.info('Successfully fetched all currency conversion rates')
             return CurrencyConversionRatesSchema(**result.json())
         except CircuitBreakerError:
+            outcome = "rejected"
             Logger.error("Exchange Rates API currently unavailable.")
-        except requests.exceptions.RequestException as e:
+        except httpx.HTTPError as e:
+            outcome = "error"
             Logger.error(f"An error occurred when fetch data: {e}")
+        finally:
+            UPSTREAM_LATENCY.labels(outcome=outcome).observe(
+                perf_counter() - start_time)
@@ -1,51 +1,276 @@
-from typing import Optional, Union
+from typing import Mapping, Optional, Union
 
-import redis
+import redis.asyncio as redis
+from redis.asyncio.lock import Lock
 
 from app.core.logger import Logger
+from app.core.metrics import CACHE_LATENCY, CACHE_LOOKUPS
 from app.core.settings import Settings
 from app.core.singleton import SingletonMeta
 
 
 class Cache(metaclass=SingletonMeta):
+    RAISE_COUNTER_SCRIPT = """
+        local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+        if current < tonumber(ARGV[1]) then
+            redis.call('SET', KEYS[1], ARGV[1])
+        end
+    """
+    TAKE_TOKEN_SCRIPT = """
+        local rate = tonumber(ARGV[1])
+        local capacity = tonumber(ARGV[2])
+        local time = redis.call('TIME')
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+        local tokens = tonumber(bucket[1]) or capacity
+        local updated = tonumber(bucket[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+        local retry_after = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+        else
+            retry_after = (1 - tokens) / rate
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+        redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+        return tostring(retry_after)
+    """
+    SET_HASH_IF_VERSION_SCRIPT = """
+        if (redis.call('HGET', KEYS[1], ARGV[1]) or '0') ~= ARGV[2] then
+            return 0
+        end
+        redis.call('HSET', KEYS[1], ARGV[1], ARGV[2], unpack(ARGV, 4))
+        redis.call('EXPIRE', KEYS[1], ARGV[3])
+        return 1
+    """
+
     def __init__(self):
         self.__host = Settings.REDIS_HOST
         self.__port = Settings.REDIS_PORT
         self.__db = Settings.REDIS_DB
 
-        pool = redis.ConnectionPool(
+        self.__pool = redis.BlockingConnectionPool(
             host=self.__host,
             port=self.__port,
-            db=self.__db
+            db=self.__db,
+            max_connections=Settings.REDIS_MAX_CONNECTIONS,
+            timeout=Settings.REDIS_POOL_TIMEOUT_SECONDS,
+            socket_timeout=Settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_connect_timeout=Settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_keepalive=True,
+            health_check_interval=Settings.REDIS_HEALTH_CHECK_INTERVAL_SECONDS
         )
-        self.__connection = redis.Redis(connection_pool=pool)
+        self.__connection = redis.Redis(connection_pool=self.__pool)
+        self.__raise_counter_script = self.__connection.register_script(
+            self.RAISE_COUNTER_SCRIPT)
+        self.__take_token_script = self.__connection.register_script(
+            self.TAKE_TOKEN_SCRIPT)
+        self.__set_hash_if_version_script = self.__connection.register_script(
+            self.SET_HASH_IF_VERSION_SCRIPT)
 
     @classmethod
     def get_cache(cls):
         return cls()
 
-    def set(
+    def pool_stats(self) -> dict[str, int]:
+        in_use = len(self.__pool._in_use_connections)
+        return {
+            "max_connections": self.__pool.max_connections,
+            "connections": in_use + len(self.__pool._available_connections),
+            "in_use": in_use
+        }
+
+    async def close(self):
+        await self.__connection.aclose(close_connection_pool=True)
+
+    async def set(
             self,
             key: str,
             value: Union[str, bytes],
             exp_seconds: Optional[int] = None
     ) -> bool:
         try:
-            self.__connection.set(name=key, value=value, ex=exp_seconds)
+            with CACHE_LATENCY.labels(operation="set").time():
+                await self.__connection.set(
+                    name=key, value=value, ex=exp_seconds)
+            return True
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+            return False
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            with CACHE_LATENCY.labels(operation="get").time():
+                value = await self.__connection.get(key)
+            self.__count_lookup("get", value is not None)
+            return value
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+            return None
+
+    async def delete(self, key: str) -> bool:
+        try:
+            await self.__connection.delete(key)
+            return True
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+            return False
+
+    async def set_hash(
+            self,
+            key: str,
+            mapping: Mapping[str, Union[str, bytes, float]],
+            exp_seconds: Optional[int] = None
+    ) -> bool:
+        try:
+            with CACHE_LATENCY.labels(operation="set_hash").time():
+                async with self.__connection.pipeline(
+                        transaction=True) as pipe:
+                    pipe.delete(key)
+                    pipe.hset(name=key, mapping=mapping)
+                    if exp_seconds is not None:
+                        pipe.expire(name=key, time=exp_seconds)
+                    await pipe.execute()
+            return True
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+            return False
+
+    async def get_hash(self, key: str) -> dict[bytes, bytes]:
+        try:
+            with CACHE_LATENCY.labels(operation="get_hash").time():
+                values = await self.__connection.hgetall(key)
+            self.__count_lookup("get_hash", bool(values))
+            return values
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+            return {}
+
+    async def get_hash_fields(
+            self,
+            key: str,
+            *fields: str
+    ) -> list[Optional[bytes]]:
+        try:
+            with CACHE_LATENCY.labels(operation="get_hash_fields").time():
+                values = await self.__connection.hmget(key, fields)
+            self.__count_lookup(
+                "get_hash_fields", None not in values)
+            return values
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+            return [None] * len(fields)
+
+    async def set_hash_if_version(
+            self,
+            key: str,
+            version_field: str,
+            version: int,
+            mapping: Mapping[str, Union[str, bytes]],
+            exp_seconds: int
+    ) -> bool:
+        args = [version_field, version, exp_seconds]
+        for field, value in mapping.items():
+            args += [field, value]
+        try:
+            with CACHE_LATENCY.labels(operation="set_hash_if_version").time():
+                return await self.__set_hash_if_version_script(
+                    keys=[key], args=args) == 1
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+            return False
+
+    async def increment_hash_field(
+            self,
+            key: str,
+            field: str,
+            exp_seconds: int
+    ) -> Optional[int]:
+        try:
+            async with self.__connection.pipeline(transaction=True) as pipe:
+                pipe.hincrby(name=key, key=field, amount=1)
+                pipe.expire(name=key, time=exp_seconds)
+                value, _ = await pipe.execute()
+            return value
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+            return None
+
+    async def push_list(self, key: str, values: list[Union[str, bytes]]) -> bool:
+        try:
+            await self.__connection.rpush(key, *values)
             return True
         except redis.RedisError as e:
             Logger.error(f"Redis error: {e}")
             return False
 
-    def get(self, key: str) -> Optional[bytes]:
+    async def pop_list(self, key: str, count: int) -> list[bytes]:
+        try:
+            return await self.__connection.lpop(key, count) or []
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+            return []
+
+    async def increment(self, key: str, amount: int = 1) -> Optional[int]:
         try:
-            return self.__connection.get(key)
+            return await self.__connection.incrby(name=key, amount=amount)
         except redis.RedisError as e:
             Logger.error(f"Redis error: {e}")
             return None
 
-    def flush_all(self):
+    async def raise_counter(self, key: str, minimum: int) -> bool:
         try:
-            return self.__connection.flushall()
+            await self.__raise_counter_script(keys=[key], args=[minimum])
+            return True
         except redis.RedisError as e:
             Logger.error(f"Redis error: {e}")
+            return False
+
+    async def take_token(
+            self,
+            key: str,
+            rate: float,
+            capacity: float
+    ) -> Optional[float]:
+        try:
+            with CACHE_LATENCY.labels(operation="take_token").time():
+                retry_after = await self.__take_token_script(
+                    keys=[key], args=[rate, capacity])
+            return float(retry_after)
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+            return None
+
+    async def acquire_lock(self, name: str, timeout_seconds: float) -> Optional[Lock]:
+        lock = self.__connection.lock(
+            name=name, timeout=timeout_seconds, blocking=False)
+        try:
+            if await lock.acquire():
+                return lock
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+        return None
+
+    async def release_lock(self, lock: Lock):
+        try:
+            await lock.release()
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+
+    async def is_locked(self, name: str) -> bool:
+        try:
+            return await self.__connection.exists(name) == 1
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+            return False
+
+    async def flush_all(self):
+        try:
+            return await self.__connection.flushall()
+        except redis.RedisError as e:
+            Logger.error(f"Redis error: {e}")
+
+    @staticmethod
+    def __count_lookup(operation: str, hit: bool):
+        CACHE_LOOKUPS.labels(
+            operation=operation, result="hit" if hit else "miss").inc()
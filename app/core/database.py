@@ -1,7 +1,12 @@
-from sqlalchemy import create_engine
+import os
+
+from sqlalchemy import Connection, event, text
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import (Session, declarative_base, scoped_session,
-                            sessionmaker)
+from sqlalchemy.ext.asyncio import (AsyncSession, async_sessionmaker,
+                                    create_async_engine)
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.logger import Logger
 from app.core.settings import Settings
@@ -11,31 +16,118 @@ Base = declarative_base()
 
 
 class Database(metaclass=SingletonMeta):
+    ASYNC_DRIVERS = {
+        "sqlite": "sqlite+aiosqlite",
+        "postgresql": "postgresql+asyncpg",
+        "postgresql+psycopg2": "postgresql+asyncpg"
+    }
+    SYNC_DRIVERS = {
+        "sqlite+aiosqlite": "sqlite",
+        "postgresql": "postgresql+psycopg2",
+        "postgresql+asyncpg": "postgresql+psycopg2"
+    }
+    ALEMBIC_CONFIG = os.path.join(
+        os.path.dirname(__file__), "..", "..", "alembic.ini")
+
     def __init__(self):
-        self.__engine = create_engine(
-            Settings.DATABASE_URL,
-            connect_args={"check_same_thread": False},
+        url = self.async_url(Settings.DATABASE_URL)
+        self.__engine = create_async_engine(
+            url,
             echo=False,
+            **self.pool_options(url)
+        )
+        if url.get_backend_name() == "sqlite" and Settings.SQLITE_TUNED:
+            event.listen(
+                self.__engine.sync_engine, "connect", self.set_sqlite_pragmas)
+        self.__session_factory = async_sessionmaker(
+            bind=self.__engine,
+            expire_on_commit=False
         )
-        self.__session_factory = sessionmaker(bind=self.__engine)
-        self.__session = scoped_session(self.__session_factory)
 
     @classmethod
     def get_database(cls):
         return cls()
 
-    def get_db_session(self):
-        db: Session = self.__session()
+    @classmethod
+    def async_url(cls, database_url: str) -> URL:
+        url = make_url(database_url)
+        return url.set(
+            drivername=cls.ASYNC_DRIVERS.get(url.drivername, url.drivername)
+        )
+
+    @classmethod
+    def sync_url(cls, database_url: str) -> URL:
+        url = make_url(database_url)
+        return url.set(
+            drivername=cls.SYNC_DRIVERS.get(url.drivername, url.drivername)
+        )
+
+    @classmethod
+    def pool_options(cls, url: URL) -> dict:
+        # In-memory SQLite keeps its single shared connection (StaticPool)
+        if url.get_backend_name() == "sqlite" and \
+                url.database in (None, "", ":memory:"):
+            return {}
+
+        # File SQLite would default to NullPool, a new connection per session
+        return {
+            "poolclass": AsyncAdaptedQueuePool,
+            "pool_size": Settings.DATABASE_POOL_SIZE,
+            "max_overflow": Settings.DATABASE_MAX_OVERFLOW,
+            "pool_timeout": Settings.DATABASE_POOL_TIMEOUT_SECONDS,
+            "pool_recycle": Settings.DATABASE_POOL_RECYCLE_SECONDS,
+            "pool_pre_ping": Settings.DATABASE_POOL_PRE_PING
+        }
+
+    @staticmethod
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers go on while a transaction commits, NORMAL only
+        # syncs at checkpoints, which is still safe in WAL mode
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={Settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={Settings.SQLITE_MMAP_SIZE_BYTES}")
+        cursor.execute(f"PRAGMA cache_size=-{Settings.SQLITE_CACHE_SIZE_KIB}")
+        cursor.execute(f"PRAGMA busy_timeout={Settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+    def pool_stats(self) -> dict[str, int]:
+        pool = self.__engine.pool
+        if not isinstance(pool, AsyncAdaptedQueuePool):
+            return {}
+
+        return {
+            "size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "connections": pool.checkedin() + pool.checkedout(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(pool.overflow(), 0)
+        }
+
+    def get_db_session(self) -> AsyncSession:
         try:
-            return db
+            return self.__session_factory()
         except SQLAlchemyError as e:
             Logger.error(f"Error on get db session: {e}")
             raise
-        finally:
-            db.close()
 
-    def init_db(self):
-        Base.metadata.create_all(self.__engine)
+    async def init_db(self):
+        async with self.__engine.begin() as connection:
+            await connection.run_sync(self.__upgrade)
+
+    async def drop_db(self):
+        async with self.__engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+            await connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+
+    def __upgrade(self, connection: Connection):
+        # Imported here, migrations are a deployment step the app rarely runs
+        from alembic import command
+        from alembic.config import Config
+
+        config = Config(self.ALEMBIC_CONFIG)
+        config.attributes["connection"] = connection
+        command.upgrade(config, "head")
 
-    def drop_db(self):
-        Base.metadata.drop_all(self.__engine)
+    async def close(self):
+        await self.__engine.dispose()
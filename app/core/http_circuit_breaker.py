@@ -1,14 +1,31 @@
-import requests
-from pybreaker import CircuitBreaker
+import httpx
+from pybreaker import STATE_OPEN, CircuitBreaker
+
+from app.core.metrics import CircuitBreakerStateListener
 
 
 class HttpCircuitBreaker:
+    _breaker = CircuitBreaker(
+        fail_max=3,
+        reset_timeout=10,
+        listeners=[CircuitBreakerStateListener("exchange_rates_api")]
+    )
+
     def __init__(self, fail_max: int = 5, reset_timeout: int = 60):
         self.fail_max = fail_max
         self.reset_timeout = reset_timeout
 
-    @CircuitBreaker(fail_max=3, reset_timeout=10)
-    def fetch_data(self, url, params: dict):  # pragma: no cover
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        return response
+    @classmethod
+    def is_open(cls) -> bool:
+        return cls._breaker.current_state == STATE_OPEN
+
+    async def fetch_data(
+        self,
+        client: httpx.AsyncClient,
+        url: str,
+        params: dict
+    ) -> httpx.Response:  # pragma: no cover
+        with self._breaker.calling():
+            response = await client.get(url, params=params)
+            response.raise_for_status()
+            return response
@@ -0,0 +1,52 @@
+import asyncio
+
+from app.core.cache import Cache
+from app.exceptions.transaction_ids_unavailable_exception import \
+    TransactionIdsUnavailableException
+
+
+class IdAllocator:
+    """Hands out unique ids from blocks reserved on a shared Redis counter.
+
+    Each `INCRBY` reserves `block_size` ids for this process only, so most
+    allocations never leave memory. The counter is kept above `floor` (the
+    highest id known to be taken) in case Redis lost it.
+    """
+
+    def __init__(self, cache: Cache, key: str, block_size: int):
+        self.__cache = cache
+        self.__key = key
+        self.__block_size = block_size
+        self.__floor = 0
+        self.__next_id = 1
+        self.__last_id = 0
+        self.__reserve_lock = asyncio.Lock()
+
+    async def raise_floor(self, floor: int):
+        self.__floor = max(self.__floor, floor)
+        if not await self.__cache.raise_counter(self.__key, self.__floor):
+            raise TransactionIdsUnavailableException()
+
+    async def allocate(self) -> int:
+        if self.__next_id > self.__last_id:
+            async with self.__reserve_lock:
+                if self.__next_id > self.__last_id:
+                    await self.__reserve_block()
+
+        allocated_id = self.__next_id
+        self.__next_id += 1
+        return allocated_id
+
+    async def __reserve_block(self):
+        last_id = await self.__cache.increment(self.__key, self.__block_size)
+        if last_id is not None and last_id - self.__block_size < self.__floor:
+            await self.raise_floor(self.__floor)
+            last_id = await self.__cache.increment(
+                self.__key, self.__block_size)
+
+        if last_id is None:
+            raise TransactionIdsUnavailableException()
+
+        self.__next_id = last_id - self.__block_size + 1
+        self.__last_id = last_id
+        self.__floor = max(self.__floor, last_id)
@@ -0,0 +1,79 @@
+import random
+from collections import deque
+from time import monotonic
+from typing import Optional
+
+from app.core.settings import Settings
+from app.core.singleton import SingletonMeta
+
+
+class LoadShedder(metaclass=SingletonMeta):
+    """Rejects requests early while this worker is overloaded.
+
+    With LOAD_SHED_MAX_IN_FLIGHT requests already in progress every new one
+    is rejected. Besides, every LOAD_SHED_EVALUATE_INTERVAL_SECONDS the p99
+    latency of the requests finished since the last evaluation is compared
+    with LOAD_SHED_P99_SECONDS: while above, the share of requests shed grows
+    by LOAD_SHED_STEP (up to LOAD_SHED_MAX_RATE), and it shrinks by as much
+    once under it again, so the worker settles at the load it can serve in
+    time. Requests released without a latency count as in flight only.
+    """
+
+    def __init__(self):
+        self.__max_in_flight = Settings.LOAD_SHED_MAX_IN_FLIGHT
+        self.__target_p99 = Settings.LOAD_SHED_P99_SECONDS
+        self.__evaluate_interval = Settings.LOAD_SHED_EVALUATE_INTERVAL_SECONDS
+        self.__step = Settings.LOAD_SHED_STEP
+        self.__max_rate = Settings.LOAD_SHED_MAX_RATE
+        self.__latencies: deque[float] = deque(
+            maxlen=Settings.LOAD_SHED_WINDOW_SIZE)
+        self.__evaluated_at = monotonic()
+        self.in_flight = 0
+        self.shed_rate = 0.0
+        self.p99 = 0.0
+        self.admitted = 0
+        self.shed = 0
+
+    @classmethod
+    def get_shedder(cls):
+        return cls()
+
+    def admit(self) -> bool:
+        self.__evaluate()
+        if self.in_flight >= self.__max_in_flight \
+                or random.random() < self.shed_rate:
+            self.shed += 1
+            return False
+
+        self.in_flight += 1
+        self.admitted += 1
+        return True
+
+    def release(self, latency_seconds: Optional[float]):
+        self.in_flight -= 1
+        if latency_seconds is not None:
+            self.__latencies.append(latency_seconds)
+
+    def __evaluate(self):
+        now = monotonic()
+        if now - self.__evaluated_at < self.__evaluate_interval:
+            return
+        self.__evaluated_at = now
+
+        latencies = sorted(self.__latencies)
+        self.__latencies.clear()
+        self.p99 = latencies[int(0.99 * (len(latencies) - 1))] \
+            if latencies else 0.0
+        if self.p99 > self.__target_p99:
+            self.shed_rate = min(self.shed_rate + self.__step, self.__max_rate)
+        else:
+            self.shed_rate = max(self.shed_rate - self.__step, 0.0)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "in_flight": self.in_flight,
+            "p99_seconds": round(self.p99, 4),
+            "shed_rate": round(self.shed_rate, 2),
+            "admitted": self.admitted,
+            "shed": self.shed
+        }
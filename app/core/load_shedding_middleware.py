@@ -0,0 +1,52 @@
+from time import perf_counter
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.load_shedder import LoadShedder
+from app.core.metrics import REQUESTS_REJECTED
+from app.core.settings import Settings
+from app.core.utils import Utils
+
+
+class LoadSheddingMiddleware:
+    """Answers 503 at once while `LoadShedder` finds the worker overloaded,
+    instead of queueing requests that would time out anyway.
+
+    Paths in `OVERLOAD_EXEMPT_PATHS`, like the healthcheck, are never shed.
+    Paths in `LOAD_SHED_UNTIMED_PATHS` are shed, but how long they take
+    depends on the caller (a streamed export, a batch of any size), so it is
+    kept out of the p99 the other requests are shed by.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.__enabled = Settings.LOAD_SHED_ENABLED
+        self.__exempt_paths = Settings.OVERLOAD_EXEMPT_PATHS
+        self.__untimed_paths = Settings.LOAD_SHED_UNTIMED_PATHS
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        path = Utils.request_path(scope) if scope["type"] == "http" else None
+        if path is None or not self.__enabled or path in self.__exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        shedder = LoadShedder()
+        if not shedder.admit():
+            REQUESTS_REJECTED.labels(reason="overloaded").inc()
+            response = JSONResponse(
+                content={"detail": "Server overloaded, retry later"},
+                status_code=503,
+                headers={"Retry-After": "1"}
+            )
+            await response(scope, receive, send)
+            return
+
+        start_time = perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            shedder.release(
+                None if path in self.__untimed_paths
+                else perf_counter() - start_time
+            )
@@ -1,25 +1,61 @@
-from time import time
+import random
+from time import perf_counter
 
-from fastapi import Request
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core.logger import Logger
-
-
-async def log_requests(request: Request, call_next):  # pragma: no cover
-    start_time = time()
-
-    method = request.method
-    url = request.url
-    headers = dict(request.headers)
-
-    Logger.info(f"Received HTTP request: {method} {url} - Headers: {headers}")
-
-    response = await call_next(request)
-    process_time = time() - start_time
-    Logger.info(
-        f"Response: {method} {url} \
-        - Status: {response.status_code} \
-        - Processing Time: {process_time:.4f}s"
-    )
-
-    return response
+from app.core.settings import Settings
+
+
+def is_sampled(path: str) -> bool:
+    rate = Settings.LOG_REQUESTS_SAMPLE_RATES.get(
+        path, Settings.LOG_REQUESTS_SAMPLE_RATE)
+    return rate >= 1 or random.random() < rate
+
+
+class LogRequestsMiddleware:
+    """Logs one structured line per HTTP request once it is answered.
+
+    A plain ASGI middleware rather than an `http` one, which would run every
+    request through an extra task group. Requests are sampled per route with
+    `LOG_REQUESTS_SAMPLE_RATES`, server errors are always logged.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.__log(scope, status_code, perf_counter() - start_time)
+
+    def __log(self, scope: Scope, status_code: int, process_time: float):
+        route = scope.get("route")
+        path = route.path if route is not None else scope["path"]
+        if status_code < 500 and not is_sampled(path):
+            return
+
+        Logger.info(
+            "Response: %s %s - Status: %s - Processing Time: %.4fs",
+            scope["method"], path, status_code, process_time,
+            method=scope["method"],
+            path=path,
+            status_code=status_code,
+            process_time=process_time,
+            user_id=Headers(scope=scope).get("user-id")
+        )
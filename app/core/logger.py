@@ -1,8 +1,6 @@
 import logging
-from multiprocessing import Queue
-
-import logging_loki
 
+from app.core.loki_handler import LokiHandler
 from app.core.settings import Settings
 from app.core.singleton import SingletonMeta
 
@@ -13,25 +11,39 @@ class Logger(metaclass=SingletonMeta):
     @classmethod
     def _initialize_logger(cls):
         if not cls._logger_initialized:
-            handler = logging_loki.LokiQueueHandler(
-                Queue(-1),
+            cls.handler = LokiHandler(
                 url=f"{Settings.LOKI_URL}/loki/api/v1/push",
-                tags={"application": "currency-converter-api-app"},
+                labels={"application": "currency-converter-api-app"},
                 auth=(Settings.LOKI_USER, Settings.LOKI_PASSWORD),
-                version="1"
+                batch_size=Settings.LOG_BATCH_SIZE,
+                flush_interval=Settings.LOG_FLUSH_INTERVAL_SECONDS,
+                buffer_size=Settings.LOG_BUFFER_SIZE
             )
 
             cls.logger = logging.getLogger()
-            cls.logger.addHandler(handler)
+            cls.logger.addHandler(cls.handler)
             cls.logger.setLevel(logging.INFO)
             cls._logger_initialized = True
 
     @classmethod
-    def info(cls, message):
+    def info(cls, message, *args, **fields):
         cls._initialize_logger()
-        cls.logger.info(message)
+        cls.logger.info(message, *args, extra={"fields": fields})
 
     @classmethod
-    def error(cls, message):
+    def error(cls, message, *args, **fields):
         cls._initialize_logger()
-        cls.logger.error(message)
+        cls.logger.error(message, *args, extra={"fields": fields})
+
+    @classmethod
+    def stats(cls) -> dict[str, int]:
+        if not cls._logger_initialized:
+            return {}
+        return cls.handler.stats()
+
+    @classmethod
+    def close(cls):
+        if cls._logger_initialized:
+            cls.logger.removeHandler(cls.handler)
+            cls.handler.close()
+            cls._logger_initialized = False
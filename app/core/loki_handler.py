@@ -0,0 +1,148 @@
+import logging
+import threading
+from collections import deque
+from typing import Optional
+
+import httpx
+import orjson
+
+
+class LokiHandler(logging.Handler):
+    """Logging handler that ships records to Loki in batches.
+
+    `emit` only appends the record to a bounded buffer, records that do not
+    fit are counted as dropped instead of blocking the caller. A background
+    thread formats and pushes the pending records once `batch_size` of them
+    are buffered or every `flush_interval` seconds. Each record becomes one
+    JSON line with its message and the structured fields passed to `Logger`.
+
+    Records of the HTTP client the pushes go through are ignored, otherwise
+    every push would log (and buffer) one more record to push.
+    """
+
+    IGNORED_LOGGERS = ("httpx", "httpcore")
+
+    def __init__(
+        self,
+        url: str,
+        labels: dict[str, str],
+        auth: tuple[str, str],
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        buffer_size: int = 10000,
+        transport: Optional[httpx.BaseTransport] = None
+    ):
+        super().__init__()
+        self.__url = url
+        self.__labels = labels
+        self.__batch_size = batch_size
+        self.__flush_interval = flush_interval
+        self.__buffer_size = buffer_size
+        self.__buffer = deque()
+        self.__flush_lock = threading.Lock()
+        self.__wake_up = threading.Event()
+        self.__closed = threading.Event()
+        self.__auth = auth
+        self.__transport = transport
+        self.__client: Optional[httpx.Client] = None
+        self.__thread = threading.Thread(
+            target=self.__run, name="loki-handler", daemon=True)
+        self.__thread.start()
+        self.pushed = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def emit(self, record: logging.LogRecord):
+        if record.name.split(".", 1)[0] in self.IGNORED_LOGGERS:
+            return
+
+        if len(self.__buffer) >= self.__buffer_size:
+            self.dropped += 1
+            return
+
+        self.__buffer.append(record)
+        if len(self.__buffer) >= self.__batch_size:
+            self.__wake_up.set()
+
+    def flush(self):
+        with self.__flush_lock:
+            # Only the records buffered so far, the ones logged meanwhile are
+            # left to the next flush
+            pending = len(self.__buffer)
+            while pending > 0:
+                batch = [
+                    self.__buffer.popleft()
+                    for _ in range(min(self.__batch_size, pending))
+                ]
+                pending -= len(batch)
+                self.__push(batch)
+
+    def close(self):
+        if not self.__closed.is_set():
+            self.__closed.set()
+            self.__wake_up.set()
+            self.__thread.join(timeout=self.__flush_interval + 5)
+            self.flush()
+            if self.__client is not None:
+                self.__client.close()
+        super().close()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self.__buffer),
+            "pushed": self.pushed,
+            "dropped": self.dropped,
+            "failed": self.failed
+        }
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = {"message": record.getMessage(), "logger": record.name}
+        line |= getattr(record, "fields", None) or {}
+        if record.exc_info:
+            line["exception"] = logging.Formatter().formatException(
+                record.exc_info)
+
+        return orjson.dumps(line, default=str).decode()
+
+    def __run(self):
+        while not self.__closed.is_set():
+            self.__wake_up.wait(self.__flush_interval)
+            self.__wake_up.clear()
+            self.flush()
+
+    def __push(self, batch: list[logging.LogRecord]):
+        streams: dict[str, list[list[str]]] = {}
+        for record in batch:
+            try:
+                line = self.format(record)
+            except (TypeError, ValueError):
+                self.failed += 1
+                continue
+            streams.setdefault(record.levelname.lower(), []).append(
+                [str(int(record.created * 1e9)), line])
+        if not streams:
+            return
+
+        size = sum(len(values) for values in streams.values())
+        payload = {
+            "streams": [
+                {"stream": self.__labels | {"severity": severity},
+                 "values": values}
+                for severity, values in streams.items()
+            ]
+        }
+        if self.__client is None:
+            # Built on the first push, off the thread that logged
+            self.__client = httpx.Client(
+                auth=self.__auth, timeout=5, transport=self.__transport)
+
+        try:
+            response = self.__client.post(
+                self.__url,
+                content=orjson.dumps(payload),
+                headers={"Content-Type": "application/json"}
+            )
+            response.raise_for_status()
+            self.pushed += size
+        except httpx.HTTPError:
+            self.failed += size
@@ -0,0 +1,79 @@
+import os
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from pybreaker import (STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN,
+                       CircuitBreaker, CircuitBreakerListener)
+
+# Metrics are process local unless PROMETHEUS_MULTIPROC_DIR is set before the
+# workers start, then every worker writes its samples to that directory and
+# `/metrics` aggregates them, whichever worker answers the scrape.
+
+FAST_BUCKETS = (
+    .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, float("inf"))
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency per route",
+    ["method", "route", "status_code"]
+)
+CACHE_LATENCY = Histogram(
+    "cache_operation_duration_seconds",
+    "Redis cache operation latency",
+    ["operation"],
+    buckets=FAST_BUCKETS
+)
+CACHE_LOOKUPS = Counter(
+    "cache_lookups_total",
+    "Redis cache reads, by hit or miss",
+    ["operation", "result"]
+)
+UPSTREAM_LATENCY = Histogram(
+    "upstream_request_duration_seconds",
+    "Exchange Rates API fetch latency",
+    ["outcome"]
+)
+CIRCUIT_BREAKER_STATE = Gauge(
+    "circuit_breaker_state",
+    "Circuit breaker state, 0 closed, 1 half-open and 2 open",
+    ["name"],
+    multiprocess_mode="livemax"
+)
+DB_COMMIT_LATENCY = Histogram(
+    "db_commit_duration_seconds",
+    "Latency of the database write statements and their commit",
+    ["operation"],
+    buckets=FAST_BUCKETS
+)
+REQUESTS_REJECTED = Counter(
+    "http_requests_rejected_total",
+    "HTTP requests rejected before reaching a route, by reason",
+    ["reason"]
+)
+CONVERSIONS_WRITE_FAILURES = Counter(
+    "conversions_write_failures_total",
+    "Write-behind conversions not flushed after every retry, by outcome",
+    ["outcome"]
+)
+
+BREAKER_STATES = {STATE_CLOSED: 0, STATE_HALF_OPEN: 1, STATE_OPEN: 2}
+
+
+class CircuitBreakerStateListener(CircuitBreakerListener):
+    def __init__(self, name: str):
+        self.__state = CIRCUIT_BREAKER_STATE.labels(name=name)
+        self.__state.set(0)
+
+    def state_change(self, breaker: CircuitBreaker, old_state, new_state):
+        self.__state.set(BREAKER_STATES[new_state.name])
+
+
+def render_metrics() -> tuple[bytes, str]:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return generate_latest(registry), CONTENT_TYPE_LATEST
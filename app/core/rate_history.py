@@ -0,0 +1,129 @@
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from datetime import date
+from time import monotonic
+from typing import Awaitable, Callable, Mapping, Optional, Sequence
+
+import numpy as np
+
+from app.core.single_flight import SingleFlight
+from app.core.singleton import SingletonMeta
+
+
+@dataclass(frozen=True)
+class HistoricalRates:
+    """Immutable EUR based conversion rates published for one date.
+
+    Attributes:
+    date -- date the rates were published for
+    base -- base currency of the rates
+    version -- upstream `date`/`timestamp` the rates were published with
+    codes -- read-only mapping of currency code to its index in `rates`
+    rates -- read-only array of the rates, in the order of `codes`
+    """
+    date: date
+    base: str
+    version: str
+    codes: Mapping[str, int] = field(compare=False, repr=False)
+    rates: np.ndarray = field(compare=False, repr=False)
+
+    @classmethod
+    def unpack(
+        cls,
+        rates_date: date,
+        base: str,
+        version: str,
+        codes: Mapping[str, int],
+        packed_rates: bytes
+    ) -> "HistoricalRates":
+        return cls(
+            date=rates_date,
+            base=base,
+            version=version,
+            codes=codes,
+            rates=np.frombuffer(packed_rates, dtype="<f8")
+        )
+
+    @staticmethod
+    def pack(rates: Sequence[float]) -> bytes:
+        return np.asarray(rates, dtype="<f8").tobytes()
+
+    def cross_rate(self, source_code: str, target_code: str) -> float:
+        return float(
+            self.rates[self.codes[target_code]]
+            / self.rates[self.codes[source_code]])
+
+
+class RateHistoryStore(metaclass=SingletonMeta):
+    """Per worker copy of the historical rates, ordered by date.
+
+    Only lookups reaching the latest date held need a sync with the database,
+    at most every `sync_interval` seconds, as the rates of older dates do not
+    change any more.
+    """
+    SYNC_KEY = "rate-history"
+
+    def __init__(self):
+        self.__sync_flight: SingleFlight[None] = SingleFlight()
+        self.__synced_at = float("-inf")
+        self.__dates: list[date] = []
+        self.__history: list[HistoricalRates] = []
+        self.__codes: dict[tuple[str, ...], Mapping[str, int]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.syncs = 0
+
+    @classmethod
+    def get_store(cls):
+        return cls()
+
+    @property
+    def latest_date(self) -> Optional[date]:
+        return self.__dates[-1] if self.__dates else None
+
+    def codes_of(self, codes: Sequence[str]) -> Mapping[str, int]:
+        # Dates listing the same currencies share one index mapping
+        key = tuple(codes)
+        if key not in self.__codes:
+            self.__codes[key] = {code: index for index, code in enumerate(key)}
+        return self.__codes[key]
+
+    def needs_sync(self, as_of: date, sync_interval: float) -> bool:
+        latest_date = self.latest_date
+        return (latest_date is None or as_of >= latest_date) \
+            and monotonic() - self.__synced_at >= sync_interval
+
+    async def sync(self, load: Callable[[], Awaitable[None]]):
+        _, shared = await self.__sync_flight.do(self.SYNC_KEY, load)
+        if not shared:
+            self.__synced_at = monotonic()
+            self.syncs += 1
+
+    def add(self, historical_rates: HistoricalRates):
+        index = bisect_left(self.__dates, historical_rates.date)
+        if index < len(self.__dates) \
+                and self.__dates[index] == historical_rates.date:
+            self.__history[index] = historical_rates
+            return
+
+        self.__dates.insert(index, historical_rates.date)
+        self.__history.insert(index, historical_rates)
+
+    def get_rates_on(self, as_of: date) -> Optional[HistoricalRates]:
+        index = bisect_right(self.__dates, as_of)
+        if index == 0:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return self.__history[index - 1]
+
+    def stats(self) -> dict[str, int | str | None]:
+        return {
+            "dates": len(self.__dates),
+            "first_date": str(self.__dates[0]) if self.__dates else None,
+            "latest_date": str(self.latest_date) if self.__dates else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "syncs": self.syncs
+        }
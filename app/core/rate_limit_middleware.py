@@ -0,0 +1,52 @@
+from math import ceil
+
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.cache import Cache
+from app.core.metrics import REQUESTS_REJECTED
+from app.core.rate_limiter import RateLimiter
+from app.core.settings import Settings
+from app.core.utils import Utils
+
+
+class RateLimitMiddleware:
+    """Answers 429 to the requests of a `user_id` over its rate limit, so a
+    single user can not take over the workers.
+
+    Requests without the header are limited by client address, the one
+    forwarded by the proxies in gunicorn's `forwarded_allow_ips` when behind
+    one. Paths in `OVERLOAD_EXEMPT_PATHS` are not limited.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.__enabled = Settings.RATE_LIMIT_ENABLED
+        self.__exempt_paths = Settings.OVERLOAD_EXEMPT_PATHS
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.__enabled \
+                or Utils.request_path(scope) in self.__exempt_paths:
+            await self.app(scope, receive, send)
+            return
+
+        user_id = Headers(scope=scope).get("user-id")
+        if user_id:
+            key = f"user:{user_id}"
+        else:
+            client = scope.get("client")
+            key = f"client:{client[0] if client else 'unknown'}"
+
+        retry_after = await RateLimiter().acquire(Cache(), key)
+        if retry_after:
+            REQUESTS_REJECTED.labels(reason="rate_limited").inc()
+            response = JSONResponse(
+                content={"detail": "Rate limit exceeded"},
+                status_code=429,
+                headers={"Retry-After": str(ceil(retry_after))}
+            )
+            await response(scope, receive, send)
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Optional
+
+from app.core.cache import Cache
+from app.core.settings import Settings
+from app.core.singleton import SingletonMeta
+
+
+class TokenBuckets:
+    """Token buckets per key, refilled at `rate` tokens per second up to
+    `capacity`. Only the `max_keys` most recently used keys are kept, a key
+    evicted starts again with a full bucket."""
+
+    def __init__(self, rate: float, capacity: float, max_keys: int):
+        self.__rate = rate
+        self.__capacity = capacity
+        self.__max_keys = max_keys
+        self.__buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__buckets)
+
+    def take(self, key: str, now: Optional[float] = None) -> float:
+        """Returns 0 when a token was taken, otherwise the seconds until the
+        next one is available."""
+        now = monotonic() if now is None else now
+        tokens, updated = self.__buckets.pop(key, (self.__capacity, now))
+        tokens = min(self.__capacity,
+                     tokens + max(0.0, now - updated) * self.__rate)
+
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / self.__rate
+
+        self.__buckets[key] = (tokens, now)
+        if len(self.__buckets) > self.__max_keys:
+            self.__buckets.popitem(last=False)
+        return retry_after
+
+
+class RateLimiter(metaclass=SingletonMeta):
+    """Limits the requests of each key to RATE_LIMIT_PER_SECOND, with bursts
+    of up to RATE_LIMIT_BURST.
+
+    The limit is global: tokens are taken from a bucket in Redis, updated by
+    a Lua script so workers can not race on it. A bucket per worker with the
+    same limit is checked first, so a key already over it in this worker is
+    rejected without a round trip, and it is the only check while Redis is
+    unavailable.
+    """
+
+    def __init__(self):
+        self.__rate = Settings.RATE_LIMIT_PER_SECOND
+        self.__capacity = Settings.RATE_LIMIT_BURST
+        self.__key_prefix = Settings.RATE_LIMIT_KEY_PREFIX
+        self.__local_buckets = TokenBuckets(
+            self.__rate, self.__capacity, Settings.RATE_LIMIT_MAX_LOCAL_KEYS)
+        self.allowed = 0
+        self.limited = 0
+        self.local_limited = 0
+        self.local_fallbacks = 0
+
+    @classmethod
+    def get_limiter(cls):
+        return cls()
+
+    async def acquire(self, cache: Cache, key: str) -> float:
+        """Returns 0 when the request is allowed, otherwise the seconds to
+        wait before retrying."""
+        retry_after = self.__local_buckets.take(key)
+        if retry_after:
+            self.local_limited += 1
+        else:
+            retry_after = await cache.take_token(
+                f"{self.__key_prefix}:{key}", self.__rate, self.__capacity)
+            if retry_after is None:
+                self.local_fallbacks += 1
+                retry_after = 0.0
+
+        if retry_after:
+            self.limited += 1
+        else:
+            self.allowed += 1
+        return retry_after
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "keys": len(self.__local_buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "local_limited": self.local_limited,
+            "local_fallbacks": self.local_fallbacks
+        }
@@ -0,0 +1,186 @@
+from dataclasses import dataclass, field, replace
+from math import isnan
+from time import monotonic
+from types import MappingProxyType
+from typing import Awaitable, Callable, Iterable, Mapping, Optional
+
+import numpy as np
+
+from app.core.single_flight import SingleFlight
+from app.core.singleton import SingletonMeta
+from app.schemas.currency_conversion_rates_schema import \
+    CurrencyConversionRatesSchema
+
+
+@dataclass(frozen=True)
+class RateTable:
+    """Immutable snapshot of all EUR based conversion rates.
+
+    Attributes:
+    version -- upstream `date`/`timestamp` the rates were published with
+    base -- base currency of the rates
+    rates -- read-only mapping of currency code to rate
+    expires_at -- monotonic time after which the snapshot must be revalidated
+    codes -- read-only mapping of currency code to its index in the matrix
+    cross_rates -- read-only matrix where `cross_rates[i, j]` converts one
+        unit of the i-th currency to the j-th, NaN when either rate is unusable
+    """
+    version: str
+    base: str
+    rates: Mapping[str, float]
+    expires_at: float
+    codes: Mapping[str, int] = field(compare=False, repr=False)
+    cross_rates: np.ndarray = field(compare=False, repr=False)
+
+    @classmethod
+    def from_schema(
+        cls,
+        conversion_rates: CurrencyConversionRatesSchema,
+        ttl_seconds: int
+    ) -> "RateTable":
+        rates = dict(conversion_rates.rates)
+        return cls(
+            version=cls.version_of(conversion_rates),
+            base=conversion_rates.base,
+            rates=MappingProxyType(rates),
+            expires_at=monotonic() + ttl_seconds,
+            codes=MappingProxyType(
+                {code: index for index, code in enumerate(rates)}),
+            cross_rates=cls.cross_rates_of(rates.values())
+        )
+
+    @staticmethod
+    def cross_rates_of(rates: Iterable[float]) -> np.ndarray:
+        base_rates = np.fromiter(rates, dtype=np.float64)
+        base_rates[~(np.isfinite(base_rates) & (base_rates > 0))] = np.nan
+        cross_rates = base_rates[np.newaxis, :] / base_rates[:, np.newaxis]
+        cross_rates.flags.writeable = False
+        return cross_rates
+
+    @staticmethod
+    def version_of(conversion_rates: CurrencyConversionRatesSchema) -> str:
+        return f"{conversion_rates.date}:{conversion_rates.timestamp}"
+
+    def cross_rate(self, source_code: str, target_code: str) -> float:
+        return float(
+            self.cross_rates[self.codes[source_code], self.codes[target_code]])
+
+    def cross_rates_between(
+        self,
+        currency_pairs: Iterable[tuple[str, str]]
+    ) -> np.ndarray:
+        indexes = np.array(
+            [(self.codes[source], self.codes[target])
+             for source, target in currency_pairs],
+            dtype=np.intp
+        ).reshape(-1, 2)
+        return self.cross_rates[indexes[:, 0], indexes[:, 1]]
+
+    def cross_rates_from(self, base_code: str) -> dict[str, float]:
+        return {
+            code: rate for code, rate in zip(
+                self.codes, self.cross_rates[self.codes[base_code]].tolist())
+            if not isnan(rate)
+        }
+
+    def is_expired(self) -> bool:
+        return monotonic() >= self.expires_at
+
+    def staleness(self) -> float:
+        return max(monotonic() - self.expires_at, 0.0)
+
+    def renewed(self, ttl_seconds: int) -> "RateTable":
+        return replace(self, expires_at=monotonic() + ttl_seconds)
+
+
+class RateTableStore(metaclass=SingletonMeta):
+    """Per worker holder of the current `RateTable` snapshot."""
+    REFRESH_KEY = "rate-table"
+
+    def __init__(self):
+        self.__table: Optional[RateTable] = None
+        self.__refresh_flight: SingleFlight[RateTable] = SingleFlight()
+        self.__refresh_trigger: Optional[Callable[[], None]] = None
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.refreshes = 0
+        self.revalidations = 0
+        self.coalesced = 0
+
+    @classmethod
+    def get_store(cls):
+        return cls()
+
+    @property
+    def table(self) -> Optional[RateTable]:
+        return self.__table
+
+    def get_fresh_table(self) -> Optional[RateTable]:
+        table = self.__table
+        if table is None or table.is_expired():
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return table
+
+    def get_stale_table(
+        self,
+        max_staleness_seconds: float
+    ) -> Optional[RateTable]:
+        table = self.__table
+        if table is None or table.staleness() > max_staleness_seconds:
+            return None
+        return table
+
+    def serve_stale(self, table: RateTable) -> RateTable:
+        self.stale_hits += 1
+        return table
+
+    @property
+    def is_refreshing(self) -> bool:
+        return self.__refresh_flight.in_flight(self.REFRESH_KEY)
+
+    def set_refresh_trigger(self, trigger: Optional[Callable[[], None]]):
+        self.__refresh_trigger = trigger
+
+    def request_refresh(self) -> bool:
+        trigger = self.__refresh_trigger
+        if trigger is None:
+            return False
+        trigger()
+        return True
+
+    def publish(self, table: RateTable) -> RateTable:
+        self.__table = table
+        self.refreshes += 1
+        return table
+
+    def renew(self, ttl_seconds: int) -> RateTable:
+        self.__table = self.__table.renewed(ttl_seconds)
+        self.revalidations += 1
+        return self.__table
+
+    async def refresh(
+        self,
+        load: Callable[[], Awaitable[RateTable]]
+    ) -> RateTable:
+        rate_table, shared = await self.__refresh_flight.do(
+            self.REFRESH_KEY, load)
+        if shared:
+            self.coalesced += 1
+        return rate_table
+
+    def stats(self) -> dict[str, int | str | None]:
+        table = self.__table
+        return {
+            "version": table.version if table else None,
+            "currencies": len(table.rates) if table else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale_hits": self.stale_hits,
+            "refreshes": self.refreshes,
+            "revalidations": self.revalidations,
+            "coalesced": self.coalesced
+        }
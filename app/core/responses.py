@@ -0,0 +1,15 @@
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    Datetimes are written in the same ISO 8601 format pydantic uses, so the
+    payload matches the one of a validated `response_model`.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
@@ -1,30 +1,229 @@
 import os
+import threading
+
+from dotenv import load_dotenv
 
 from app.core.singleton import SingletonMeta
 
 
-class Settings(metaclass=SingletonMeta):
-    # Database Settings
-    DATABASE_URL = os.getenv("DATABASE_URL")
-    if not DATABASE_URL:
-        raise ValueError("Database environment variable not set")
-
-    # Redis Settings
-    REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
-    REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
-    REDIS_DB = os.getenv("REDIS_DB", "0")
-    CACHE_RATE_KEY_PREFIX = 'eur-rate-'
-
-    # Exchange Rates Api Settings
-    API_URL = os.getenv("API_URL")
-    API_ACCESS_KEY = os.getenv("API_ACCESS_KEY")
-    if not all([API_URL, API_ACCESS_KEY]):
-        raise ValueError(
-            "Exchange Rates Api environment variables must be set")
-
-    # Logging Settings
-    LOKI_URL = os.getenv("LOKI_URL")
-    LOKI_USER = os.getenv("LOKI_USER")
-    LOKI_PASSWORD = os.getenv("LOKI_PASSWORD")
-    if not all([LOKI_URL, LOKI_USER, LOKI_PASSWORD]):
-        raise ValueError("Logging environment variables must be set")
+class SettingsMeta(SingletonMeta):
+    def __getattr__(cls, name: str):
+        # Only reached for settings not read yet
+        if name.startswith("_") or cls._loaded:
+            raise AttributeError(name)
+        cls.load()
+        return getattr(cls, name)
+
+
+class Settings(metaclass=SettingsMeta):
+    """Application settings, read from the environment (and a `.env` file).
+
+    Nothing is read nor validated when the module is imported, `load` runs
+    the first time a setting is accessed.
+    """
+    _loaded = False
+    _load_lock = threading.Lock()
+
+    @classmethod
+    def load(cls):
+        with cls._load_lock:
+            if cls._loaded:
+                return
+            load_dotenv()
+            cls.__read_environment()
+            cls._loaded = True
+
+    @classmethod
+    def __read_environment(cls):
+        # Database Settings
+        cls.DATABASE_URL = os.getenv("DATABASE_URL")
+        if not cls.DATABASE_URL:
+            raise ValueError("Database environment variable not set")
+        cls.DATABASE_INIT_ON_STARTUP = os.getenv(
+            "DATABASE_INIT_ON_STARTUP", "false").lower() == "true"
+        cls.DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", 10))
+        cls.DATABASE_MAX_OVERFLOW = int(
+            os.getenv("DATABASE_MAX_OVERFLOW", 10))
+        cls.DATABASE_POOL_TIMEOUT_SECONDS = float(
+            os.getenv("DATABASE_POOL_TIMEOUT_SECONDS", 30))
+        cls.DATABASE_POOL_RECYCLE_SECONDS = int(
+            os.getenv("DATABASE_POOL_RECYCLE_SECONDS", 1800))
+        cls.DATABASE_POOL_PRE_PING = os.getenv(
+            "DATABASE_POOL_PRE_PING", "true").lower() == "true"
+
+        # SQLite Settings
+        cls.SQLITE_TUNED = os.getenv("SQLITE_TUNED", "true").lower() == "true"
+        cls.SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+        cls.SQLITE_MMAP_SIZE_BYTES = int(
+            os.getenv("SQLITE_MMAP_SIZE_BYTES", 256 * 2 ** 20))
+        cls.SQLITE_CACHE_SIZE_KIB = int(
+            os.getenv("SQLITE_CACHE_SIZE_KIB", 64 * 2 ** 10))
+        cls.SQLITE_BUSY_TIMEOUT_MS = int(
+            os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+        # Redis Settings
+        cls.REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+        cls.REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+        cls.REDIS_DB = os.getenv("REDIS_DB", "0")
+        cls.REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+        cls.REDIS_POOL_TIMEOUT_SECONDS = float(
+            os.getenv("REDIS_POOL_TIMEOUT_SECONDS", 5))
+        cls.REDIS_SOCKET_TIMEOUT_SECONDS = float(
+            os.getenv("REDIS_SOCKET_TIMEOUT_SECONDS", 2))
+        cls.REDIS_HEALTH_CHECK_INTERVAL_SECONDS = int(
+            os.getenv("REDIS_HEALTH_CHECK_INTERVAL_SECONDS", 30))
+        cls.CACHE_RATE_TABLE_KEY = 'eur-rates'
+
+        # Rate Table Snapshot Settings
+        cls.RATE_TABLE_SNAPSHOT_TTL_SECONDS = int(
+            os.getenv("RATE_TABLE_SNAPSHOT_TTL_SECONDS", 60))
+        cls.RATE_TABLE_MAX_STALENESS_SECONDS = int(
+            os.getenv("RATE_TABLE_MAX_STALENESS_SECONDS", 900))
+
+        # Rate Refresh Settings
+        cls.RATE_REFRESH_LOCK_KEY = 'eur-rates-refresh-lock'
+        cls.RATE_REFRESH_LOCK_TIMEOUT_SECONDS = float(
+            os.getenv("RATE_REFRESH_LOCK_TIMEOUT_SECONDS", 10))
+        cls.RATE_REFRESH_WAIT_SECONDS = float(
+            os.getenv("RATE_REFRESH_WAIT_SECONDS", 5))
+        cls.RATE_REFRESH_POLL_INTERVAL_SECONDS = float(
+            os.getenv("RATE_REFRESH_POLL_INTERVAL_SECONDS", 0.05))
+        cls.RATE_REFRESHER_ENABLED = os.getenv(
+            "RATE_REFRESHER_ENABLED", "true").lower() == "true"
+        cls.RATE_REFRESH_INTERVAL_SECONDS = int(
+            os.getenv("RATE_REFRESH_INTERVAL_SECONDS", 3600))
+        cls.RATE_REFRESH_JITTER_SECONDS = int(
+            os.getenv("RATE_REFRESH_JITTER_SECONDS", 30))
+        cls.RATE_REFRESH_RETRY_SECONDS = int(
+            os.getenv("RATE_REFRESH_RETRY_SECONDS", 15))
+
+        # Rate History Settings
+        cls.RATE_HISTORY_SYNC_INTERVAL_SECONDS = float(
+            os.getenv("RATE_HISTORY_SYNC_INTERVAL_SECONDS", 60))
+
+        # Conversion Settings
+        cls.CONVERT_MIN_CURRENCY_VALUE = 0.1
+        cls.CONVERT_BATCH_MAX_ITEMS = int(os.getenv("CONVERT_BATCH_MAX_ITEMS", 1000))
+
+        # Overload Protection Settings
+        cls.OVERLOAD_EXEMPT_PATHS = frozenset(
+            path for path in os.getenv(
+                "OVERLOAD_EXEMPT_PATHS", "/healthcheck,/metrics,/stats"
+            ).split(",") if path
+        )
+        cls.RATE_LIMIT_ENABLED = os.getenv(
+            "RATE_LIMIT_ENABLED", "true").lower() == "true"
+        cls.RATE_LIMIT_KEY_PREFIX = 'rate-limit'
+        cls.RATE_LIMIT_PER_SECOND = float(
+            os.getenv("RATE_LIMIT_PER_SECOND", 50))
+        cls.RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", 100))
+        cls.RATE_LIMIT_MAX_LOCAL_KEYS = int(
+            os.getenv("RATE_LIMIT_MAX_LOCAL_KEYS", 10000))
+        cls.LOAD_SHED_ENABLED = os.getenv(
+            "LOAD_SHED_ENABLED", "true").lower() == "true"
+        cls.LOAD_SHED_MAX_IN_FLIGHT = int(
+            os.getenv("LOAD_SHED_MAX_IN_FLIGHT", 256))
+        cls.LOAD_SHED_P99_SECONDS = float(
+            os.getenv("LOAD_SHED_P99_SECONDS", 1))
+        cls.LOAD_SHED_WINDOW_SIZE = int(
+            os.getenv("LOAD_SHED_WINDOW_SIZE", 1000))
+        cls.LOAD_SHED_EVALUATE_INTERVAL_SECONDS = float(
+            os.getenv("LOAD_SHED_EVALUATE_INTERVAL_SECONDS", 1))
+        cls.LOAD_SHED_STEP = float(os.getenv("LOAD_SHED_STEP", 0.1))
+        cls.LOAD_SHED_MAX_RATE = float(os.getenv("LOAD_SHED_MAX_RATE", 0.9))
+        cls.LOAD_SHED_UNTIMED_PATHS = frozenset(
+            path for path in os.getenv(
+                "LOAD_SHED_UNTIMED_PATHS",
+                "/currencyConverter/v1/conversions/export,"
+                "/currencyConverter/v1/convert/batch"
+            ).split(",") if path
+        )
+
+        # Idempotency Settings
+        cls.IDEMPOTENCY_KEY_PREFIX = 'idempotency'
+        cls.IDEMPOTENCY_TTL_SECONDS = int(
+            os.getenv("IDEMPOTENCY_TTL_SECONDS", 86400))
+        cls.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS = float(
+            os.getenv("IDEMPOTENCY_LOCK_TIMEOUT_SECONDS", 10))
+        cls.IDEMPOTENCY_WAIT_SECONDS = float(
+            os.getenv("IDEMPOTENCY_WAIT_SECONDS", 5))
+        cls.IDEMPOTENCY_POLL_INTERVAL_SECONDS = float(
+            os.getenv("IDEMPOTENCY_POLL_INTERVAL_SECONDS", 0.05))
+
+        # Response Settings
+        cls.FAST_JSON_RESPONSES = os.getenv(
+            "FAST_JSON_RESPONSES", "false").lower() == "true"
+
+        # Conversions History Settings
+        cls.CONVERSIONS_PAGE_DEFAULT_LIMIT = int(
+            os.getenv("CONVERSIONS_PAGE_DEFAULT_LIMIT", 100))
+        cls.CONVERSIONS_PAGE_MAX_LIMIT = int(
+            os.getenv("CONVERSIONS_PAGE_MAX_LIMIT", 1000))
+        cls.CONVERSIONS_EXPORT_CHUNK_SIZE = int(
+            os.getenv("CONVERSIONS_EXPORT_CHUNK_SIZE", 1000))
+        cls.CONVERSIONS_CACHE_ENABLED = os.getenv(
+            "CONVERSIONS_CACHE_ENABLED", "true").lower() == "true"
+        cls.CONVERSIONS_CACHE_KEY_PREFIX = 'conversions'
+        cls.CONVERSIONS_CACHE_TTL_SECONDS = int(
+            os.getenv("CONVERSIONS_CACHE_TTL_SECONDS", 300))
+        cls.CONVERSIONS_ROLLUP_REFRESHER_ENABLED = os.getenv(
+            "CONVERSIONS_ROLLUP_REFRESHER_ENABLED", "true").lower() == "true"
+        cls.CONVERSIONS_ROLLUP_INTERVAL_SECONDS = int(
+            os.getenv("CONVERSIONS_ROLLUP_INTERVAL_SECONDS", 60))
+        cls.CONVERSIONS_ROLLUP_LOOKBACK_DAYS = int(
+            os.getenv("CONVERSIONS_ROLLUP_LOOKBACK_DAYS", 1))
+        cls.CONVERSIONS_ROLLUP_LOCK_KEY = 'conversions-rollup-lock'
+
+        # Conversions Write Settings
+        cls.CONVERSIONS_WRITE_MODE = os.getenv("CONVERSIONS_WRITE_MODE", "sync")
+        if cls.CONVERSIONS_WRITE_MODE not in ("sync", "write_behind"):
+            raise ValueError(
+                "CONVERSIONS_WRITE_MODE must be 'sync' or 'write_behind'")
+        cls.CONVERSIONS_WRITE_BATCH_SIZE = int(
+            os.getenv("CONVERSIONS_WRITE_BATCH_SIZE", 500))
+        cls.CONVERSIONS_WRITE_FLUSH_INTERVAL_SECONDS = float(
+            os.getenv("CONVERSIONS_WRITE_FLUSH_INTERVAL_SECONDS", 0.2))
+        cls.CONVERSIONS_WRITE_QUEUE_SIZE = int(
+            os.getenv("CONVERSIONS_WRITE_QUEUE_SIZE", 10000))
+        cls.CONVERSIONS_WRITE_RETRY_ATTEMPTS = int(
+            os.getenv("CONVERSIONS_WRITE_RETRY_ATTEMPTS", 5))
+        cls.CONVERSIONS_WRITE_RETRY_BACKOFF_SECONDS = float(
+            os.getenv("CONVERSIONS_WRITE_RETRY_BACKOFF_SECONDS", 0.5))
+        cls.CONVERSIONS_WRITE_DEAD_LETTER_KEY = 'conversions-dead-letter'
+        cls.CONVERSIONS_ID_KEY = 'conversion-ids'
+        cls.CONVERSIONS_ID_BLOCK_SIZE = int(
+            os.getenv("CONVERSIONS_ID_BLOCK_SIZE", 1000))
+
+        # Exchange Rates Api Settings
+        cls.API_URL = os.getenv("API_URL")
+        cls.API_ACCESS_KEY = os.getenv("API_ACCESS_KEY")
+        if not all([cls.API_URL, cls.API_ACCESS_KEY]):
+            raise ValueError(
+                "Exchange Rates Api environment variables must be set")
+        cls.API_MAX_CONNECTIONS = int(os.getenv("API_MAX_CONNECTIONS", 10))
+        cls.API_MAX_KEEPALIVE_CONNECTIONS = int(
+            os.getenv("API_MAX_KEEPALIVE_CONNECTIONS", 5))
+        cls.API_KEEPALIVE_EXPIRY_SECONDS = float(
+            os.getenv("API_KEEPALIVE_EXPIRY_SECONDS", 30))
+        cls.API_TIMEOUT_SECONDS = float(os.getenv("API_TIMEOUT_SECONDS", 5))
+        cls.API_RETRIES = int(os.getenv("API_RETRIES", 2))
+
+        # Logging Settings
+        cls.LOKI_URL = os.getenv("LOKI_URL")
+        cls.LOKI_USER = os.getenv("LOKI_USER")
+        cls.LOKI_PASSWORD = os.getenv("LOKI_PASSWORD")
+        if not all([cls.LOKI_URL, cls.LOKI_USER, cls.LOKI_PASSWORD]):
+            raise ValueError("Logging environment variables must be set")
+        cls.LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", 500))
+        cls.LOG_FLUSH_INTERVAL_SECONDS = float(
+            os.getenv("LOG_FLUSH_INTERVAL_SECONDS", 1))
+        cls.LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", 10000))
+        cls.LOG_REQUESTS_SAMPLE_RATE = float(
+            os.getenv("LOG_REQUESTS_SAMPLE_RATE", 1))
+        cls.LOG_REQUESTS_SAMPLE_RATES = {
+            path: float(rate)
+            for path, rate in (
+                item.split("=") for item in os.getenv(
+                    "LOG_REQUESTS_SAMPLE_RATES", "").split(",") if item
+            )
+        }
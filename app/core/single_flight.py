@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """Coalesces concurrent calls sharing the same key into one execution.
+
+    The first caller of a key starts the coroutine in a task of its own,
+    callers arriving while it is still in flight await and receive the same
+    result (or exception). Cancelling any caller, the first one included,
+    leaves the call running for the others.
+    """
+
+    def __init__(self):
+        self.__calls: dict[Any, asyncio.Task] = {}
+
+    def in_flight(self, key: Any) -> bool:
+        return key in self.__calls
+
+    async def do(
+        self,
+        key: Any,
+        fn: Callable[[], Awaitable[T]]
+    ) -> tuple[T, bool]:
+        call = self.__calls.get(key)
+        if call is not None:
+            return await asyncio.shield(call), True
+
+        call = asyncio.create_task(self.__run(key, fn))
+        call.add_done_callback(self.__retrieve_exception)
+        self.__calls[key] = call
+        return await asyncio.shield(call), False
+
+    async def __run(self, key: Any, fn: Callable[[], Awaitable[T]]) -> T:
+        try:
+            return await fn()
+        finally:
+            del self.__calls[key]
+
+    @staticmethod
+    def __retrieve_exception(call: asyncio.Task):
+        # Marks the exception as retrieved when every caller was cancelled
+        if not call.cancelled():
+            call.exception()
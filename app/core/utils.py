@@ -1,6 +1,9 @@
+import base64
 from datetime import datetime, timedelta
+from typing import Optional
 
 from app.exceptions.invalid_currency_exception import InvalidCurrencyException
+from app.exceptions.invalid_cursor_exception import InvalidCursorException
 
 
 class Utils:
@@ -18,3 +21,36 @@ class Utils:
 
         if len(currency_code) != 3 or currency_code.isalpha() is False:
             raise InvalidCurrencyException(currency_code=currency_code)
+
+    @staticmethod
+    def request_path(scope: dict) -> str:
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            return path[len(root_path):] or "/"
+        return path
+
+    @staticmethod
+    def encode_cursor(position: datetime, transaction_id: int) -> str:
+        return base64.urlsafe_b64encode(
+            f"{position.isoformat()}|{transaction_id}".encode()
+        ).decode()
+
+    @staticmethod
+    def next_page(rows: list, limit: int) -> tuple[list, Optional[str]]:
+        """Splits `limit + 1` rows read for a page into the page and the
+        cursor of the next one, if there is one."""
+        if len(rows) <= limit:
+            return rows, None
+
+        rows = rows[:limit]
+        return rows, Utils.encode_cursor(
+            rows[-1].datetime, rows[-1].transaction_id)
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, int]:
+        try:
+            position, transaction_id = base64.urlsafe_b64decode(
+                cursor.encode()).decode().split("|")
+            return datetime.fromisoformat(position), int(transaction_id)
+        except ValueError:
+            raise InvalidCursorException(cursor)
@@ -0,0 +1,10 @@
+class ExchangeRatesUnavailableException(Exception):
+    """Raised when conversion rates can not be loaded from cache nor API
+
+    Attributes:
+        message -- explanation of the error
+    """
+
+    def __init__(self, message="Exchange rates are currently unavailable"):
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,12 @@
+class HistoricalRatesNotFoundException(Exception):
+    """Raised when no conversion rates were stored on or before a date
+
+    Attributes:
+        as_of -- date the rates were requested for
+        message -- explanation of the error
+    """
+
+    def __init__(self, as_of, message="No exchange rates stored on or before {as_of}"):
+        self.message = message.format(as_of=as_of)
+        self.as_of = as_of
+        super().__init__(self.message)
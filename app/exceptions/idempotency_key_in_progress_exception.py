@@ -0,0 +1,17 @@
+class IdempotencyKeyInProgressException(Exception):
+    """Raised when a request with the same idempotency key is still running
+
+    Attributes:
+        idempotency_key -- input idempotency key which caused the error
+        message -- explanation of the error
+    """
+
+    def __init__(
+        self,
+        idempotency_key: str,
+        message="A request with idempotency key {idempotency_key} is still "
+                "in progress"
+    ):
+        self.idempotency_key = idempotency_key
+        self.message = message.format(idempotency_key=idempotency_key)
+        super().__init__(self.message)
@@ -0,0 +1,17 @@
+class IdempotencyKeyReusedException(Exception):
+    """Raised when an idempotency key is sent again with a different request
+
+    Attributes:
+        idempotency_key -- input idempotency key which caused the error
+        message -- explanation of the error
+    """
+
+    def __init__(
+        self,
+        idempotency_key: str,
+        message="Idempotency key {idempotency_key} was already used with a "
+                "different request"
+    ):
+        self.idempotency_key = idempotency_key
+        self.message = message.format(idempotency_key=idempotency_key)
+        super().__init__(self.message)
@@ -0,0 +1,17 @@
+class InvalidCurrencyValueException(Exception):
+    """Raised when the value to be converted is below the allowed minimum
+
+    Attributes:
+        currency_value -- input value which caused the error
+        message -- explanation of the error
+    """
+
+    def __init__(
+            self,
+            currency_value: float,
+            minimum_value: float,
+            message="The minimum allowed value is {minimum}"
+    ):
+        self.currency_value = currency_value
+        self.message = message.format(minimum=minimum_value)
+        super().__init__(self.message)
@@ -0,0 +1,12 @@
+class InvalidCursorException(Exception):
+    """Raised when a pagination cursor can not be decoded
+
+    Attributes:
+        cursor -- input cursor which caused the error
+        message -- explanation of the error
+    """
+
+    def __init__(self, cursor: str, message="Cursor {cursor} is not valid"):
+        self.cursor = cursor
+        self.message = message.format(cursor=cursor)
+        super().__init__(self.message)
@@ -0,0 +1,10 @@
+class TransactionIdsUnavailableException(Exception):
+    """Raised when a block of transaction ids can not be reserved
+
+    Attributes:
+        message -- explanation of the error
+    """
+
+    def __init__(self, message="Transaction ids are currently unavailable"):
+        self.message = message
+        super().__init__(self.message)
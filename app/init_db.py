@@ -0,0 +1,18 @@
+import asyncio
+
+from app.core.database import Database
+# Imported for their side effect of registering the tables on Base.metadata
+from app.models import currency_conversions_daily_pair_model  # noqa: F401
+from app.models import currency_conversions_daily_user_model  # noqa: F401
+from app.models import currency_conversions_model  # noqa: F401
+from app.models import exchange_rates_history_model  # noqa: F401
+
+
+async def init_db():
+    database = Database()
+    await database.init_db()
+    await database.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(init_db())
@@ -1,13 +1,66 @@
-from dotenv import load_dotenv
-load_dotenv()
+from contextlib import asynccontextmanager
 
 from app.routers.routes import api_router
-from app.core.log_requets_midleware import log_requests
+from app.api_clients.exchange_rates_api_client import ExchangeRatesApiClient
+from app.core.cache import Cache
+from app.core.load_shedder import LoadShedder
+from app.core.load_shedding_middleware import LoadSheddingMiddleware
+from app.core.log_requets_midleware import LogRequestsMiddleware
+from app.core.logger import Logger
+from app.core.metrics import render_metrics
+from app.core.metrics_middleware import MetricsMiddleware
 from app.core.database import Database
-from fastapi import FastAPI
+from app.core.rate_history import RateHistoryStore
+from app.core.rate_limit_middleware import RateLimitMiddleware
+from app.core.rate_limiter import RateLimiter
+from app.core.rate_table import RateTableStore
+from app.core.settings import Settings
+from app.services.conversions_rollup_refresher import \
+    ConversionsRollupRefresher
+from app.services.currency_conversions_writer import \
+    CurrencyConversionsWriter
+from app.services.exchange_rates_refresher import ExchangeRatesRefresher
+from app.services.exchange_rates_service import ExchangeRatesService
+from app.services.rate_history_service import RateHistoryService
+from fastapi import FastAPI, Response
 
 
-db = Database().init_db()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    Settings.load()
+    if Settings.DATABASE_INIT_ON_STARTUP:
+        await Database().init_db()
+
+    refresher = ExchangeRatesRefresher(
+        exchange_rates_service=ExchangeRatesService(
+            cache=Cache(),
+            exchange_rates_api_client=ExchangeRatesApiClient(),
+            rate_table_store=RateTableStore(),
+            rate_history_service=RateHistoryService(
+                database=Database(), rate_history_store=RateHistoryStore())
+        ),
+        rate_table_store=RateTableStore()
+    )
+    rollup_refresher = ConversionsRollupRefresher(
+        cache=Cache(), database=Database())
+    if Settings.RATE_REFRESHER_ENABLED:
+        refresher.start()
+    if Settings.CONVERSIONS_ROLLUP_REFRESHER_ENABLED:
+        rollup_refresher.start()
+    if Settings.CONVERSIONS_WRITE_MODE == "write_behind":
+        await CurrencyConversionsWriter().start(
+            cache=Cache(), database=Database())
+
+    yield
+
+    await refresher.stop()
+    await rollup_refresher.stop()
+    await CurrencyConversionsWriter().stop()
+    await ExchangeRatesApiClient.close()
+    await Cache().close()
+    await Database().close()
+    Logger.close()
+
 
 app = FastAPI(
     title="Currency Converter API",
@@ -22,10 +75,16 @@ app = FastAPI(
         "email": "victor_soares@live.com",
         "url": "https://www.linkedin.com/in/soares-victor-it/"
     },
-    root_path="/api"
+    root_path="/api",
+    lifespan=lifespan
 )
 app.include_router(api_router, prefix="/currencyConverter")
-app.middleware("http")(log_requests)
+# Wrapped by the logging and metrics middlewares, so rejected requests are
+# still logged and measured, and shedding runs before rate limiting
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(LoadSheddingMiddleware)
+app.add_middleware(LogRequestsMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 
 @app.get(
@@ -33,5 +92,40 @@ app.middleware("http")(log_requests)
     description="Just a server Health-Check",
     tags=["Server"]
 )
-def healthcheck() -> dict["str", str]:
+async def healthcheck() -> dict["str", str]:
     return {"status": "Health"}
+
+
+@app.get(
+    "/stats",
+    description="Per worker counters of the in-process rate table snapshot \
+    and rate history, of the conversions write buffer, of rate limiting and \
+    load shedding, of log shipping and of the Redis, database and Exchange \
+                                              Rates API connection pools",
+    tags=["Server"]
+)
+async def stats() -> dict[str, dict]:
+    return {
+        "rate_table": RateTableStore().stats(),
+        "rate_history": RateHistoryStore().stats(),
+        "conversions_writer": CurrencyConversionsWriter().stats(),
+        "rate_limiter": RateLimiter().stats(),
+        "load_shedder": LoadShedder().stats(),
+        "logging": Logger.stats(),
+        "pools": {
+            "redis": Cache().pool_stats(),
+            "database": Database().pool_stats(),
+            "exchange_rates_api": ExchangeRatesApiClient.pool_stats()
+        }
+    }
+
+
+@app.get(
+    "/metrics",
+    description="Prometheus metrics, aggregated over every worker when \
+                                        PROMETHEUS_MULTIPROC_DIR is set",
+    tags=["Server"]
+)
+async def metrics() -> Response:
+    content, media_type = render_metrics()
+    return Response(content=content, media_type=media_type)
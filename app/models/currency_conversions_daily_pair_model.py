@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Date, Float, Integer, String
+
+from app.core.database import Base
+
+
+class CurrencyConversionsDailyPairModel(Base):
+    """Rollup of `CurrencyConversions` per UTC day and currency pair, kept
+    up to date by `ConversionsRollupRefresher`."""
+    __tablename__ = 'CurrencyConversionsDailyPair'
+
+    day = Column(Date, primary_key=True)
+    source_currency_code = Column(String(3), primary_key=True)
+    target_currency_code = Column(String(3), primary_key=True)
+    conversions = Column(Integer, nullable=False)
+    source_volume = Column(Float, nullable=False)
+    target_volume = Column(Float, nullable=False)
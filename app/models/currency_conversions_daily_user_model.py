@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Date, Float, Index, Integer, String
+
+from app.core.database import Base
+
+
+class CurrencyConversionsDailyUserModel(Base):
+    """Rollup of `CurrencyConversions` per UTC day, user and currency pair,
+    kept up to date by `ConversionsRollupRefresher`."""
+    __tablename__ = 'CurrencyConversionsDailyUser'
+
+    day = Column(Date, primary_key=True)
+    user_id = Column(String, primary_key=True)
+    source_currency_code = Column(String(3), primary_key=True)
+    target_currency_code = Column(String(3), primary_key=True)
+    conversions = Column(Integer, nullable=False)
+    source_volume = Column(Float, nullable=False)
+    target_volume = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_currency_conversions_daily_user_user_id_day", "user_id", "day"),
+    )
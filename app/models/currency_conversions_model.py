@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, Float, Integer, String
+from sqlalchemy import Column, DateTime, Float, Index, Integer, String
 
 from app.core.database import Base
 
@@ -12,7 +12,18 @@ class CurrencyConversionsModel(Base):
     source_currency_value = Column(Float, nullable=False)
     target_currency_code = Column(String(3), nullable=False)
     rate_value = Column(Float, nullable=False)
-    datetime = Column(DateTime, nullable=False)
+    datetime = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index(
+            "ix_currency_conversions_user_id_datetime",
+            "user_id", "datetime", "transaction_id"
+        ),
+        Index(
+            "ix_currency_conversions_datetime",
+            "datetime", "transaction_id"
+        ),
+    )
 
     def to_dict(self):
         return {
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Date, LargeBinary, String
+
+from app.core.database import Base
+
+
+class ExchangeRatesHistoryModel(Base):
+    """One row per date, the rates packed as little-endian float64 in the
+    order of the comma separated `codes`."""
+    __tablename__ = 'ExchangeRatesHistory'
+
+    date = Column(Date, primary_key=True)
+    base = Column(String(3), nullable=False)
+    version = Column(String, nullable=False)
+    codes = Column(String, nullable=False)
+    rates = Column(LargeBinary, nullable=False)
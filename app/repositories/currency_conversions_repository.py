@@ -1,16 +1,35 @@
-from datetime import datetime
+from datetime import UTC, date, datetime, time
+from typing import AsyncIterator, Optional, Sequence
 
+from sqlalchemy import (Date, Row, Select, cast, func, insert,
+                        literal_column, text, tuple_)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import Session
 
+from app.core.metrics import DB_COMMIT_LATENCY
+from app.models.currency_conversions_daily_pair_model import \
+    CurrencyConversionsDailyPairModel
+from app.models.currency_conversions_daily_user_model import \
+    CurrencyConversionsDailyUserModel
 from app.models.currency_conversions_model import CurrencyConversionsModel
 
+ROLLUP_MEASURES = ("conversions", "source_volume", "target_volume")
+ROLLUP_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+ADVANCE_TRANSACTION_ID_SEQUENCE = text(
+    "SELECT setval(serial.sequence, GREATEST(:transaction_id, "
+    "COALESCE(pg_sequence_last_value(serial.sequence), 0))) "
+    "FROM (SELECT CAST(pg_get_serial_sequence("
+    f"'\"{CurrencyConversionsModel.__tablename__}\"', 'transaction_id') "
+    "AS regclass) AS sequence) AS serial"
+)
+
 
 class CurrencyConversionsRepository:
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: AsyncSession):
         self.db_session = db_session
 
-    def add_currency_conversion(
+    async def add_currency_conversion(
         self,
         user_id: str,
         source_currency_code: str,
@@ -27,23 +46,250 @@ class CurrencyConversionsRepository:
             rate_value=rate_value,
             datetime=datetime
         )
-        with self.db_session as db_session:
-            db_session.add(new_conversion)
-            db_session.commit()
-            db_session.refresh(new_conversion)
+        async with self.db_session as db_session:
+            with DB_COMMIT_LATENCY.labels(operation="add").time():
+                db_session.add(new_conversion)
+                await db_session.commit()
 
         return new_conversion
 
-    def list_all_conversions(self) -> list[CurrencyConversionsModel | None]:  # pragma: no cover
-        with self.db_session as db_session:
-            return db_session.query(CurrencyConversionsModel).limit(100).all()
+    async def add_currency_conversions(
+        self,
+        conversions: list[dict]
+    ) -> list[CurrencyConversionsModel]:  # pragma: no cover
+        if not conversions:
+            return []
+
+        async with self.db_session as db_session:
+            with DB_COMMIT_LATENCY.labels(operation="add_many").time():
+                new_conversions = (await db_session.scalars(
+                    insert(CurrencyConversionsModel).returning(
+                        CurrencyConversionsModel,
+                        sort_by_parameter_order=True),
+                    conversions
+                )).all()
+                await db_session.commit()
+
+        # SQLite returns the datetimes naive, keep the ones inserted as the
+        # single insert does, so both are serialized with their offset
+        for new_conversion, conversion in zip(new_conversions, conversions):
+            new_conversion.datetime = conversion["datetime"]
+
+        return new_conversions
+
+    async def insert_currency_conversions(
+        self,
+        conversions: list[dict]
+    ):  # pragma: no cover
+        async with self.db_session as db_session:
+            with DB_COMMIT_LATENCY.labels(operation="insert_many").time():
+                await db_session.execute(
+                    insert(CurrencyConversionsModel), conversions)
+                # The ids were allocated outside the database, move the serial
+                # sequence past them (never back) for the synchronous inserts
+                if db_session.get_bind().dialect.name == "postgresql":
+                    await db_session.execute(
+                        ADVANCE_TRANSACTION_ID_SEQUENCE,
+                        {"transaction_id": max(
+                            row["transaction_id"] for row in conversions)}
+                    )
+                await db_session.commit()
+
+    async def get_max_transaction_id(self) -> int:  # pragma: no cover
+        async with self.db_session as db_session:
+            return (await db_session.scalar(
+                select(func.max(CurrencyConversionsModel.transaction_id))
+            )) or 0
 
-    def get_conversions_by_user(
+    async def list_all_conversions(
+        self,
+        limit: int = 100,
+        after: Optional[tuple[datetime, int]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        descending: bool = False
+    ) -> list[CurrencyConversionsModel]:  # pragma: no cover
+        return await self.__list_conversions(
+            self.__page_query(
+                select(CurrencyConversionsModel),
+                limit, after, start, end, descending
+            )
+        )
+
+    async def get_conversions_by_user(
             self,
-            user_id: str
-    ) -> list[CurrencyConversionsModel | None]:  # pragma: no cover
-        with self.db_session as db_session:
-            return db_session.execute(
+            user_id: str,
+            limit: int = 100,
+            after: Optional[tuple[datetime, int]] = None,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None,
+            descending: bool = False
+    ) -> list[CurrencyConversionsModel]:  # pragma: no cover
+        return await self.__list_conversions(
+            self.__page_query(
                 select(CurrencyConversionsModel)
-                .where(CurrencyConversionsModel.user_id == user_id)
-            ).scalars().all()
+                .where(CurrencyConversionsModel.user_id == user_id),
+                limit, after, start, end, descending
+            )
+        )
+
+    async def stream_conversions(
+        self,
+        user_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        chunk_size: int = 1000
+    ) -> AsyncIterator[Sequence[Row]]:  # pragma: no cover
+        query = self.__range_query(
+            select(*CurrencyConversionsModel.__table__.columns), start, end)
+        if user_id is not None:
+            query = query.where(CurrencyConversionsModel.user_id == user_id)
+
+        async with self.db_session as db_session:
+            result = await db_session.stream(
+                query.order_by(
+                    CurrencyConversionsModel.datetime,
+                    CurrencyConversionsModel.transaction_id
+                ).execution_options(yield_per=chunk_size)
+            )
+            async for rows in result.partitions():
+                yield rows
+
+    async def get_conversion_volumes(
+        self,
+        group_by_user: bool = False,
+        daily: bool = True,
+        user_id: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        limit: int = 100
+    ) -> Sequence[Row]:  # pragma: no cover
+        rollup = CurrencyConversionsDailyUserModel \
+            if group_by_user or user_id is not None \
+            else CurrencyConversionsDailyPairModel
+        keys = [rollup.source_currency_code, rollup.target_currency_code]
+        if group_by_user:
+            keys.insert(0, rollup.user_id)
+        if daily:
+            keys.insert(0, rollup.day)
+
+        query = select(
+            *keys,
+            *[func.sum(getattr(rollup, measure)).label(measure)
+              for measure in ROLLUP_MEASURES]
+        )
+        if user_id is not None:
+            query = query.where(rollup.user_id == user_id)
+        if start is not None:
+            query = query.where(rollup.day >= start)
+        if end is not None:
+            query = query.where(rollup.day < end)
+
+        async with self.db_session as db_session:
+            return (await db_session.execute(
+                query.group_by(*keys).order_by(*keys).limit(limit)
+            )).all()
+
+    async def refresh_rollups(self, start: date, end: date):  # pragma: no cover
+        """Rebuilds the rollup rows of the UTC days from `start` to `end`
+        (excluded) out of the conversions stored for them."""
+        async with self.db_session as db_session:
+            dialect_name = db_session.get_bind().dialect.name
+            upsert = ROLLUP_INSERTS[dialect_name]
+            with DB_COMMIT_LATENCY.labels(operation="refresh_rollups").time():
+                for rollup in (CurrencyConversionsDailyPairModel,
+                               CurrencyConversionsDailyUserModel):
+                    statement = upsert(rollup).from_select(
+                        [column.name for column in rollup.__table__.primary_key]
+                        + list(ROLLUP_MEASURES),
+                        self.__rollup_query(rollup, dialect_name, start, end)
+                    )
+                    await db_session.execute(statement.on_conflict_do_update(
+                        index_elements=list(rollup.__table__.primary_key),
+                        set_={
+                            measure: getattr(statement.excluded, measure)
+                            for measure in ROLLUP_MEASURES
+                        }
+                    ))
+                await db_session.commit()
+
+    @staticmethod
+    def __rollup_query(
+        rollup: type,
+        dialect_name: str,
+        start: date,
+        end: date
+    ) -> Select:
+        conversion = CurrencyConversionsModel
+        day = func.date(conversion.datetime) if dialect_name == "sqlite" \
+            else cast(func.timezone(literal_column("'UTC'"),
+                                    conversion.datetime), Date)
+        keys = [day] + [
+            getattr(conversion, column.name)
+            for column in rollup.__table__.primary_key
+            if column.name != "day"
+        ]
+
+        return select(
+            *keys,
+            func.count(),
+            func.sum(conversion.source_currency_value),
+            func.sum(conversion.source_currency_value * conversion.rate_value)
+        ).where(
+            conversion.datetime >= datetime.combine(start, time(), UTC),
+            conversion.datetime < datetime.combine(end, time(), UTC)
+        ).group_by(*keys)
+
+    async def __list_conversions(
+        self,
+        query: Select
+    ) -> list[CurrencyConversionsModel]:  # pragma: no cover
+        async with self.db_session as db_session:
+            return (await db_session.scalars(query)).all()
+
+    @staticmethod
+    def __page_query(
+        query: Select,
+        limit: int,
+        after: Optional[tuple[datetime, int]],
+        start: Optional[datetime],
+        end: Optional[datetime],
+        descending: bool
+    ) -> Select:
+        position = tuple_(
+            CurrencyConversionsModel.datetime,
+            CurrencyConversionsModel.transaction_id
+        )
+
+        query = CurrencyConversionsRepository.__range_query(query, start, end)
+        if after is not None:
+            query = query.where(
+                position < tuple_(*after) if descending
+                else position > tuple_(*after)
+            )
+
+        if descending:
+            query = query.order_by(
+                CurrencyConversionsModel.datetime.desc(),
+                CurrencyConversionsModel.transaction_id.desc()
+            )
+        else:
+            query = query.order_by(
+                CurrencyConversionsModel.datetime,
+                CurrencyConversionsModel.transaction_id
+            )
+
+        return query.limit(limit)
+
+    @staticmethod
+    def __range_query(
+        query: Select,
+        start: Optional[datetime],
+        end: Optional[datetime]
+    ) -> Select:
+        if start is not None:
+            query = query.where(CurrencyConversionsModel.datetime >= start)
+        if end is not None:
+            query = query.where(CurrencyConversionsModel.datetime < end)
+
+        return query
@@ -0,0 +1,44 @@
+from datetime import date
+from typing import Optional, Sequence
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.metrics import DB_COMMIT_LATENCY
+from app.models.exchange_rates_history_model import ExchangeRatesHistoryModel
+
+
+class ExchangeRatesHistoryRepository:
+    def __init__(self, db_session: AsyncSession):
+        self.db_session = db_session
+
+    async def save_rates(
+        self,
+        date: date,
+        base: str,
+        version: str,
+        codes: str,
+        rates: bytes
+    ):  # pragma: no cover
+        async with self.db_session as db_session:
+            with DB_COMMIT_LATENCY.labels(operation="save_rates").time():
+                await db_session.merge(ExchangeRatesHistoryModel(
+                    date=date,
+                    base=base,
+                    version=version,
+                    codes=codes,
+                    rates=rates
+                ))
+                await db_session.commit()
+
+    async def get_rates_since(
+        self,
+        since: Optional[date] = None
+    ) -> Sequence[ExchangeRatesHistoryModel]:  # pragma: no cover
+        query = select(ExchangeRatesHistoryModel) \
+            .order_by(ExchangeRatesHistoryModel.date)
+        if since is not None:
+            query = query.where(ExchangeRatesHistoryModel.date >= since)
+
+        async with self.db_session as db_session:
+            return (await db_session.scalars(query)).all()
@@ -1,101 +1,431 @@
-from typing import List, Optional
+from datetime import UTC, date, datetime
+from typing import Awaitable, Callable, List, Literal, Optional
 
-from fastapi import APIRouter, Depends, Header, HTTPException, status
-from starlette.responses import JSONResponse
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import JSONResponse, Response, StreamingResponse
 
 from app.api_clients.exchange_rates_api_client import ExchangeRatesApiClient
 from app.core.cache import Cache
 from app.core.database import Database
+from app.core.rate_history import RateHistoryStore
+from app.core.rate_table import RateTableStore
+from app.core.responses import FastJSONResponse
+from app.core.settings import Settings
+from app.core.utils import Utils
 from app.exceptions.currency_code_doesnt_exist_exception import \
     CurrencyCodeDoesntExistException
+from app.exceptions.exchange_rates_unavailable_exception import \
+    ExchangeRatesUnavailableException
+from app.exceptions.historical_rates_not_found_exception import \
+    HistoricalRatesNotFoundException
+from app.exceptions.idempotency_key_in_progress_exception import \
+    IdempotencyKeyInProgressException
+from app.exceptions.idempotency_key_reused_exception import \
+    IdempotencyKeyReusedException
 from app.exceptions.invalid_currency_exception import InvalidCurrencyException
+from app.exceptions.invalid_cursor_exception import InvalidCursorException
+from app.exceptions.invalid_currency_value_exception import \
+    InvalidCurrencyValueException
+from app.exceptions.transaction_ids_unavailable_exception import \
+    TransactionIdsUnavailableException
 from app.models.currency_conversions_model import CurrencyConversionsModel
 from app.repositories.currency_conversions_repository import \
     CurrencyConversionsRepository
+from app.schemas.currency_conversion_batch_item_response_schema import \
+    CurrencyConversionBatchItemResponseSchema
 from app.schemas.currency_conversion_response_schema import \
     CurrencyConversionResponseSchema
+from app.schemas.currency_conversion_volume_response_schema import \
+    CurrencyConversionVolumeResponseSchema
 from app.schemas.currency_conversions_request_schema import \
     CurrencyConversionsRequestSchema
+from app.schemas.currency_cross_rates_response_schema import \
+    CurrencyCrossRatesResponseSchema
+from app.services.conversions_history_cache import ConversionsHistoryCache
+from app.services.currency_conversions_writer import \
+    CurrencyConversionsWriter
 from app.services.currency_converter_service import CurrencyConverterService
+from app.services.exchange_rates_service import ExchangeRatesService
+from app.services.idempotency_service import IdempotencyService
+from app.services.rate_history_service import RateHistoryService
 
 router = APIRouter()
 
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+BATCH_ERROR_STATUS_CODES = {
+    InvalidCurrencyException: status.HTTP_400_BAD_REQUEST,
+    InvalidCurrencyValueException: status.HTTP_400_BAD_REQUEST,
+    CurrencyCodeDoesntExistException: status.HTTP_404_NOT_FOUND
+}
+
 
 @router.get(
     "/conversions",
     response_model=List[CurrencyConversionResponseSchema],
     summary="Get all currency conversions",
     description="List all currency conversions performed. It's possible \
-                                                   filter by `user_id` header.",
+          filter by `user_id` header and by a `start`/`end` datetime range. \
+       Results are paginated, `limit` is capped at CONVERSIONS_PAGE_MAX_LIMIT \
+     and when there are more the `X-Next-Cursor` header holds the `cursor` \
+        of the next page. Pages of a single user without a range are served \
+                                        already serialized from the cache.",
     tags=["Currency Converter"]
 )
 async def get_conversions(
     user_id: Optional[str] = Header(None),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    order: Literal["asc", "desc"] = "asc",
     db: Database = Depends(Database.get_database),
     cache: Cache = Depends(Cache.get_cache),
     exchange_rates_api_client: ExchangeRatesApiClient = Depends(
-        ExchangeRatesApiClient)
+        ExchangeRatesApiClient),
+    rate_table_store: RateTableStore = Depends(RateTableStore.get_store)
 ):
     service = CurrencyConverterService(
         cache=cache,
         currency_conversions_repository=CurrencyConversionsRepository(
             db.get_db_session()),
-        exchange_rates_api_client=exchange_rates_api_client
+        exchange_rates_api_client=exchange_rates_api_client,
+        rate_table_store=rate_table_store
     )
 
-    result = service.get_conversions(user_id)
-    if not result:
+    page = {
+        "limit": min(limit or Settings.CONVERSIONS_PAGE_DEFAULT_LIMIT,
+                     Settings.CONVERSIONS_PAGE_MAX_LIMIT),
+        "cursor": cursor,
+        "descending": order == "desc"
+    }
+    try:
+        if user_id is not None and start is None and end is None:
+            body, next_cursor = await service.get_serialized_conversions(
+                user_id, **page)
+        else:
+            result, next_cursor = await service.get_conversions(
+                user_id, start=start, end=end, **page)
+            body = ConversionsHistoryCache.render(result) if result else None
+    except InvalidCursorException as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    if body is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User '{user_id}' not found"
         )
 
-    return JSONResponse(
-        content=[transaction.to_dict() for transaction in result]
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+    )
+
+
+@router.get(
+    "/conversions/export",
+    summary="Export currency conversions",
+    description="Streams every currency conversion performed as NDJSON or \
+        CSV. It's possible filter by `user_id` header and by a `start`/`end` \
+                                                            datetime range.",
+    tags=["Currency Converter"]
+)
+async def export_conversions(
+    user_id: Optional[str] = Header(None),
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Database = Depends(Database.get_database),
+    cache: Cache = Depends(Cache.get_cache),
+    exchange_rates_api_client: ExchangeRatesApiClient = Depends(
+        ExchangeRatesApiClient),
+    rate_table_store: RateTableStore = Depends(RateTableStore.get_store)
+):
+    service = CurrencyConverterService(
+        cache=cache,
+        currency_conversions_repository=CurrencyConversionsRepository(
+            db.get_db_session()),
+        exchange_rates_api_client=exchange_rates_api_client,
+        rate_table_store=rate_table_store
+    )
+
+    return StreamingResponse(
+        service.export_conversions(
+            user_id=user_id,
+            export_format=export_format,
+            start=start,
+            end=end
+        ),
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition":
+                f"attachment; filename=conversions.{export_format}"
+        }
     )
 
 
+@router.get(
+    "/conversions/volumes",
+    response_model=List[CurrencyConversionVolumeResponseSchema],
+    summary="Get currency conversion volumes",
+    description="Number of conversions and summed source and target values \
+       per currency pair, by UTC `day` or in `total` over a `start`/`end` date \
+     range (`end` excluded). `group_by=user` splits them per user, and the \
+     `user_id` header filters a single user. Served from daily rollups, not \
+     the conversions themselves, rebuilt in the background every \
+                        CONVERSIONS_ROLLUP_INTERVAL_SECONDS for recent days.",
+    tags=["Currency Converter"]
+)
+async def get_conversion_volumes(
+    user_id: Optional[str] = Header(None),
+    group_by: Literal["pair", "user"] = "pair",
+    interval: Literal["day", "total"] = "day",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: Optional[int] = Query(None, ge=1),
+    db: Database = Depends(Database.get_database),
+    cache: Cache = Depends(Cache.get_cache),
+    exchange_rates_api_client: ExchangeRatesApiClient = Depends(
+        ExchangeRatesApiClient),
+    rate_table_store: RateTableStore = Depends(RateTableStore.get_store)
+):
+    service = CurrencyConverterService(
+        cache=cache,
+        currency_conversions_repository=CurrencyConversionsRepository(
+            db.get_db_session()),
+        exchange_rates_api_client=exchange_rates_api_client,
+        rate_table_store=rate_table_store
+    )
+
+    result = await service.get_conversion_volumes(
+        user_id,
+        group_by=group_by,
+        interval=interval,
+        start=start,
+        end=end,
+        limit=min(limit or Settings.CONVERSIONS_PAGE_DEFAULT_LIMIT,
+                  Settings.CONVERSIONS_PAGE_MAX_LIMIT)
+    )
+    if Settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(
+            content=[{"day": None, "user_id": None, **row} for row in result])
+
+    return [CurrencyConversionVolumeResponseSchema(**row) for row in result]
+
+
 @router.post(
     "/convert",
     response_model=CurrencyConversionResponseSchema,
     summary="Performs conversion between two different currencies",
     description="Enter the `source_currency_code` and `source_currency_value` \
-                         and `target_currency_code` to perform the conversion.",
+      and `target_currency_code` to perform the conversion. With an `as_of` \
+       date the conversion uses the rates stored on or before that date. A \
+     retry sent with the same `Idempotency-Key` header is answered with the \
+         first response (and an `Idempotent-Replayed` header) instead of \
+                                                  converting a second time.",
     tags=["Currency Converter"]
 )
 async def convert_currency(
     currency_conversions_request: CurrencyConversionsRequestSchema,
     user_id: str = Header(),
+    idempotency_key: Optional[str] = Header(
+        None, alias="Idempotency-Key",
+        max_length=IDEMPOTENCY_KEY_MAX_LENGTH),
+    as_of: Optional[date] = None,
     db: Database = Depends(Database.get_database),
     cache: Cache = Depends(Cache.get_cache),
     exchange_rates_api_client: ExchangeRatesApiClient = Depends(
-        ExchangeRatesApiClient)
+        ExchangeRatesApiClient),
+    rate_table_store: RateTableStore = Depends(RateTableStore.get_store),
+    rate_history_store: RateHistoryStore = Depends(RateHistoryStore.get_store),
+    currency_conversions_writer: CurrencyConversionsWriter = Depends(
+        CurrencyConversionsWriter.get_writer)
 ):
     source_currency_code = currency_conversions_request.source_currency_code
     source_currency_value = currency_conversions_request.source_currency_value
     target_currency_code = currency_conversions_request.target_currency_code
 
-    if source_currency_value < 0.1:
+    if source_currency_value < Settings.CONVERT_MIN_CURRENCY_VALUE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(InvalidCurrencyValueException(
+                source_currency_value,
+                Settings.CONVERT_MIN_CURRENCY_VALUE
+            ))
+        )
+    if as_of is not None and as_of > datetime.now(UTC).date():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="The minimum allowed value is 0.1"
+            detail=f"as_of {as_of} is in the future"
+        )
+
+    async def convert() -> Response:
+        service = CurrencyConverterService(
+            cache=cache,
+            currency_conversions_repository=CurrencyConversionsRepository(
+                db.get_db_session()),
+            exchange_rates_api_client=exchange_rates_api_client,
+            rate_table_store=rate_table_store,
+            currency_conversions_writer=currency_conversions_writer,
+            rate_history_service=RateHistoryService(
+                database=db, rate_history_store=rate_history_store)
+        )
+
+        transaction: Optional[CurrencyConversionsModel] = None
+        try:
+            transaction = await service.convert_currency_transaction(
+                source_currency_code=source_currency_code,
+                source_currency_value=source_currency_value,
+                target_currency_code=target_currency_code,
+                user_id=user_id,
+                as_of=as_of
+            )
+        except InvalidCurrencyException as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        except (CurrencyCodeDoesntExistException,
+                HistoricalRatesNotFoundException) as e:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=str(e)
+            )
+        except (ExchangeRatesUnavailableException,
+                TransactionIdsUnavailableException) as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e)
+            )
+
+        content = conversion_response_content(transaction)
+        if Settings.FAST_JSON_RESPONSES:
+            return FastJSONResponse(content=content)
+
+        return JSONResponse(content=jsonable_encoder(
+            CurrencyConversionResponseSchema(**content)))
+
+    if idempotency_key is None:
+        return await convert()
+
+    return await run_idempotent(
+        IdempotencyService(cache=cache),
+        user_id=user_id,
+        idempotency_key=idempotency_key,
+        fingerprint=IdempotencyService.fingerprint(
+            currency_conversions_request.model_dump_json(), as_of),
+        execute=convert
+    )
+
+
+@router.post(
+    "/convert/batch",
+    response_model=List[CurrencyConversionBatchItemResponseSchema],
+    summary="Performs many conversions between currencies at once",
+    description="Enter a list of conversions like the ones accepted by \
+                     `/convert`. Results and errors are returned per item, in \
+                                                      the same order as sent.",
+    tags=["Currency Converter"]
+)
+async def convert_currency_batch(
+    currency_conversions_requests: List[CurrencyConversionsRequestSchema],
+    user_id: str = Header(),
+    db: Database = Depends(Database.get_database),
+    cache: Cache = Depends(Cache.get_cache),
+    exchange_rates_api_client: ExchangeRatesApiClient = Depends(
+        ExchangeRatesApiClient),
+    rate_table_store: RateTableStore = Depends(RateTableStore.get_store),
+    rate_history_store: RateHistoryStore = Depends(RateHistoryStore.get_store),
+    currency_conversions_writer: CurrencyConversionsWriter = Depends(
+        CurrencyConversionsWriter.get_writer)
+):
+    if len(currency_conversions_requests) > Settings.CONVERT_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"The maximum allowed batch size is "
+                   f"{Settings.CONVERT_BATCH_MAX_ITEMS}"
         )
 
     service = CurrencyConverterService(
         cache=cache,
         currency_conversions_repository=CurrencyConversionsRepository(
             db.get_db_session()),
-        exchange_rates_api_client=exchange_rates_api_client
+        exchange_rates_api_client=exchange_rates_api_client,
+        rate_table_store=rate_table_store,
+        currency_conversions_writer=currency_conversions_writer,
+        rate_history_service=RateHistoryService(
+            database=db, rate_history_store=rate_history_store)
     )
 
-    transaction: Optional[CurrencyConversionsModel] = None
     try:
-        transaction = service.convert_currency_transaction(
-            source_currency_code=source_currency_code,
-            source_currency_value=source_currency_value,
-            target_currency_code=target_currency_code,
+        results = await service.convert_currency_batch(
+            currency_conversions_requests=currency_conversions_requests,
             user_id=user_id
         )
+    except (ExchangeRatesUnavailableException,
+            TransactionIdsUnavailableException) as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+
+    content = [
+        {
+            "status_code": BATCH_ERROR_STATUS_CODES[type(result)],
+            "result": None,
+            "error": str(result)
+        }
+        if isinstance(result, Exception)
+        else {
+            "status_code": status.HTTP_200_OK,
+            "result": conversion_response_content(result),
+            "error": None
+        }
+        for result in results
+    ]
+    if Settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(content=content)
+
+    return [CurrencyConversionBatchItemResponseSchema(**item) for item in content]
+
+
+@router.get(
+    "/rates/{base}",
+    response_model=CurrencyCrossRatesResponseSchema,
+    summary="Get the conversion rates from a currency",
+    description="Returns how much one unit of the `base` currency is worth in \
+                                        every other currency, from the current rates.",
+    tags=["Currency Converter"]
+)
+async def get_cross_rates(
+    base: str,
+    db: Database = Depends(Database.get_database),
+    cache: Cache = Depends(Cache.get_cache),
+    exchange_rates_api_client: ExchangeRatesApiClient = Depends(
+        ExchangeRatesApiClient),
+    rate_table_store: RateTableStore = Depends(RateTableStore.get_store),
+    rate_history_store: RateHistoryStore = Depends(RateHistoryStore.get_store)
+):
+    service = ExchangeRatesService(
+        cache=cache,
+        exchange_rates_api_client=exchange_rates_api_client,
+        rate_table_store=rate_table_store,
+        rate_history_service=RateHistoryService(
+            database=db, rate_history_store=rate_history_store)
+    )
+
+    base = base.upper()
+    try:
+        Utils.validate_currency(base)
+        result = await service.get_cross_rates_from(base)
     except InvalidCurrencyException as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -106,15 +436,55 @@ async def convert_currency(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=str(e)
         )
+    except ExchangeRatesUnavailableException as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
 
-    target_currency_value = source_currency_value * transaction.rate_value
-    return CurrencyConversionResponseSchema(
-        transaction_id=transaction.transaction_id,
-        user_id=transaction.user_id,
-        source_currency_code=transaction.source_currency_code,
-        source_currency_value=transaction.source_currency_value,
-        target_currency_code=transaction.target_currency_code,
-        target_currency_value=target_currency_value,
-        rate_value=transaction.rate_value,
-        datetime=transaction.datetime
-    )
+    if Settings.FAST_JSON_RESPONSES:
+        return FastJSONResponse(content=result.model_dump())
+
+    return result
+
+
+def conversion_response_content(
+    transaction: CurrencyConversionsModel
+) -> dict:
+    return {
+        "transaction_id": transaction.transaction_id,
+        "user_id": transaction.user_id,
+        "source_currency_code": transaction.source_currency_code,
+        "source_currency_value": transaction.source_currency_value,
+        "target_currency_code": transaction.target_currency_code,
+        "target_currency_value":
+            transaction.source_currency_value * transaction.rate_value,
+        "rate_value": transaction.rate_value,
+        "datetime": transaction.datetime
+    }
+
+
+async def run_idempotent(
+    idempotency_service: IdempotencyService,
+    user_id: str,
+    idempotency_key: str,
+    fingerprint: str,
+    execute: Callable[[], Awaitable[Response]]
+) -> Response:
+    try:
+        return await idempotency_service.run(
+            user_id=user_id,
+            idempotency_key=idempotency_key,
+            fingerprint=fingerprint,
+            execute=execute
+        )
+    except IdempotencyKeyReusedException as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    except IdempotencyKeyInProgressException as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
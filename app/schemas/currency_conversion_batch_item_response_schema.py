@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+
+from app.schemas.currency_conversion_response_schema import \
+    CurrencyConversionResponseSchema
+
+
+class CurrencyConversionBatchItemResponseSchema(BaseModel):
+    status_code: int
+    result: CurrencyConversionResponseSchema | None = None
+    error: str | None = None
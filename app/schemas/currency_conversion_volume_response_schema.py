@@ -0,0 +1,13 @@
+from datetime import date
+
+from pydantic import BaseModel
+
+
+class CurrencyConversionVolumeResponseSchema(BaseModel):
+    day: date | None = None
+    user_id: str | None = None
+    source_currency_code: str
+    target_currency_code: str
+    conversions: int
+    source_volume: float
+    target_volume: float
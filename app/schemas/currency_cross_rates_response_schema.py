@@ -0,0 +1,9 @@
+from typing import Dict
+
+from pydantic import BaseModel
+
+
+class CurrencyCrossRatesResponseSchema(BaseModel):
+    base: str
+    version: str
+    rates: Dict[str, float]
@@ -0,0 +1,159 @@
+import asyncio
+from typing import Iterable, Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.responses import JSONResponse
+
+from app.core.cache import Cache
+from app.core.logger import Logger
+from app.core.responses import FastJSONResponse
+from app.core.settings import Settings
+from app.core.utils import Utils
+from app.models.currency_conversions_model import CurrencyConversionsModel
+from app.repositories.currency_conversions_repository import \
+    CurrencyConversionsRepository
+
+
+class ConversionsHistoryCache:
+    """Pages of each user's conversions, kept serialized in Redis.
+
+    The pages of a user share one hash, with a field per order, limit and
+    cursor holding the next cursor and the JSON body, plus a version field.
+    Inserting conversions of a user bumps the version, then reads again the
+    pages the new rows land on, the first newest first pages and the last
+    oldest first ones. A page is only stored if the version did not change
+    since it was read, so a page read before an insert committed can not
+    replace the one written after it.
+    """
+
+    VERSION_FIELD = "_version"
+    CURSOR_SEPARATOR = b"|"
+
+    def __init__(
+        self,
+        cache: Cache,
+        currency_conversions_repository: CurrencyConversionsRepository
+    ):
+        self.__cache = cache
+        self.__currency_conversions_repository = currency_conversions_repository
+        self.__enabled = Settings.CONVERSIONS_CACHE_ENABLED
+        self.__key_prefix = Settings.CONVERSIONS_CACHE_KEY_PREFIX
+        self.__ttl = Settings.CONVERSIONS_CACHE_TTL_SECONDS
+
+    @staticmethod
+    def render(conversions: list[CurrencyConversionsModel]) -> bytes:
+        """Renders a page with the response class `FAST_JSON_RESPONSES`
+        picks, the one cached pages and database reads are both served
+        with."""
+        response_class = FastJSONResponse if Settings.FAST_JSON_RESPONSES \
+            else JSONResponse
+        return response_class(
+            content=[conversion.to_dict() for conversion in conversions]
+        ).body
+
+    async def get_page(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        descending: bool = False
+    ) -> tuple[Optional[bytes], Optional[str]]:
+        """Returns the serialized page and the next cursor, or no page when
+        the user has no conversions."""
+        if not self.__enabled:
+            return await self.__read_page(user_id, limit, cursor, descending)
+
+        key = self.__key(user_id)
+        field = self.__field(limit, cursor, descending)
+        stored, version = await self.__cache.get_hash_fields(
+            key, field, self.VERSION_FIELD)
+        if stored is not None:
+            return self.__unpack(stored)
+
+        body, next_cursor = await self.__read_page(
+            user_id, limit, cursor, descending)
+        if body is not None:
+            await self.__cache.set_hash_if_version(
+                key,
+                self.VERSION_FIELD,
+                int(version or 0),
+                {field: self.__pack(body, next_cursor)},
+                self.__ttl
+            )
+        return body, next_cursor
+
+    async def record(self, user_ids: Iterable[str]):
+        if not self.__enabled:
+            return
+
+        user_ids = list(set(user_ids))
+        versions = await asyncio.gather(*[
+            self.__cache.increment_hash_field(
+                self.__key(user_id), self.VERSION_FIELD, self.__ttl)
+            for user_id in user_ids
+        ])
+        for user_id, version in zip(user_ids, versions):
+            if version is None:
+                continue
+            try:
+                await self.__refresh_pages(user_id, version)
+            except SQLAlchemyError as e:
+                Logger.error(
+                    f"Error refreshing cached conversions of {user_id}: {e}")
+                await self.__cache.delete(self.__key(user_id))
+
+    async def __refresh_pages(self, user_id: str, version: int):
+        key = self.__key(user_id)
+        pages = {}
+        for field, stored in (await self.__cache.get_hash(key)).items():
+            field = field.decode()
+            if field == self.VERSION_FIELD:
+                continue
+
+            order, limit, cursor = field.split(":", 2)
+            if order == "desc" and cursor \
+                    or order == "asc" and self.__unpack(stored)[1]:
+                continue
+
+            body, next_cursor = await self.__read_page(
+                user_id, int(limit), cursor or None, order == "desc")
+            if body is not None:
+                pages[field] = self.__pack(body, next_cursor)
+
+        if pages:
+            await self.__cache.set_hash_if_version(
+                key, self.VERSION_FIELD, version, pages, self.__ttl)
+
+    async def __read_page(
+        self,
+        user_id: str,
+        limit: int,
+        cursor: Optional[str],
+        descending: bool
+    ) -> tuple[Optional[bytes], Optional[str]]:
+        conversions, next_cursor = Utils.next_page(
+            await self.__currency_conversions_repository.get_conversions_by_user(
+                user_id,
+                limit=limit + 1,
+                after=Utils.decode_cursor(cursor) if cursor else None,
+                descending=descending
+            ),
+            limit
+        )
+        if not conversions:
+            return None, None
+        return self.render(conversions), next_cursor
+
+    def __key(self, user_id: str) -> str:
+        return f"{self.__key_prefix}:{user_id}"
+
+    @staticmethod
+    def __field(limit: int, cursor: Optional[str], descending: bool) -> str:
+        return f"{'desc' if descending else 'asc'}:{limit}:{cursor or ''}"
+
+    def __pack(self, body: bytes, next_cursor: Optional[str]) -> bytes:
+        return (next_cursor or "").encode() + self.CURSOR_SEPARATOR + body
+
+    def __unpack(self, stored: bytes) -> tuple[bytes, Optional[str]]:
+        next_cursor, body = stored.split(self.CURSOR_SEPARATOR, 1)
+        return body, next_cursor.decode() or None
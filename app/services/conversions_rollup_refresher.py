@@ -0,0 +1,67 @@
+import asyncio
+from datetime import UTC, date, datetime, timedelta
+from typing import Optional
+
+from app.core.cache import Cache
+from app.core.database import Database
+from app.core.logger import Logger
+from app.core.settings import Settings
+from app.repositories.currency_conversions_repository import \
+    CurrencyConversionsRepository
+
+
+class ConversionsRollupRefresher:
+    """Rebuilds the daily conversion rollups from a background task.
+
+    Inserts never touch the rollups, so writers of the same pair do not wait
+    on each other for its row. Instead every
+    `CONVERSIONS_ROLLUP_INTERVAL_SECONDS` the rollup rows of today and of the
+    `CONVERSIONS_ROLLUP_LOOKBACK_DAYS` before it are recomputed from the
+    conversions. Workers race for a Redis lock that is left to expire, so a
+    single one refreshes per interval.
+    """
+
+    def __init__(self, cache: Cache, database: Database):
+        self.__cache = cache
+        self.__database = database
+        self.__interval = Settings.CONVERSIONS_ROLLUP_INTERVAL_SECONDS
+        self.__lookback_days = Settings.CONVERSIONS_ROLLUP_LOOKBACK_DAYS
+        self.__lock_name = Settings.CONVERSIONS_ROLLUP_LOCK_KEY
+        self.__task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.__task = asyncio.create_task(self.__run())
+
+    async def stop(self):
+        if self.__task is None:
+            return
+
+        self.__task.cancel()
+        try:
+            await self.__task
+        except asyncio.CancelledError:
+            pass
+        self.__task = None
+
+    async def refresh(self) -> bool:
+        if await self.__cache.acquire_lock(
+                self.__lock_name, self.__interval) is None:
+            return False
+
+        today = datetime.now(UTC).date()
+        await self.refresh_days(
+            today - timedelta(days=self.__lookback_days), today)
+        return True
+
+    async def refresh_days(self, first_day: date, last_day: date):
+        await CurrencyConversionsRepository(
+            self.__database.get_db_session()
+        ).refresh_rollups(first_day, last_day + timedelta(days=1))
+
+    async def __run(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                Logger.error(f"Error refreshing conversion rollups: {e}")
+            await asyncio.sleep(self.__interval)
@@ -0,0 +1,229 @@
+import asyncio
+import json
+from datetime import UTC, datetime
+from typing import Optional
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.cache import Cache
+from app.core.database import Database
+from app.core.id_allocator import IdAllocator
+from app.core.logger import Logger
+from app.core.metrics import CONVERSIONS_WRITE_FAILURES
+from app.core.settings import Settings
+from app.core.singleton import SingletonMeta
+from app.models.currency_conversions_model import CurrencyConversionsModel
+from app.repositories.currency_conversions_repository import \
+    CurrencyConversionsRepository
+from app.services.conversions_history_cache import ConversionsHistoryCache
+from app.services.conversions_rollup_refresher import \
+    ConversionsRollupRefresher
+
+
+class CurrencyConversionsWriter(metaclass=SingletonMeta):
+    """Write-behind buffer for conversion transactions.
+
+    Transactions get their id up front from an `IdAllocator` and are queued
+    in memory, a background task flushes them with one bulk insert once
+    `CONVERSIONS_WRITE_BATCH_SIZE` rows are pending or
+    `CONVERSIONS_WRITE_FLUSH_INTERVAL_SECONDS` elapsed. The queue is bounded,
+    callers wait for room when the database falls behind.
+
+    A failed flush is retried `CONVERSIONS_WRITE_RETRY_ATTEMPTS` times with
+    exponential backoff. The transactions were already acknowledged, so a
+    batch that still fails is parked in a Redis list and inserted again the
+    next time a writer starts, instead of being discarded.
+    """
+
+    def __init__(self):
+        self.__batch_size = Settings.CONVERSIONS_WRITE_BATCH_SIZE
+        self.__flush_interval = Settings.CONVERSIONS_WRITE_FLUSH_INTERVAL_SECONDS
+        self.__queue_size = Settings.CONVERSIONS_WRITE_QUEUE_SIZE
+        self.__retry_attempts = Settings.CONVERSIONS_WRITE_RETRY_ATTEMPTS
+        self.__retry_backoff = Settings.CONVERSIONS_WRITE_RETRY_BACKOFF_SECONDS
+        self.__dead_letter_key = Settings.CONVERSIONS_WRITE_DEAD_LETTER_KEY
+        self.__queue: Optional[asyncio.Queue] = None
+        self.__task: Optional[asyncio.Task] = None
+        self.__id_allocator: Optional[IdAllocator] = None
+        self.__database: Optional[Database] = None
+        self.__cache: Optional[Cache] = None
+        self.flushed = 0
+        self.flushes = 0
+        self.dead_lettered = 0
+        self.dropped = 0
+
+    @classmethod
+    def get_writer(cls):
+        return cls()
+
+    @property
+    def is_running(self) -> bool:
+        return self.__task is not None and not self.__task.done()
+
+    async def start(self, cache: Cache, database: Database):
+        self.__database = database
+        self.__cache = cache
+        self.__id_allocator = IdAllocator(
+            cache=cache,
+            key=Settings.CONVERSIONS_ID_KEY,
+            block_size=Settings.CONVERSIONS_ID_BLOCK_SIZE
+        )
+        await self.__id_allocator.raise_floor(
+            await self.__repository().get_max_transaction_id())
+
+        self.__queue = asyncio.Queue(maxsize=self.__queue_size)
+        self.__task = asyncio.create_task(self.__run())
+
+    async def stop(self):
+        if self.__task is None:
+            return
+
+        if not self.__task.done():
+            await self.__queue.put(None)
+        await self.__task
+        self.__task = None
+
+    async def add_currency_conversions(
+        self,
+        conversions: list[dict]
+    ) -> list[CurrencyConversionsModel]:
+        new_conversions = []
+        for conversion in conversions:
+            conversion = {
+                "transaction_id": await self.__id_allocator.allocate(),
+                **conversion
+            }
+            await self.__queue.put(conversion)
+            new_conversions.append(CurrencyConversionsModel(**conversion))
+
+        return new_conversions
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": self.__queue.qsize() if self.__queue else 0,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "dead_lettered": self.dead_lettered,
+            "dropped": self.dropped
+        }
+
+    async def __run(self):
+        try:
+            await self.__replay_dead_letters()
+        except Exception as e:
+            Logger.error(f"Error inserting parked currency conversions: {e}")
+
+        stopping = False
+        while not stopping:
+            batch = [await self.__queue.get()]
+            batch += await self.__collect(self.__batch_size - 1)
+
+            if None in batch:
+                stopping = True
+                batch = [row for row in batch if row is not None]
+                batch += self.__drain()
+
+            for start in range(0, len(batch), self.__batch_size):
+                rows = batch[start:start + self.__batch_size]
+                try:
+                    await self.__flush(rows)
+                except Exception as e:
+                    Logger.error(
+                        f"Error flushing {len(rows)} currency conversions: {e}")
+                    await self.__dead_letter(rows)
+
+    async def __collect(self, size: int) -> list[Optional[dict]]:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.__flush_interval
+        batch = []
+        while len(batch) < size and (not batch or batch[-1] is not None):
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.__queue.get_nowait())
+            except asyncio.QueueEmpty:
+                try:
+                    batch.append(
+                        await asyncio.wait_for(self.__queue.get(), timeout))
+                except TimeoutError:
+                    break
+
+        return batch
+
+    def __drain(self) -> list[dict]:
+        batch = []
+        while not self.__queue.empty():
+            row = self.__queue.get_nowait()
+            if row is not None:
+                batch.append(row)
+        return batch
+
+    async def __flush(self, batch: list[dict]) -> bool:
+        if not batch:
+            return True
+
+        for attempt in range(self.__retry_attempts):
+            if attempt:
+                await asyncio.sleep(self.__retry_backoff * 2 ** (attempt - 1))
+            try:
+                await self.__repository().insert_currency_conversions(batch)
+                break
+            except SQLAlchemyError as e:
+                Logger.error(
+                    f"Error flushing {len(batch)} currency conversions "
+                    f"(attempt {attempt + 1}/{self.__retry_attempts}): {e}")
+        else:
+            await self.__dead_letter(batch)
+            return False
+
+        self.flushed += len(batch)
+        self.flushes += 1
+        try:
+            await ConversionsHistoryCache(
+                cache=self.__cache,
+                currency_conversions_repository=self.__repository()
+            ).record(row["user_id"] for row in batch)
+        except Exception as e:
+            Logger.error(f"Error updating cached conversions: {e}")
+        return True
+
+    async def __dead_letter(self, batch: list[dict]):
+        rows = [json.dumps(row, default=datetime.isoformat) for row in batch]
+        if await self.__cache.push_list(self.__dead_letter_key, rows):
+            self.dead_lettered += len(batch)
+            CONVERSIONS_WRITE_FAILURES.labels(outcome="dead_lettered").inc(
+                len(batch))
+            Logger.error(
+                f"Moved {len(batch)} currency conversions to "
+                f"{self.__dead_letter_key} after every flush attempt failed")
+            return
+
+        # Last resort, the rows are logged so they can be inserted by hand
+        self.dropped += len(batch)
+        CONVERSIONS_WRITE_FAILURES.labels(outcome="dropped").inc(len(batch))
+        Logger.error(
+            f"Lost {len(batch)} currency conversions: {', '.join(rows)}")
+
+    async def __replay_dead_letters(self):
+        # Stops at the first batch failing again, it is parked once more
+        days = set()
+        while rows := await self.__cache.pop_list(
+                self.__dead_letter_key, self.__batch_size):
+            batch = [json.loads(row) for row in rows]
+            for row in batch:
+                row["datetime"] = datetime.fromisoformat(row["datetime"])
+            Logger.info(
+                f"Inserting {len(batch)} parked currency conversions again")
+            if not await self.__flush(batch):
+                break
+            days.update(row["datetime"].astimezone(UTC).date() for row in batch)
+
+        # They may be older than the days the rollups are rebuilt for
+        if days:
+            await ConversionsRollupRefresher(
+                cache=self.__cache, database=self.__database
+            ).refresh_days(min(days), max(days))
+
+    def __repository(self) -> CurrencyConversionsRepository:
+        return CurrencyConversionsRepository(self.__database.get_db_session())
@@ -1,19 +1,29 @@
-from datetime import UTC, datetime
-from typing import Optional
+import csv
+import io
+import json
+from datetime import UTC, date, datetime
+from typing import AsyncIterator, Literal, Optional, Sequence
+
+from sqlalchemy import Row
 
 from app.api_clients.exchange_rates_api_client import ExchangeRatesApiClient
 from app.core.cache import Cache
-from app.core.logger import Logger
+from app.core.rate_table import RateTableStore
 from app.core.settings import Settings
 from app.core.utils import Utils
-from app.exceptions.currency_code_doesnt_exist_exception import \
-    CurrencyCodeDoesntExistException
 from app.exceptions.invalid_currency_exception import InvalidCurrencyException
+from app.exceptions.invalid_currency_value_exception import \
+    InvalidCurrencyValueException
 from app.models.currency_conversions_model import CurrencyConversionsModel
 from app.repositories.currency_conversions_repository import \
     CurrencyConversionsRepository
-from app.schemas.currency_conversion_rates_schema import \
-    CurrencyConversionRatesSchema
+from app.schemas.currency_conversions_request_schema import \
+    CurrencyConversionsRequestSchema
+from app.services.conversions_history_cache import ConversionsHistoryCache
+from app.services.currency_conversions_writer import \
+    CurrencyConversionsWriter
+from app.services.exchange_rates_service import ExchangeRatesService
+from app.services.rate_history_service import RateHistoryService
 
 
 class CurrencyConverterService:
@@ -21,106 +31,225 @@ class CurrencyConverterService:
         self,
         cache: Cache,
         exchange_rates_api_client: ExchangeRatesApiClient,
-        currency_conversions_repository: CurrencyConversionsRepository
+        currency_conversions_repository: CurrencyConversionsRepository,
+        rate_table_store: RateTableStore,
+        currency_conversions_writer: Optional[CurrencyConversionsWriter] = None,
+        rate_history_service: Optional[RateHistoryService] = None
     ):
-        self.__cache = cache
-        self.__rate_key_prefix = Settings.CACHE_RATE_KEY_PREFIX
-        self.__exchange_rates_api_client = exchange_rates_api_client
+        self.__exchange_rates_service = ExchangeRatesService(
+            cache=cache,
+            exchange_rates_api_client=exchange_rates_api_client,
+            rate_table_store=rate_table_store,
+            rate_history_service=rate_history_service
+        )
+        self.__conversions_history_cache = ConversionsHistoryCache(
+            cache=cache,
+            currency_conversions_repository=currency_conversions_repository
+        )
+        self.__rate_history_service = rate_history_service
         self.__currency_conversions_repository = currency_conversions_repository
+        self.__currency_conversions_writer = currency_conversions_writer
 
-    def get_conversions(
+    async def get_conversions(
         self,
-        user_id:
-        Optional[str]
-    ) -> list[CurrencyConversionsModel]:
-        return (self.__currency_conversions_repository.list_all_conversions()
-                if user_id is None
-                else self.__currency_conversions_repository.get_conversions_by_user(user_id))
-
-    def convert_currency_transaction(
+        user_id: Optional[str],
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        descending: bool = False
+    ) -> tuple[list[CurrencyConversionsModel], Optional[str]]:
+        page = {
+            "limit": limit + 1,
+            "after": Utils.decode_cursor(cursor) if cursor else None,
+            "start": start,
+            "end": end,
+            "descending": descending
+        }
+        conversions = await (
+            self.__currency_conversions_repository.list_all_conversions(**page)
+            if user_id is None
+            else self.__currency_conversions_repository.get_conversions_by_user(
+                user_id, **page)
+        )
+        return Utils.next_page(conversions, limit)
+
+    async def get_serialized_conversions(
+        self,
+        user_id: str,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        descending: bool = False
+    ) -> tuple[Optional[bytes], Optional[str]]:
+        return await self.__conversions_history_cache.get_page(
+            user_id, limit, cursor=cursor, descending=descending)
+
+    async def export_conversions(
+        self,
+        user_id: Optional[str],
+        export_format: Literal["ndjson", "csv"],
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> AsyncIterator[str]:
+        format_rows = self.__format_ndjson_rows
+        if export_format == "csv":
+            format_rows = self.__format_csv_rows
+            yield format_rows([CurrencyConversionsModel.__table__.columns.keys()])
+
+        async for rows in self.__currency_conversions_repository.stream_conversions(
+            user_id=user_id,
+            start=start,
+            end=end,
+            chunk_size=Settings.CONVERSIONS_EXPORT_CHUNK_SIZE
+        ):
+            yield format_rows(rows)
+
+    async def get_conversion_volumes(
+        self,
+        user_id: Optional[str],
+        group_by: Literal["pair", "user"] = "pair",
+        interval: Literal["day", "total"] = "day",
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        limit: int = 100
+    ) -> list[dict]:
+        rows = await self.__currency_conversions_repository.get_conversion_volumes(
+            group_by_user=group_by == "user",
+            daily=interval == "day",
+            user_id=user_id,
+            start=start,
+            end=end,
+            limit=limit
+        )
+        return [row._asdict() for row in rows]
+
+    async def convert_currency_transaction(
         self,
         source_currency_code: str,
         source_currency_value: float,
         target_currency_code: str,
-        user_id: str
+        user_id: str,
+        as_of: Optional[date] = None
     ) -> CurrencyConversionsModel:
         source_currency_code, target_currency_code = \
             source_currency_code.upper(), target_currency_code.upper()
         Utils.validate_currency(source_currency_code)
         Utils.validate_currency(target_currency_code)
 
-        conversion_rates = self.__fetch_and_validate_rates(
-            source_currency_code,
-            target_currency_code
-        )
-        rate_value = self.__calculate_conversion_rate(
-            conversion_rates,
-            source_currency_code,
-            target_currency_code
-        )
-
-        return self.__currency_conversions_repository.add_currency_conversion(
-            user_id=user_id,
-            source_currency_code=source_currency_code,
-            source_currency_value=source_currency_value,
-            target_currency_code=target_currency_code,
-            rate_value=rate_value,
-            datetime=datetime.now(UTC)
-        )
+        if as_of is not None:
+            rate_value = await self.__rate_history_service.get_cross_rate(
+                source_currency_code,
+                target_currency_code,
+                as_of
+            )
+        else:
+            rate_value = await self.__exchange_rates_service.get_cross_rate(
+                source_currency_code,
+                target_currency_code
+            )
 
-    def __fetch_and_validate_rates(
+        new_conversion = {
+            "user_id": user_id,
+            "source_currency_code": source_currency_code,
+            "source_currency_value": source_currency_value,
+            "target_currency_code": target_currency_code,
+            "rate_value": rate_value,
+            "datetime": datetime.now(UTC)
+        }
+        if self.__is_write_behind():
+            return (await self.__currency_conversions_writer.add_currency_conversions(
+                [new_conversion]))[0]
+
+        transaction = await \
+            self.__currency_conversions_repository.add_currency_conversion(
+                **new_conversion)
+        await self.__conversions_history_cache.record([user_id])
+        return transaction
+
+    async def convert_currency_batch(
         self,
-        *currency_codes: str
-    ) -> CurrencyConversionRatesSchema:
-        Logger.info(
-            f"Fetching currency conversion rates from API for currencies: {
-                currency_codes}"
+        currency_conversions_requests: list[CurrencyConversionsRequestSchema],
+        user_id: str
+    ) -> list[CurrencyConversionsModel | Exception]:
+        results: list[CurrencyConversionsModel | Exception] = \
+            [None] * len(currency_conversions_requests)
+        currency_pairs: dict[int, tuple[str, str]] = {}
+
+        for index, request in enumerate(currency_conversions_requests):
+            try:
+                currency_pairs[index] = \
+                    self.__validate_conversion_request(request)
+            except (InvalidCurrencyException, InvalidCurrencyValueException) as e:
+                results[index] = e
+
+        if not currency_pairs:
+            return results
+
+        rate_values = await self.__exchange_rates_service.get_cross_rates(
+            set(currency_pairs.values()))
+
+        now = datetime.now(UTC)
+        new_conversions: dict[int, dict] = {}
+        for index, currency_pair in currency_pairs.items():
+            rate_value = rate_values[currency_pair]
+            if isinstance(rate_value, Exception):
+                results[index] = rate_value
+                continue
+
+            new_conversions[index] = {
+                "user_id": user_id,
+                "source_currency_code": currency_pair[0],
+                "source_currency_value":
+                    currency_conversions_requests[index].source_currency_value,
+                "target_currency_code": currency_pair[1],
+                "rate_value": rate_value,
+                "datetime": now
+            }
+
+        transactions = await (
+            self.__currency_conversions_writer.add_currency_conversions
+            if self.__is_write_behind()
+            else self.__currency_conversions_repository.add_currency_conversions
+        )(list(new_conversions.values()))
+        for index, transaction in zip(new_conversions, transactions):
+            results[index] = transaction
+
+        if not self.__is_write_behind():
+            await self.__conversions_history_cache.record([user_id])
+
+        return results
+
+    @staticmethod
+    def __format_ndjson_rows(rows: Sequence[Row]) -> str:
+        return "".join(
+            json.dumps({**row._asdict(), "datetime": str(row.datetime)}) + "\n"
+            for row in rows
         )
-        result = CurrencyConversionRatesSchema()
-        all_conversion_rates = None
-
-        for currency_code in currency_codes:
-            cached_rate = self.__cache.get(
-                f"{self.__rate_key_prefix}{currency_code}"
-            )
-
-            if cached_rate:
-                result.rates[currency_code] = float(cached_rate)
-            else:
-                all_conversion_rates = all_conversion_rates \
-                    or self.__exchange_rates_api_client.fetch_all_conversion_rates()
-                rate = all_conversion_rates.rates.get(currency_code)
 
-                if rate is None:
-                    raise CurrencyCodeDoesntExistException(currency_code)
+    @staticmethod
+    def __format_csv_rows(rows: Sequence[Sequence]) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
 
-                result.rates[currency_code] = rate
-                self.__cache_rates(all_conversion_rates)
+    def __is_write_behind(self) -> bool:
+        return self.__currency_conversions_writer is not None \
+            and self.__currency_conversions_writer.is_running
 
-        return result
-
-    def __cache_rates(self, conversion_rates: CurrencyConversionRatesSchema):
-        Logger.info("Saving currency conversion rates data in cache")
-        exp_seconds = int(Utils.seconds_until_next_day())
+    def __validate_conversion_request(
+        self,
+        request: CurrencyConversionsRequestSchema
+    ) -> tuple[str, str]:
+        if request.source_currency_value < Settings.CONVERT_MIN_CURRENCY_VALUE:
+            raise InvalidCurrencyValueException(
+                request.source_currency_value,
+                Settings.CONVERT_MIN_CURRENCY_VALUE
+            )
 
-        for code, rate in conversion_rates.rates.items():
-            if not self.__cache.set(key=f"{self.__rate_key_prefix}{code}", value=rate, exp_seconds=exp_seconds):
-                break
+        source_currency_code, target_currency_code = \
+            request.source_currency_code.upper(), \
+            request.target_currency_code.upper()
+        Utils.validate_currency(source_currency_code)
+        Utils.validate_currency(target_currency_code)
 
-    def __calculate_conversion_rate(
-        self,
-        conversion_rates: CurrencyConversionRatesSchema,
-        source_currency_code: str,
-        target_currency_code: str
-    ) -> float:
-        source_rate = conversion_rates.rates.get(source_currency_code)
-        target_rate = conversion_rates.rates.get(target_currency_code)
-
-        if not source_rate or not target_rate:
-            raise InvalidCurrencyException(
-                source_currency_code if not source_rate else target_currency_code)
-
-        try:
-            return target_rate / source_rate
-        except ZeroDivisionError:
-            raise InvalidCurrencyException(source_currency_code, source_rate)
+        return source_currency_code, target_currency_code
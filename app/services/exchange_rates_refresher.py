@@ -0,0 +1,72 @@
+import asyncio
+from random import uniform
+from typing import Optional
+
+from app.core.logger import Logger
+from app.core.rate_table import RateTableStore
+from app.core.settings import Settings
+from app.core.utils import Utils
+from app.services.exchange_rates_service import ExchangeRatesService
+
+
+class ExchangeRatesRefresher:
+    """Keeps the worker rate table fresh from a background task.
+
+    Refreshes right away on start, then every `RATE_REFRESH_INTERVAL_SECONDS`
+    and just after the daily cache rollover, both spread by a random jitter so
+    workers do not hit Redis and the upstream API at the same instant. Requests
+    that find an expired table can wake it up through `RateTableStore`.
+    """
+
+    def __init__(
+        self,
+        exchange_rates_service: ExchangeRatesService,
+        rate_table_store: RateTableStore
+    ):
+        self.__exchange_rates_service = exchange_rates_service
+        self.__rate_table_store = rate_table_store
+        self.__interval = Settings.RATE_REFRESH_INTERVAL_SECONDS
+        self.__jitter = Settings.RATE_REFRESH_JITTER_SECONDS
+        self.__retry = Settings.RATE_REFRESH_RETRY_SECONDS
+        self.__wake_up: Optional[asyncio.Event] = None
+        self.__task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.__wake_up = asyncio.Event()
+        self.__rate_table_store.set_refresh_trigger(self.__wake_up.set)
+        self.__task = asyncio.create_task(self.__run())
+
+    async def stop(self):
+        self.__rate_table_store.set_refresh_trigger(None)
+        if self.__task is None:
+            return
+
+        self.__task.cancel()
+        try:
+            await self.__task
+        except asyncio.CancelledError:
+            pass
+        self.__task = None
+
+    def next_delay(self) -> float:
+        jitter = uniform(0, self.__jitter)
+        return min(
+            self.__interval - jitter,
+            Utils.seconds_until_next_day() + jitter
+        )
+
+    async def __run(self):
+        delay = 0.0
+        while True:
+            try:
+                await asyncio.wait_for(self.__wake_up.wait(), timeout=delay)
+            except TimeoutError:
+                pass
+            self.__wake_up.clear()
+
+            try:
+                await self.__exchange_rates_service.refresh_rates()
+                delay = self.next_delay()
+            except Exception as e:
+                Logger.error(f"Error refreshing conversion rates: {e}")
+                delay = self.__retry
@@ -0,0 +1,315 @@
+import asyncio
+from math import isnan
+from time import monotonic, time
+from typing import Iterable, Optional
+
+from app.api_clients.exchange_rates_api_client import ExchangeRatesApiClient
+from app.core.cache import Cache
+from app.core.http_circuit_breaker import HttpCircuitBreaker
+from app.core.logger import Logger
+from app.core.rate_table import RateTable, RateTableStore
+from app.core.settings import Settings
+from app.core.utils import Utils
+from app.exceptions.currency_code_doesnt_exist_exception import \
+    CurrencyCodeDoesntExistException
+from app.exceptions.exchange_rates_unavailable_exception import \
+    ExchangeRatesUnavailableException
+from app.exceptions.invalid_currency_exception import InvalidCurrencyException
+from app.schemas.currency_conversion_rates_schema import \
+    CurrencyConversionRatesSchema
+from app.schemas.currency_cross_rates_response_schema import \
+    CurrencyCrossRatesResponseSchema
+from app.services.rate_history_service import RateHistoryService
+
+
+class ExchangeRatesService:
+    RATE_TABLE_META_PREFIX = "_"
+    RATE_TABLE_VERSION_FIELD = "_version"
+    RATE_TABLE_BASE_FIELD = "_base"
+    RATE_TABLE_DATE_FIELD = "_date"
+    RATE_TABLE_TIMESTAMP_FIELD = "_timestamp"
+    RATE_TABLE_REFRESHED_AT_FIELD = "_refreshed_at"
+
+    def __init__(
+        self,
+        cache: Cache,
+        exchange_rates_api_client: ExchangeRatesApiClient,
+        rate_table_store: RateTableStore,
+        rate_history_service: Optional[RateHistoryService] = None
+    ):
+        self.__cache = cache
+        self.__rate_table_key = Settings.CACHE_RATE_TABLE_KEY
+        self.__snapshot_ttl = Settings.RATE_TABLE_SNAPSHOT_TTL_SECONDS
+        self.__max_staleness = Settings.RATE_TABLE_MAX_STALENESS_SECONDS
+        self.__refresh_interval = Settings.RATE_REFRESH_INTERVAL_SECONDS
+        self.__refresh_lock_key = Settings.RATE_REFRESH_LOCK_KEY
+        self.__refresh_lock_timeout = \
+            Settings.RATE_REFRESH_LOCK_TIMEOUT_SECONDS
+        self.__refresh_wait = Settings.RATE_REFRESH_WAIT_SECONDS
+        self.__refresh_poll_interval = \
+            Settings.RATE_REFRESH_POLL_INTERVAL_SECONDS
+        self.__rate_table_store = rate_table_store
+        self.__rate_history_service = rate_history_service
+        self.__exchange_rates_api_client = exchange_rates_api_client
+
+    async def get_rates(
+        self,
+        *currency_codes: str
+    ) -> CurrencyConversionRatesSchema:
+        result = await self.get_available_rates(*currency_codes)
+
+        for currency_code in currency_codes:
+            if currency_code not in result.rates:
+                raise CurrencyCodeDoesntExistException(currency_code)
+
+        return result
+
+    async def get_available_rates(
+        self,
+        *currency_codes: str
+    ) -> CurrencyConversionRatesSchema:
+        rate_table = await self.__get_rate_table()
+        return CurrencyConversionRatesSchema(
+            base=rate_table.base,
+            rates={
+                currency_code: rate_table.rates[currency_code]
+                for currency_code in currency_codes
+                if currency_code in rate_table.rates
+            }
+        )
+
+    async def get_cross_rate(
+        self,
+        source_currency_code: str,
+        target_currency_code: str
+    ) -> float:
+        rate_table = await self.__get_rate_table()
+        self.__validate_cross_rate_codes(
+            rate_table, source_currency_code, target_currency_code)
+
+        cross_rate = rate_table.cross_rate(
+            source_currency_code, target_currency_code)
+        if isnan(cross_rate):
+            raise self.__unusable_rate_error(
+                rate_table, source_currency_code, target_currency_code)
+        return cross_rate
+
+    async def get_cross_rates(
+        self,
+        currency_pairs: Iterable[tuple[str, str]]
+    ) -> dict[tuple[str, str], float | Exception]:
+        rate_table = await self.__get_rate_table()
+
+        cross_rates: dict[tuple[str, str], float | Exception] = {}
+        known_pairs = []
+        for currency_pair in currency_pairs:
+            try:
+                self.__validate_cross_rate_codes(rate_table, *currency_pair)
+                known_pairs.append(currency_pair)
+            except CurrencyCodeDoesntExistException as e:
+                cross_rates[currency_pair] = e
+
+        for currency_pair, cross_rate in zip(
+            known_pairs,
+            rate_table.cross_rates_between(known_pairs).tolist()
+        ):
+            cross_rates[currency_pair] = cross_rate if not isnan(cross_rate) \
+                else self.__unusable_rate_error(rate_table, *currency_pair)
+
+        return cross_rates
+
+    async def get_cross_rates_from(
+        self,
+        base_currency_code: str
+    ) -> CurrencyCrossRatesResponseSchema:
+        rate_table = await self.__get_rate_table()
+        self.__validate_cross_rate_codes(rate_table, base_currency_code)
+
+        rates = rate_table.cross_rates_from(base_currency_code)
+        if not rates:
+            raise InvalidCurrencyException(
+                base_currency_code, rate_table.rates[base_currency_code])
+        return CurrencyCrossRatesResponseSchema(
+            base=base_currency_code,
+            version=rate_table.version,
+            rates=rates
+        )
+
+    async def refresh_rates(self) -> RateTable:
+        return await self.__rate_table_store.refresh(
+            lambda: self.__refresh_rate_table(
+                max_age_seconds=self.__refresh_interval / 2)
+        )
+
+    @staticmethod
+    def __validate_cross_rate_codes(
+        rate_table: RateTable,
+        *currency_codes: str
+    ):
+        for currency_code in currency_codes:
+            if currency_code not in rate_table.codes:
+                raise CurrencyCodeDoesntExistException(currency_code)
+
+    @staticmethod
+    def __unusable_rate_error(
+        rate_table: RateTable,
+        source_currency_code: str,
+        target_currency_code: str
+    ) -> InvalidCurrencyException:
+        source_rate = rate_table.rates[source_currency_code]
+        if isnan(rate_table.cross_rate(source_currency_code,
+                                       source_currency_code)):
+            return InvalidCurrencyException(source_currency_code, source_rate)
+        return InvalidCurrencyException(
+            target_currency_code, rate_table.rates[target_currency_code])
+
+    async def __get_rate_table(self) -> RateTable:
+        rate_table = self.__rate_table_store.get_fresh_table()
+        if rate_table is not None:
+            return rate_table
+
+        rate_table = await self.__load_cached_rate_table()
+        if rate_table is not None:
+            return rate_table
+
+        stale_table = self.__rate_table_store.get_stale_table(
+            self.__max_staleness)
+        if stale_table is not None and (
+            self.__rate_table_store.is_refreshing
+            or HttpCircuitBreaker.is_open()
+            or self.__rate_table_store.request_refresh()
+        ):
+            return self.__rate_table_store.serve_stale(stale_table)
+
+        try:
+            return await self.__rate_table_store.refresh(
+                self.__refresh_rate_table)
+        except ExchangeRatesUnavailableException:
+            if stale_table is None:
+                raise
+            return self.__rate_table_store.serve_stale(stale_table)
+
+    async def __refresh_rate_table(
+        self,
+        max_age_seconds: Optional[float] = None
+    ) -> RateTable:
+        lock = await self.__cache.acquire_lock(
+            self.__refresh_lock_key, self.__refresh_lock_timeout)
+        if lock is None:
+            rate_table = await self.__wait_for_cached_rate_table()
+            if rate_table is not None:
+                return rate_table
+
+        try:
+            rate_table = await self.__load_cached_rate_table(
+                max_age_seconds)
+            if rate_table is not None:
+                return rate_table
+
+            Logger.info("Fetching currency conversion rates from API")
+            all_conversion_rates = await \
+                self.__exchange_rates_api_client.fetch_all_conversion_rates()
+            if all_conversion_rates is None:
+                raise ExchangeRatesUnavailableException()
+
+            await self.__cache_rates(all_conversion_rates)
+            if self.__rate_history_service is not None:
+                await self.__rate_history_service.record_rates(
+                    all_conversion_rates)
+            return self.__rate_table_store.publish(
+                RateTable.from_schema(
+                    all_conversion_rates, self.__snapshot_ttl)
+            )
+        finally:
+            if lock is not None:
+                await self.__cache.release_lock(lock)
+
+    async def __wait_for_cached_rate_table(self) -> Optional[RateTable]:
+        Logger.info("Waiting for another worker to refresh conversion rates")
+        deadline = monotonic() + self.__refresh_wait
+        while monotonic() < deadline:
+            await asyncio.sleep(self.__refresh_poll_interval)
+            rate_table = await self.__load_cached_rate_table()
+            if rate_table is not None \
+                    or not await self.__cache.is_locked(
+                        self.__refresh_lock_key):
+                return rate_table
+
+        return None
+
+    async def __load_cached_rate_table(
+        self,
+        max_age_seconds: Optional[float] = None
+    ) -> Optional[RateTable]:
+        cached_version, cached_refreshed_at = \
+            await self.__cache.get_hash_fields(
+                self.__rate_table_key,
+                self.RATE_TABLE_VERSION_FIELD,
+                self.RATE_TABLE_REFRESHED_AT_FIELD
+            )
+        if not cached_version:
+            return None
+
+        if max_age_seconds is not None and (
+            not cached_refreshed_at
+            or time() - float(cached_refreshed_at) > max_age_seconds
+        ):
+            return None
+
+        current_table = self.__rate_table_store.table
+        if current_table is not None \
+                and current_table.version == cached_version.decode():
+            return self.__rate_table_store.renew(self.__snapshot_ttl)
+
+        cached_table = await self.__cache.get_hash(self.__rate_table_key)
+        if not cached_table:
+            return None
+
+        Logger.info("Loading currency conversion rates snapshot from cache")
+        fields = {
+            field.decode(): value.decode()
+            for field, value in cached_table.items()
+        }
+        return self.__rate_table_store.publish(
+            RateTable.from_schema(
+                CurrencyConversionRatesSchema(
+                    timestamp=fields.get(self.RATE_TABLE_TIMESTAMP_FIELD),
+                    base=fields.get(self.RATE_TABLE_BASE_FIELD),
+                    date=fields.get(self.RATE_TABLE_DATE_FIELD),
+                    rates={
+                        code: float(rate) for code, rate in fields.items()
+                        if not code.startswith(self.RATE_TABLE_META_PREFIX)
+                    }
+                ),
+                self.__snapshot_ttl
+            )
+        )
+
+    async def __cache_rates(
+        self,
+        conversion_rates: CurrencyConversionRatesSchema
+    ):
+        Logger.info("Saving currency conversion rates data in cache")
+        exp_seconds = int(Utils.seconds_until_next_day())
+
+        metadata = {
+            self.RATE_TABLE_VERSION_FIELD:
+                RateTable.version_of(conversion_rates),
+            self.RATE_TABLE_BASE_FIELD: conversion_rates.base,
+            self.RATE_TABLE_DATE_FIELD: conversion_rates.date,
+            self.RATE_TABLE_TIMESTAMP_FIELD: conversion_rates.timestamp,
+            self.RATE_TABLE_REFRESHED_AT_FIELD: time()
+        }
+        mapping = {
+            **{
+                field: value for field, value in metadata.items()
+                if value is not None
+            },
+            **conversion_rates.rates
+        }
+        if not await self.__cache.set_hash(
+            key=self.__rate_table_key,
+            mapping=mapping,
+            exp_seconds=exp_seconds
+        ):
+            Logger.error("Could not save currency conversion rates in cache")
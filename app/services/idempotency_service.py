@@ -0,0 +1,155 @@
+import asyncio
+import hashlib
+from time import monotonic
+from typing import Awaitable, Callable, Optional
+
+from starlette.responses import Response
+
+from app.core.cache import Cache
+from app.core.logger import Logger
+from app.core.settings import Settings
+from app.core.single_flight import SingleFlight
+from app.exceptions.idempotency_key_in_progress_exception import \
+    IdempotencyKeyInProgressException
+from app.exceptions.idempotency_key_reused_exception import \
+    IdempotencyKeyReusedException
+
+
+class IdempotencyService:
+    """Runs a request once per idempotency key and replays its response.
+
+    The first successful response is stored in Redis for
+    IDEMPOTENCY_TTL_SECONDS, together with a fingerprint of the request it
+    answered. Duplicates arriving while it is still in flight wait for it,
+    in the same worker on a single flight and across workers on a Redis lock.
+    """
+
+    REPLAYED_HEADER = "Idempotent-Replayed"
+    FINGERPRINT_FIELD = "fingerprint"
+    STATUS_CODE_FIELD = "status_code"
+    MEDIA_TYPE_FIELD = "media_type"
+    BODY_FIELD = "body"
+
+    _flight: SingleFlight[Response] = SingleFlight()
+
+    def __init__(self, cache: Cache):
+        self.__cache = cache
+        self.__key_prefix = Settings.IDEMPOTENCY_KEY_PREFIX
+        self.__ttl = Settings.IDEMPOTENCY_TTL_SECONDS
+        self.__lock_timeout = Settings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS
+        self.__wait = Settings.IDEMPOTENCY_WAIT_SECONDS
+        self.__poll_interval = Settings.IDEMPOTENCY_POLL_INTERVAL_SECONDS
+
+    @staticmethod
+    def fingerprint(*parts: object) -> str:
+        return hashlib.sha256(
+            "\x1f".join(map(str, parts)).encode()).hexdigest()
+
+    async def run(
+        self,
+        user_id: str,
+        idempotency_key: str,
+        fingerprint: str,
+        execute: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        key = f"{self.__key_prefix}:{user_id}:{idempotency_key}"
+        stored = await self.__load_response(key, idempotency_key, fingerprint)
+        if stored is not None:
+            return stored
+
+        response, shared = await self._flight.do(
+            (key, fingerprint),
+            lambda: self.__run_once(key, idempotency_key, fingerprint, execute)
+        )
+        if shared:
+            return self.__replay(
+                response.status_code, response.media_type, response.body)
+        return response
+
+    async def __run_once(
+        self,
+        key: str,
+        idempotency_key: str,
+        fingerprint: str,
+        execute: Callable[[], Awaitable[Response]]
+    ) -> Response:
+        lock_key = f"{key}:lock"
+        lock = await self.__cache.acquire_lock(lock_key, self.__lock_timeout)
+        if lock is None:
+            stored = await self.__wait_for_response(
+                key, lock_key, idempotency_key, fingerprint)
+            if stored is not None:
+                return stored
+            if await self.__cache.is_locked(lock_key):
+                raise IdempotencyKeyInProgressException(idempotency_key)
+
+        try:
+            stored = await self.__load_response(
+                key, idempotency_key, fingerprint)
+            if stored is not None:
+                return stored
+
+            response = await execute()
+            if 200 <= response.status_code < 300:
+                await self.__cache.set_hash(key, {
+                    self.FINGERPRINT_FIELD: fingerprint,
+                    self.STATUS_CODE_FIELD: response.status_code,
+                    self.MEDIA_TYPE_FIELD: response.media_type or "",
+                    self.BODY_FIELD: response.body
+                }, exp_seconds=self.__ttl)
+            return response
+        finally:
+            if lock is not None:
+                await self.__cache.release_lock(lock)
+
+    async def __wait_for_response(
+        self,
+        key: str,
+        lock_key: str,
+        idempotency_key: str,
+        fingerprint: str
+    ) -> Optional[Response]:
+        Logger.info(f"Waiting for the request with idempotency key "
+                    f"{idempotency_key} in progress")
+        deadline = monotonic() + self.__wait
+        while monotonic() < deadline:
+            await asyncio.sleep(self.__poll_interval)
+            stored = await self.__load_response(
+                key, idempotency_key, fingerprint)
+            if stored is not None \
+                    or not await self.__cache.is_locked(lock_key):
+                return stored
+
+        return None
+
+    async def __load_response(
+        self,
+        key: str,
+        idempotency_key: str,
+        fingerprint: str
+    ) -> Optional[Response]:
+        stored = await self.__cache.get_hash(key)
+        if not stored:
+            return None
+
+        if stored[self.FINGERPRINT_FIELD.encode()].decode() != fingerprint:
+            raise IdempotencyKeyReusedException(idempotency_key)
+
+        return self.__replay(
+            int(stored[self.STATUS_CODE_FIELD.encode()]),
+            stored[self.MEDIA_TYPE_FIELD.encode()].decode() or None,
+            stored[self.BODY_FIELD.encode()]
+        )
+
+    def __replay(
+        self,
+        status_code: int,
+        media_type: Optional[str],
+        body: bytes
+    ) -> Response:
+        return Response(
+            content=body,
+            status_code=status_code,
+            media_type=media_type,
+            headers={self.REPLAYED_HEADER: "true"}
+        )
@@ -0,0 +1,105 @@
+from datetime import UTC, date, datetime
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.core.database import Database
+from app.core.logger import Logger
+from app.core.rate_history import HistoricalRates, RateHistoryStore
+from app.core.rate_table import RateTable
+from app.core.settings import Settings
+from app.exceptions.currency_code_doesnt_exist_exception import \
+    CurrencyCodeDoesntExistException
+from app.exceptions.historical_rates_not_found_exception import \
+    HistoricalRatesNotFoundException
+from app.exceptions.invalid_currency_exception import InvalidCurrencyException
+from app.repositories.exchange_rates_history_repository import \
+    ExchangeRatesHistoryRepository
+from app.schemas.currency_conversion_rates_schema import \
+    CurrencyConversionRatesSchema
+
+
+class RateHistoryService:
+    def __init__(
+        self,
+        database: Database,
+        rate_history_store: RateHistoryStore
+    ):
+        self.__database = database
+        self.__rate_history_store = rate_history_store
+        self.__sync_interval = Settings.RATE_HISTORY_SYNC_INTERVAL_SECONDS
+
+    async def record_rates(
+        self,
+        conversion_rates: CurrencyConversionRatesSchema
+    ):
+        rates_date = date.fromisoformat(conversion_rates.date) \
+            if conversion_rates.date else datetime.now(UTC).date()
+        codes = list(conversion_rates.rates)
+        historical_rates = HistoricalRates.unpack(
+            rates_date=rates_date,
+            base=conversion_rates.base,
+            version=RateTable.version_of(conversion_rates),
+            codes=self.__rate_history_store.codes_of(codes),
+            packed_rates=HistoricalRates.pack(
+                list(conversion_rates.rates.values()))
+        )
+
+        try:
+            await self.__repository().save_rates(
+                date=historical_rates.date,
+                base=historical_rates.base,
+                version=historical_rates.version,
+                codes=",".join(codes),
+                rates=historical_rates.rates.tobytes()
+            )
+        except SQLAlchemyError as e:
+            Logger.error(f"Error saving conversion rates of {rates_date}: {e}")
+            return
+
+        self.__rate_history_store.add(historical_rates)
+
+    async def get_cross_rate(
+        self,
+        source_currency_code: str,
+        target_currency_code: str,
+        as_of: date
+    ) -> float:
+        historical_rates = await self.get_rates_on(as_of)
+
+        for currency_code in (source_currency_code, target_currency_code):
+            if currency_code not in historical_rates.codes:
+                raise CurrencyCodeDoesntExistException(currency_code)
+
+            rate = float(
+                historical_rates.rates[historical_rates.codes[currency_code]])
+            if not rate > 0:
+                raise InvalidCurrencyException(currency_code, rate)
+
+        return historical_rates.cross_rate(
+            source_currency_code, target_currency_code)
+
+    async def get_rates_on(self, as_of: date) -> HistoricalRates:
+        if self.__rate_history_store.needs_sync(as_of, self.__sync_interval):
+            try:
+                await self.__rate_history_store.sync(self.__sync)
+            except SQLAlchemyError as e:
+                Logger.error(f"Error loading historical conversion rates: {e}")
+
+        historical_rates = self.__rate_history_store.get_rates_on(as_of)
+        if historical_rates is None:
+            raise HistoricalRatesNotFoundException(as_of)
+        return historical_rates
+
+    async def __sync(self):
+        for row in await self.__repository().get_rates_since(
+                self.__rate_history_store.latest_date):
+            self.__rate_history_store.add(HistoricalRates.unpack(
+                rates_date=row.date,
+                base=row.base,
+                version=row.version,
+                codes=self.__rate_history_store.codes_of(row.codes.split(",")),
+                packed_rates=row.rates
+            ))
+
+    def __repository(self) -> ExchangeRatesHistoryRepository:
+        return ExchangeRatesHistoryRepository(self.__database.get_db_session())
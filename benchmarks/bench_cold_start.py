@@ -0,0 +1,127 @@
+"""Import time and time to first request of a freshly started API process.
+
+Each run starts a new interpreter: `import_ms` is how long `import app.main`
+takes, `ready_ms` the time from spawning `uvicorn app.main:app` until the
+healthcheck first answers 200, and `first_request_ms` the latency of the
+first GET /v1/conversions that follows, which pays for whatever resources
+are still built lazily. Medians over `--runs` runs are printed, with the
+slowest imports by cumulative time (`python -X importtime`).
+
+Usage: python -m benchmarks.bench_cold_start --runs 5
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+from statistics import median
+from time import perf_counter, sleep
+
+import httpx
+
+IMPORT_SCRIPT = """
+from time import perf_counter
+start = perf_counter()
+import app.main
+print((perf_counter() - start) * 1000)
+"""
+
+
+def environment(database_path: str) -> dict[str, str]:
+    return os.environ | {
+        "DATABASE_URL": f"sqlite:///{database_path}",
+        "API_URL": "http://localhost/v1/latest",
+        "API_ACCESS_KEY": "benchmark",
+        "LOKI_URL": "http://127.0.0.1:9",
+        "LOKI_USER": "admin",
+        "LOKI_PASSWORD": "admin",
+        "RATE_REFRESHER_ENABLED": "false"
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def import_time(env: dict[str, str]) -> float:
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        env=env, capture_output=True, check=True, text=True
+    )
+    return float(result.stdout)
+
+
+def startup_times(env: dict[str, str]) -> tuple[float, float]:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}/api"
+    start = perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app",
+         "--port", str(port), "--log-level", "warning"],
+        env=env
+    )
+
+    try:
+        with httpx.Client(base_url=base_url) as client:
+            while True:
+                try:
+                    if client.get("/healthcheck").status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    if server.poll() is not None:
+                        raise RuntimeError("Server did not start")
+                    sleep(0.005)
+            ready = perf_counter() - start
+
+            start = perf_counter()
+            client.get("/currencyConverter/v1/conversions",
+                       headers={"user-id": "bench"})
+            first_request = perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    return ready * 1000, first_request * 1000
+
+
+def slowest_imports(env: dict[str, str], count: int) -> list[tuple[str, int]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, capture_output=True, check=True, text=True
+    )
+    imports = []
+    for line in result.stderr.splitlines()[1:]:
+        _, cumulative, module = line.split("|")
+        imports.append((module.strip(), int(cumulative) // 1000))
+    return sorted(imports, key=lambda item: -item[1])[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    database_path = os.path.join(tempfile.mkdtemp(), "cold-start.db")
+    env = environment(database_path)
+    subprocess.run([sys.executable, "-m", "app.init_db"], env=env, check=True)
+
+    imports, ready, first_request = [], [], []
+    for _ in range(args.runs):
+        imports.append(import_time(env))
+        ready_ms, first_request_ms = startup_times(env)
+        ready.append(ready_ms)
+        first_request.append(first_request_ms)
+
+    print(f"import_ms: {round(median(imports), 1)}")
+    print(f"ready_ms: {round(median(ready), 1)}")
+    print(f"first_request_ms: {round(median(first_request), 1)}")
+    for module, cumulative_ms in slowest_imports(env, args.top):
+        print(f"import {module}: {cumulative_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
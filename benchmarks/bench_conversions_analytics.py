@@ -0,0 +1,153 @@
+"""Conversion volume queries over the raw table versus the daily rollups.
+
+Seeds `--rows` conversions over `--users` users into a SQLite file, builds
+the rollups with the migration that backfills them, then times the same
+volume reports aggregated by `GROUP BY`/`SUM` over `CurrencyConversions`
+(with its indexes) and through `get_conversion_volumes` over the rollups.
+Also times a bulk insert of `--batch` conversions, which no longer touches
+the rollups, and the background rebuild of today's rollup rows that replaced
+that upsert. Pass an existing `--database` to skip seeding on later runs.
+
+Usage: python -m benchmarks.bench_conversions_analytics --rows 5000000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+from datetime import UTC, datetime, timedelta
+from time import perf_counter
+from unittest.mock import patch
+
+# Sets the environment the app settings need, so it goes before app imports
+from benchmarks.bench_conversions_history import (FIRST_DATETIME,
+                                                  create_indexes, seed,
+                                                  timed)
+from sqlalchemy import func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import Database
+from app.core.settings import Settings
+from app.models.currency_conversions_model import CurrencyConversionsModel
+from app.repositories.currency_conversions_repository import \
+    CurrencyConversionsRepository
+
+USER = "user-1"
+
+
+def raw_volumes(daily: bool, user_id: str = None):
+    keys = [
+        CurrencyConversionsModel.source_currency_code,
+        CurrencyConversionsModel.target_currency_code
+    ]
+    if daily:
+        keys.insert(0, func.date(CurrencyConversionsModel.datetime))
+
+    query = select(
+        *keys,
+        func.count(),
+        func.sum(CurrencyConversionsModel.source_currency_value),
+        func.sum(CurrencyConversionsModel.source_currency_value
+                 * CurrencyConversionsModel.rate_value)
+    )
+    if user_id is not None:
+        query = query.where(CurrencyConversionsModel.user_id == user_id)
+    return query.group_by(*keys).order_by(*keys)
+
+
+def backfill_rollups(path: str) -> float:
+    async def upgrade():
+        with patch.object(Settings, "DATABASE_URL", f"sqlite:///{path}"):
+            database = Database.__new__(Database)
+            database.__init__()
+        await database.init_db()
+        await database.close()
+
+    start = perf_counter()
+    asyncio.run(upgrade())
+    return round(perf_counter() - start, 2)
+
+
+def conversions(batch: int) -> list[dict]:
+    now = datetime.now(UTC)
+    return [
+        {
+            "user_id": f"user-{index % 100}",
+            "source_currency_code": "USD",
+            "source_currency_value": 10.0,
+            "target_currency_code": ("BRL", "EUR", "JPY")[index % 3],
+            "rate_value": 5.0,
+            "datetime": now
+        }
+        for index in range(batch)
+    ]
+
+
+async def run(path: str, batch: int, repeat: int) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    def repository() -> CurrencyConversionsRepository:
+        return CurrencyConversionsRepository(session_factory())
+
+    async def raw(query):
+        async with session_factory() as session:
+            return (await session.execute(query)).all()
+
+    async def plain_insert():
+        async with session_factory() as session:
+            await session.execute(
+                insert(CurrencyConversionsModel), conversions(batch))
+            await session.commit()
+
+    first_day = FIRST_DATETIME.date()
+    today = datetime.now(UTC).date()
+    result = {
+        "raw_daily_pair_ms": await timed(
+            lambda: raw(raw_volumes(daily=True)), repeat),
+        "rollup_daily_pair_ms": await timed(
+            lambda: repository().get_conversion_volumes(limit=1000), repeat),
+        "raw_total_user_ms": await timed(
+            lambda: raw(raw_volumes(daily=False, user_id=USER)), repeat),
+        "rollup_total_user_ms": await timed(
+            lambda: repository().get_conversion_volumes(
+                daily=False, user_id=USER), repeat),
+        "rollup_week_all_users_ms": await timed(
+            lambda: repository().get_conversion_volumes(
+                group_by_user=True, start=first_day,
+                end=first_day + timedelta(days=7), limit=100_000), repeat),
+        "plain_insert_ms": await timed(plain_insert, repeat),
+        "repository_insert_ms": await timed(
+            lambda: repository().insert_currency_conversions(
+                conversions(batch)), repeat),
+        "rollup_refresh_today_ms": await timed(
+            lambda: repository().refresh_rollups(today, today + timedelta(days=1)),
+            repeat)
+    }
+
+    await engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database", default=None)
+    args = parser.parse_args()
+
+    path = args.database or os.path.join(tempfile.mkdtemp(), "analytics.db")
+    if not os.path.exists(path):
+        seed(path, args.rows, args.users, heavy_share=0)
+        create_indexes(path)
+        print(f"rollup_backfill_s: {backfill_rollups(path)}")
+
+    result = asyncio.run(run(path, args.batch, args.repeat))
+
+    for name, value in result.items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Peak memory and time to first byte of exporting the conversion history.
+
+Compares the old approach (load every ORM row, `to_dict()` each one and
+render a single `JSONResponse`) against the streaming NDJSON/CSV export on a
+SQLite file seeded with `--rows` conversions. Peak memory is measured with
+`tracemalloc` and should stay flat for the streaming export as rows grow.
+
+Usage: python -m benchmarks.bench_conversions_export --rows 1000000
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import tracemalloc
+from time import perf_counter
+from unittest.mock import MagicMock
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.responses import JSONResponse
+
+# Sets the environment the app settings need, so it goes before app imports
+from benchmarks.bench_conversions_history import seed
+from app.models.currency_conversions_model import \
+    CurrencyConversionsModel
+from app.repositories.currency_conversions_repository import \
+    CurrencyConversionsRepository
+from app.services.currency_converter_service import \
+    CurrencyConverterService
+
+
+async def measure(export) -> dict:
+    tracemalloc.start()
+    start = perf_counter()
+    first_byte, size = await export()
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "first_byte_ms": round((first_byte - start) * 1000, 2),
+        "total_ms": round(elapsed * 1000, 2),
+        "bytes": size,
+        "peak_memory_mb": round(peak / 2 ** 20, 2)
+    }
+
+
+async def run(path: str) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    async def json_response():
+        async with session_factory() as session:
+            conversions = (await session.scalars(
+                select(CurrencyConversionsModel))).all()
+            body = JSONResponse(
+                content=[conversion.to_dict() for conversion in conversions]
+            ).body
+        return perf_counter(), len(body)
+
+    def streaming_export(export_format: str):
+        async def export():
+            service = CurrencyConverterService(
+                cache=MagicMock(),
+                exchange_rates_api_client=MagicMock(),
+                currency_conversions_repository=CurrencyConversionsRepository(
+                    session_factory()),
+                rate_table_store=MagicMock()
+            )
+            first_byte, size = None, 0
+            async for chunk in service.export_conversions(None, export_format):
+                first_byte = first_byte or perf_counter()
+                size += len(chunk.encode())
+            return first_byte, size
+
+        return export
+
+    result = {
+        "json_response": await measure(json_response),
+        "streaming_ndjson": await measure(streaming_export("ndjson")),
+        "streaming_csv": await measure(streaming_export("csv"))
+    }
+
+    await engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--database", default=None)
+    args = parser.parse_args()
+
+    path = args.database or os.path.join(tempfile.mkdtemp(), "history.db")
+    if not os.path.exists(path):
+        seed(path, args.rows, args.users, heavy_share=0.01)
+
+    for name, measures in asyncio.run(run(path)).items():
+        print(f"{name}: " + ", ".join(
+            f"{measure}={value}" for measure, value in measures.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Conversion history query latency on a large CurrencyConversions table.
+
+Seeds `--rows` conversions spread over `--users` users (one heavy user owns
+`--heavy-share` of them) into a SQLite file, then times the old unbounded
+`WHERE user_id = ?` query without indexes against the keyset-paginated
+repository queries once the composite indexes exist. The heavy user's
+latest page is also timed serialized, read from the database and from the
+per user history cache. Both are read once before timing, and the run stops
+if the page was not stored by then, as the cached timing would be another
+database read. Pass an existing `--database` to skip seeding on later runs.
+
+The cache runs on fakeredis, which needs the `lupa` extra of
+requirements.txt (`fakeredis[lua]`) for the scripts storing pages, or on
+the Redis at `--redis-url` (its `conversions:heavy-user` key is replaced).
+
+Usage: python -m benchmarks.bench_conversions_history --rows 10000000
+       [--redis-url redis://localhost:6379/15]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+from statistics import median
+from time import perf_counter
+from typing import Optional
+from unittest.mock import patch
+
+os.environ.setdefault("API_URL", "http://localhost/v1/latest")
+os.environ.setdefault("API_ACCESS_KEY", "benchmark")
+os.environ.setdefault("LOKI_URL", "http://localhost:3100")
+os.environ.setdefault("LOKI_USER", "admin")
+os.environ.setdefault("LOKI_PASSWORD", "admin")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import redis.asyncio as redis  # noqa: E402
+from fakeredis.aioredis import FakeRedis  # noqa: E402
+from sqlalchemy import create_engine, select  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker  # noqa: E402
+
+from app.core.cache import Cache  # noqa: E402
+from app.core.database import Base  # noqa: E402
+from app.core.settings import Settings  # noqa: E402
+from app.models.currency_conversions_model import \
+    CurrencyConversionsModel  # noqa: E402
+from app.repositories.currency_conversions_repository import \
+    CurrencyConversionsRepository  # noqa: E402
+from app.services.conversions_history_cache import \
+    ConversionsHistoryCache  # noqa: E402
+
+HEAVY_USER = "heavy-user"
+FIRST_DATETIME = datetime(2024, 1, 1)
+CHUNK_SIZE = 100_000
+
+
+def seed(path: str, rows: int, users: int, heavy_share: float):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    engine.dispose()
+
+    random.seed(0)
+    connection = sqlite3.connect(path)
+    for index in CurrencyConversionsModel.__table__.indexes:
+        connection.execute(f"DROP INDEX IF EXISTS {index.name}")
+
+    def conversions(start: int, stop: int):
+        for row in range(start, stop):
+            yield (
+                HEAVY_USER if random.random() < heavy_share
+                else f"user-{random.randrange(users)}",
+                "USD", 10.0, "BRL", 5.0,
+                str(FIRST_DATETIME + timedelta(seconds=row))
+            )
+
+    for start in range(0, rows, CHUNK_SIZE):
+        connection.executemany(
+            'INSERT INTO "CurrencyConversions" (user_id, '
+            'source_currency_code, source_currency_value, '
+            'target_currency_code, rate_value, datetime) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            conversions(start, min(start + CHUNK_SIZE, rows))
+        )
+        connection.commit()
+    connection.close()
+
+
+def create_indexes(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    for index in CurrencyConversionsModel.__table__.indexes:
+        index.create(engine, checkfirst=True)
+    engine.dispose()
+
+
+async def timed(query, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        await query()
+        timings.append(perf_counter() - start)
+    return round(median(timings) * 1000, 2)
+
+
+async def run(
+    path: str,
+    rows: int,
+    repeat: int,
+    redis_url: Optional[str] = None
+) -> dict:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    def repository() -> CurrencyConversionsRepository:
+        return CurrencyConversionsRepository(session_factory())
+
+    async def full_history(user_id: str):
+        async with session_factory() as session:
+            return (await session.scalars(
+                select(CurrencyConversionsModel)
+                .where(CurrencyConversionsModel.user_id == user_id)
+            )).all()
+
+    middle = (FIRST_DATETIME + timedelta(seconds=rows // 2), rows // 2)
+    result = {
+        "rows": rows,
+        "unindexed_full_history_heavy_user_ms":
+            await timed(lambda: full_history(HEAVY_USER), repeat),
+        "unindexed_full_history_user_ms":
+            await timed(lambda: full_history("user-1"), repeat),
+    }
+
+    create_indexes(path)
+    result |= {
+        "keyset_first_page_heavy_user_ms": await timed(
+            lambda: repository().get_conversions_by_user(HEAVY_USER), repeat),
+        "keyset_latest_page_heavy_user_ms": await timed(
+            lambda: repository().get_conversions_by_user(
+                HEAVY_USER, descending=True), repeat),
+        "keyset_middle_page_heavy_user_ms": await timed(
+            lambda: repository().get_conversions_by_user(
+                HEAVY_USER, after=middle), repeat),
+        "keyset_first_page_user_ms": await timed(
+            lambda: repository().get_conversions_by_user("user-1"), repeat),
+        "keyset_middle_page_all_users_ms": await timed(
+            lambda: repository().list_all_conversions(after=middle), repeat),
+        "keyset_time_range_all_users_ms": await timed(
+            lambda: repository().list_all_conversions(
+                start=middle[0], end=middle[0] + timedelta(hours=1)), repeat)
+    }
+
+    connection = redis.from_url(redis_url) if redis_url else FakeRedis()
+    with patch("app.core.cache.redis.Redis", return_value=connection):
+        cache = Cache()
+    key = f"{Settings.CONVERSIONS_CACHE_KEY_PREFIX}:{HEAVY_USER}"
+    await cache.delete(key)
+
+    def latest_page(cached: bool):
+        with patch.object(Settings, "CONVERSIONS_CACHE_ENABLED", cached):
+            history_cache = ConversionsHistoryCache(
+                cache=cache, currency_conversions_repository=repository())
+        return history_cache.get_page(HEAVY_USER, 100, descending=True)
+
+    await latest_page(cached=False)
+    await latest_page(cached=True)
+    if (await cache.get_hash_fields(key, "desc:100:"))[0] is None:
+        raise SystemExit(
+            "The history cache did not store the page, install lupa "
+            "(fakeredis[lua]) or pass --redis-url")
+
+    result |= {
+        "serialized_latest_page_heavy_user_ms": await timed(
+            lambda: latest_page(cached=False), repeat),
+        "cached_latest_page_heavy_user_ms": await timed(
+            lambda: latest_page(cached=True), repeat)
+    }
+
+    await cache.close()
+    await engine.dispose()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--heavy-share", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database", default=None)
+    parser.add_argument("--redis-url", default=None)
+    args = parser.parse_args()
+
+    path = args.database or os.path.join(tempfile.mkdtemp(), "history.db")
+    if not os.path.exists(path):
+        seed(path, args.rows, args.users, args.heavy_share)
+
+    result = asyncio.run(run(path, args.rows, args.repeat, args.redis_url))
+
+    for name, value in result.items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
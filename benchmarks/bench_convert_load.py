@@ -0,0 +1,171 @@
+"""Requests/sec and latency percentiles of POST /v1/convert under load.
+
+By default the app runs in-process behind an ASGI transport, with an
+in-memory Redis and the local upstream simulator answering after
+`--upstream-latency` seconds (failing `--upstream-error-rate` of the
+requests), on a fresh SQLite database. Set CONVERSIONS_WRITE_MODE=write_behind
+to measure the buffered writer instead of a commit per request. Rate limiting
+and load shedding are disabled unless set, to measure what the app sustains
+rather than what it rejects. Pass `--url` to load a running server instead,
+e.g. to compare a deployment of the previous revision against this one with
+the same settings:
+
+    uvicorn app.main:app --port 8000
+    python -m benchmarks.bench_convert_load --url http://127.0.0.1:8000/api
+
+Usage: python -m benchmarks.bench_convert_load --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+from contextlib import ExitStack
+from statistics import quantiles
+from time import perf_counter
+from typing import Optional
+from unittest.mock import patch
+
+from benchmarks.upstream_simulator import (ExchangeRatesApiSimulator,
+                                           SimulatorConfig)
+
+database_path = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{database_path}")
+os.environ.setdefault("API_URL", "http://upstream/v1/latest")
+os.environ.setdefault("API_ACCESS_KEY", "benchmark")
+os.environ.setdefault("LOKI_URL", "http://localhost:3100")
+os.environ.setdefault("LOKI_USER", "admin")
+os.environ.setdefault("LOKI_PASSWORD", "admin")
+os.environ.setdefault("RATE_REFRESHER_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("LOAD_SHED_ENABLED", "false")
+
+import fakeredis  # noqa: E402
+import httpx  # noqa: E402
+from fakeredis.aioredis import FakeRedis  # noqa: E402
+
+from app.api_clients.exchange_rates_api_client import \
+    ExchangeRatesApiClient  # noqa: E402
+from app.core.cache import Cache  # noqa: E402
+from app.core.database import Database  # noqa: E402
+from app.core.settings import Settings  # noqa: E402
+from app.main import app  # noqa: E402
+from app.services.currency_conversions_writer import \
+    CurrencyConversionsWriter  # noqa: E402
+
+LOGGERS = (
+    "app.core.log_requets_midleware.Logger",
+    "app.core.cache.Logger",
+    "app.api_clients.exchange_rates_api_client.Logger",
+    "app.services.exchange_rates_service.Logger",
+    "app.services.currency_conversions_writer.Logger",
+)
+
+
+def upstream_transport(
+    latency_seconds: float,
+    error_rate: float = 0.0
+) -> httpx.ASGITransport:
+    simulator = ExchangeRatesApiSimulator(SimulatorConfig(
+        latency_seconds=latency_seconds, error_rate=error_rate))
+    return httpx.ASGITransport(app=simulator.create_app())
+
+
+async def load(
+    client: httpx.AsyncClient,
+    requests: int,
+    concurrency: int
+) -> dict:
+    payload = {
+        "source_currency_code": "BRL",
+        "source_currency_value": 10.0,
+        "target_currency_code": "USD"
+    }
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def convert(index: int):
+        nonlocal errors
+        async with semaphore:
+            start = perf_counter()
+            response = await client.post(
+                "/currencyConverter/v1/convert",
+                json=payload,
+                headers={"user-id": f"bench-{index % 100}"}
+            )
+            latencies.append(perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = perf_counter()
+    await asyncio.gather(*[convert(index) for index in range(requests)])
+    elapsed = perf_counter() - start
+
+    percentiles = quantiles(latencies, n=100)
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "requests_per_second": round(requests / elapsed, 1),
+        "p50_ms": round(percentiles[49] * 1000, 2),
+        "p95_ms": round(percentiles[94] * 1000, 2),
+        "p99_ms": round(percentiles[98] * 1000, 2)
+    }
+
+
+async def run(
+    requests: int,
+    concurrency: int,
+    latency_seconds: float,
+    url: Optional[str],
+    error_rate: float = 0.0
+) -> dict:
+    if url is not None:
+        async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+            return await load(client, requests, concurrency)
+
+    server = fakeredis.FakeServer()
+    with ExitStack() as stack:
+        for logger in LOGGERS:
+            stack.enter_context(patch(logger))
+        stack.enter_context(patch(
+            "app.core.cache.redis.Redis",
+            side_effect=lambda **_: FakeRedis(server=server)
+        ))
+        ExchangeRatesApiClient._http_client = httpx.AsyncClient(
+            transport=upstream_transport(latency_seconds, error_rate))
+
+        await Database().init_db()
+        if Settings.CONVERSIONS_WRITE_MODE == "write_behind":
+            await CurrencyConversionsWriter().start(
+                cache=Cache(), database=Database())
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app, raise_app_exceptions=False),
+            base_url="http://benchmark"
+        ) as client:
+            result = await load(client, requests, concurrency)
+
+        await CurrencyConversionsWriter().stop()
+        await ExchangeRatesApiClient.close()
+        await Database().close()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--upstream-latency", type=float, default=0.05)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(
+        args.requests, args.concurrency, args.upstream_latency, args.url,
+        args.upstream_error_rate))
+
+    for name, value in result.items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
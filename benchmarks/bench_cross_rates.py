@@ -0,0 +1,82 @@
+"""Cost of pricing conversions from the rate table, per pair and per batch.
+
+Compares, on a table of `--currencies` EUR based rates, the previous path
+(copying the needed rates into a `CurrencyConversionRatesSchema` and dividing
+`target / source` per pair) with the `RateTable` cross-rate matrix, indexed
+once per pair or vectorized for a batch of `--batch` pairs. Also reports the
+time to build the matrix, paid once per refresh, and to serve a whole row as
+GET /v1/rates/{base} does.
+
+Usage: python -m benchmarks.bench_cross_rates --currencies 170 --batch 100
+"""
+import argparse
+import random
+import string
+from itertools import product
+from time import perf_counter
+
+from app.core.rate_table import RateTable
+from app.schemas.currency_conversion_rates_schema import \
+    CurrencyConversionRatesSchema
+
+
+def rate_table(currencies: int) -> RateTable:
+    codes = ["".join(code) for code in product(string.ascii_uppercase, repeat=3)]
+    return RateTable.from_schema(
+        CurrencyConversionRatesSchema(rates={
+            code: random.uniform(0.01, 20000) for code in codes[:currencies]
+        }),
+        ttl_seconds=60
+    )
+
+
+def legacy_rates(table: RateTable, pairs: list[tuple[str, str]]) -> list[float]:
+    conversion_rates = CurrencyConversionRatesSchema(
+        base=table.base,
+        rates={
+            code: table.rates[code]
+            for code in {code for pair in pairs for code in pair}
+        }
+    )
+    return [
+        conversion_rates.rates.get(target) / conversion_rates.rates.get(source)
+        for source, target in pairs
+    ]
+
+
+def microseconds(function, repeat: int) -> float:
+    start = perf_counter()
+    for _ in range(repeat):
+        function()
+    return round((perf_counter() - start) / repeat * 1_000_000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--currencies", type=int, default=170)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=10000)
+    args = parser.parse_args()
+
+    table = rate_table(args.currencies)
+    codes = list(table.rates)
+    pair = tuple(random.sample(codes, 2))
+    batch = [tuple(random.sample(codes, 2)) for _ in range(args.batch)]
+
+    print("build_matrix_us: " + str(microseconds(
+        lambda: RateTable.cross_rates_of(table.rates.values()),
+        max(args.repeat // 100, 1))))
+    print("single_legacy_us: " + str(microseconds(
+        lambda: legacy_rates(table, [pair]), args.repeat)))
+    print("single_matrix_us: " + str(microseconds(
+        lambda: table.cross_rate(*pair), args.repeat)))
+    print("batch_legacy_us: " + str(microseconds(
+        lambda: legacy_rates(table, batch), args.repeat // 10)))
+    print("batch_matrix_us: " + str(microseconds(
+        lambda: table.cross_rates_between(batch).tolist(), args.repeat // 10)))
+    print("row_us: " + str(microseconds(
+        lambda: table.cross_rates_from(pair[0]), args.repeat // 10)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Latency percentiles of the operations behind POST /v1/convert.
+
+Times, one call at a time so each sample is the latency of one operation:
+
+- `cache_set`/`cache_get`: `Cache.set` and `Cache.get` of a short value;
+- `cross_rate`: the rate lookup of a conversion, once the rate table is warm;
+- `repository_add`: `add_currency_conversion`, one commit per conversion;
+- `repository_add_many`: `add_currency_conversions` of `--batch` conversions;
+- `convert_transaction`: `CurrencyConverterService.convert_currency_transaction`
+  end to end, rate lookup and commit included.
+
+Redis is an in-memory fakeredis, the upstream API is stubbed and the
+database is a fresh SQLite file, so results are comparable between runs on
+one machine, not with production.
+
+Usage: python -m benchmarks.bench_hot_path --iterations 2000
+"""
+import argparse
+import asyncio
+from contextlib import ExitStack
+from datetime import UTC, datetime
+from statistics import quantiles
+from time import perf_counter
+from unittest.mock import patch
+
+# Sets the environment the app settings need, so it goes before app imports
+from benchmarks.bench_convert_load import LOGGERS, upstream_transport
+
+import fakeredis
+import httpx
+from fakeredis.aioredis import FakeRedis
+
+from app.api_clients.exchange_rates_api_client import ExchangeRatesApiClient
+from app.core.cache import Cache
+from app.core.database import Database
+from app.core.rate_table import RateTableStore
+from app.repositories.currency_conversions_repository import \
+    CurrencyConversionsRepository
+from app.services.currency_converter_service import CurrencyConverterService
+from app.services.exchange_rates_service import ExchangeRatesService
+
+
+def conversion(index: int) -> dict:
+    return {
+        "user_id": f"bench-{index % 100}",
+        "source_currency_code": "BRL",
+        "source_currency_value": 10.0,
+        "target_currency_code": "USD",
+        "rate_value": 0.19,
+        "datetime": datetime.now(UTC)
+    }
+
+
+async def measure(name: str, operation, iterations: int) -> dict:
+    for index in range(min(iterations // 10, 100)):
+        await operation(index)
+
+    latencies = []
+    for index in range(iterations):
+        start = perf_counter()
+        await operation(index)
+        latencies.append(perf_counter() - start)
+
+    percentiles = quantiles(latencies, n=100)
+    return {
+        f"{name}_per_second": round(len(latencies) / sum(latencies), 1),
+        f"{name}_p50_us": round(percentiles[49] * 1_000_000, 1),
+        f"{name}_p95_us": round(percentiles[94] * 1_000_000, 1),
+        f"{name}_p99_us": round(percentiles[98] * 1_000_000, 1)
+    }
+
+
+async def run(iterations: int, batch: int = 100) -> dict:
+    server = fakeredis.FakeServer()
+    with ExitStack() as stack:
+        for logger in LOGGERS:
+            stack.enter_context(patch(logger))
+        stack.enter_context(patch(
+            "app.core.cache.redis.Redis",
+            side_effect=lambda **_: FakeRedis(server=server)
+        ))
+        ExchangeRatesApiClient._http_client = httpx.AsyncClient(
+            transport=upstream_transport(0))
+        await Database().init_db()
+
+        cache = Cache()
+        exchange_rates_service = ExchangeRatesService(
+            cache=cache,
+            exchange_rates_api_client=ExchangeRatesApiClient(),
+            rate_table_store=RateTableStore()
+        )
+        repository = CurrencyConversionsRepository(
+            Database().get_db_session())
+        service = CurrencyConverterService(
+            cache=cache,
+            exchange_rates_api_client=ExchangeRatesApiClient(),
+            currency_conversions_repository=repository,
+            rate_table_store=RateTableStore()
+        )
+        await exchange_rates_service.refresh_rates()
+
+        result = {}
+        for name, operation, count in (
+            ("cache_set", lambda index: cache.set(
+                f"bench:{index}", "value", exp_seconds=60), iterations),
+            ("cache_get", lambda index: cache.get(f"bench:{index}"),
+             iterations),
+            ("cross_rate", lambda _: exchange_rates_service.get_cross_rate(
+                "BRL", "USD"), iterations),
+            ("repository_add", lambda index: repository.add_currency_conversion(
+                **conversion(index)), iterations),
+            ("repository_add_many", lambda index:
+                repository.add_currency_conversions(
+                    [conversion(index)] * batch), max(iterations // batch, 10)),
+            ("convert_transaction", lambda index:
+                service.convert_currency_transaction(
+                    "BRL", 10.0, "USD", f"bench-{index % 100}"), iterations)
+        ):
+            result |= await measure(name, operation, count)
+
+        await ExchangeRatesApiClient.close()
+        await Database().close()
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=100)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.iterations, args.batch))
+
+    for name, value in result.items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
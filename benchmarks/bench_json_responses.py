@@ -0,0 +1,159 @@
+"""Per-request CPU time of response serialization, default vs fast JSON.
+
+Runs POST /v1/convert and GET /v1/conversions (`--page-size` rows) against
+the v1 router, driving the ASGI app directly and with the service stubbed
+out, so the measure is dominated by request parsing, response validation and
+JSON rendering. Each endpoint is timed with `FAST_JSON_RESPONSES` off and on,
+/conversions rendering its page each time as on a history cache miss.
+
+Usage: python -m benchmarks.bench_json_responses --requests 5000
+"""
+import argparse
+import asyncio
+import os
+from datetime import UTC, datetime
+from time import process_time
+from unittest.mock import patch
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("API_URL", "http://localhost/v1/latest")
+os.environ.setdefault("API_ACCESS_KEY", "benchmark")
+os.environ.setdefault("LOKI_URL", "http://localhost:3100")
+os.environ.setdefault("LOKI_USER", "admin")
+os.environ.setdefault("LOKI_PASSWORD", "admin")
+
+from fastapi import FastAPI  # noqa: E402
+
+from app.core.settings import Settings  # noqa: E402
+from app.models.currency_conversions_model import \
+    CurrencyConversionsModel  # noqa: E402
+from app.routers.routes import api_router  # noqa: E402
+from app.services.conversions_history_cache import \
+    ConversionsHistoryCache  # noqa: E402
+
+
+def conversion(transaction_id: int) -> CurrencyConversionsModel:
+    return CurrencyConversionsModel(
+        transaction_id=transaction_id,
+        user_id="bench",
+        source_currency_code="BRL",
+        source_currency_value=10.0,
+        target_currency_code="USD",
+        rate_value=0.19454545454545455,
+        datetime=datetime.now(UTC)
+    )
+
+
+class StubCurrencyConverterService:
+    page: list[CurrencyConversionsModel] = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    async def convert_currency_transaction(self, **kwargs):
+        return conversion(1)
+
+    async def get_conversions(self, *args, **kwargs):
+        return self.page, None
+
+    async def get_serialized_conversions(self, *args, **kwargs):
+        return ConversionsHistoryCache.render(self.page), None
+
+
+async def call(app: FastAPI, method: str, path: str, query: bytes = b"",
+               body: bytes = b"") -> int:
+    """Drives one request straight through the ASGI app, with no client."""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"user-id", b"bench")
+        ],
+        "server": ("benchmark", 80),
+        "client": ("benchmark", 1)
+    }
+    response = {}
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+
+    await app(scope, receive, send)
+    return response["status"]
+
+
+async def cpu_per_request(send, requests: int) -> float:
+    for _ in range(min(requests, 100)):
+        await send()
+
+    start = process_time()
+    for _ in range(requests):
+        status_code = await send()
+    elapsed = process_time() - start
+
+    assert status_code == 200
+    return round(elapsed / requests * 1_000_000, 1)
+
+
+async def run(requests: int, page_size: int) -> dict:
+    app = FastAPI()
+    app.include_router(api_router, prefix="/currencyConverter")
+    StubCurrencyConverterService.page = [
+        conversion(index) for index in range(page_size)]
+
+    def convert():
+        return call(
+            app, "POST", "/currencyConverter/v1/convert",
+            body=b'{"source_currency_code": "BRL", '
+                 b'"source_currency_value": 10.0, '
+                 b'"target_currency_code": "USD"}'
+        )
+
+    def conversions():
+        return call(
+            app, "GET", "/currencyConverter/v1/conversions",
+            query=f"limit={page_size}".encode()
+        )
+
+    result = {}
+    with patch(
+        "app.routers.v1.currency_converter_router.CurrencyConverterService",
+        StubCurrencyConverterService
+    ):
+        for name, send in (("convert", convert), ("conversions", conversions)):
+            for fast_json_responses in (False, True):
+                mode = "fast" if fast_json_responses else "default"
+                with patch.object(
+                    Settings, "FAST_JSON_RESPONSES", fast_json_responses
+                ):
+                    result[f"{name}_{mode}_cpu_us"] = await cpu_per_request(
+                        send, requests)
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--page-size", type=int, default=100)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.requests, args.page_size))
+
+    for name, value in result.items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
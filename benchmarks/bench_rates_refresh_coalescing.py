@@ -0,0 +1,129 @@
+"""Upstream calls under N concurrent rate table misses.
+
+Simulates `--workers` uvicorn workers (each with its own rate table snapshot
+and single-flight) sharing one Redis on a single event loop, all receiving
+`--concurrency` conversions at the instant the cached rates expire. The
+upstream is the local simulator, behind the real `ExchangeRatesApiClient`
+and circuit breaker, answering after `--upstream-latency` seconds and
+failing `--upstream-error-rate` of the requests.
+
+Usage: python -m benchmarks.bench_rates_refresh_coalescing --workers 4
+"""
+import argparse
+import asyncio
+import os
+from statistics import quantiles
+from time import perf_counter
+from unittest.mock import AsyncMock, patch
+
+from benchmarks.upstream_simulator import (ExchangeRatesApiSimulator,
+                                           SimulatorConfig)
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./benchmark.db")
+os.environ.setdefault("API_URL", "http://localhost/v1/latest")
+os.environ.setdefault("API_ACCESS_KEY", "benchmark")
+os.environ.setdefault("LOKI_URL", "http://localhost:3100")
+os.environ.setdefault("LOKI_USER", "admin")
+os.environ.setdefault("LOKI_PASSWORD", "admin")
+
+import fakeredis  # noqa: E402
+import httpx  # noqa: E402
+from fakeredis.aioredis import FakeRedis  # noqa: E402
+
+from app.api_clients.exchange_rates_api_client import \
+    ExchangeRatesApiClient  # noqa: E402
+from app.core.cache import Cache  # noqa: E402
+from app.core.http_circuit_breaker import HttpCircuitBreaker  # noqa: E402
+from app.core.rate_table import RateTableStore  # noqa: E402
+from app.exceptions.exchange_rates_unavailable_exception import \
+    ExchangeRatesUnavailableException  # noqa: E402
+from app.services.currency_converter_service import \
+    CurrencyConverterService  # noqa: E402
+
+
+def new_instance(cls):
+    """Builds a per simulated worker instance, bypassing `SingletonMeta`."""
+    instance = cls.__new__(cls)
+    instance.__init__()
+    return instance
+
+
+async def run(
+    workers: int,
+    concurrency: int,
+    latency_seconds: float,
+    error_rate: float = 0.0
+) -> dict:
+    server = fakeredis.FakeServer()
+    simulator = ExchangeRatesApiSimulator(SimulatorConfig(
+        latency_seconds=latency_seconds, error_rate=error_rate))
+    ExchangeRatesApiClient._http_client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=simulator.create_app()))
+    HttpCircuitBreaker._breaker.close()
+    api_client = ExchangeRatesApiClient()
+    latencies, errors = [], 0
+
+    with patch("app.core.cache.redis.Redis",
+               side_effect=lambda **_: FakeRedis(server=server)):
+        services = [
+            CurrencyConverterService(
+                cache=new_instance(Cache),
+                exchange_rates_api_client=api_client,
+                currency_conversions_repository=AsyncMock(),
+                rate_table_store=new_instance(RateTableStore)
+            )
+            for _ in range(workers)
+        ]
+
+    async def convert(service: CurrencyConverterService):
+        nonlocal errors
+        start = perf_counter()
+        try:
+            await service.convert_currency_transaction(
+                "BRL", 10.0, "USD", "bench")
+        except ExchangeRatesUnavailableException:
+            errors += 1
+        latencies.append(perf_counter() - start)
+
+    start = perf_counter()
+    await asyncio.gather(*[
+        convert(service)
+        for service in services for _ in range(concurrency)
+    ])
+    elapsed = perf_counter() - start
+    await ExchangeRatesApiClient.close()
+
+    percentiles = quantiles(latencies, n=100)
+    return {
+        "workers": workers,
+        "concurrent_requests": workers * concurrency,
+        "errors": errors,
+        "upstream_calls": simulator.requests,
+        "upstream_errors": simulator.errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "p50_ms": round(percentiles[49] * 1000, 2),
+        "p99_ms": round(percentiles[98] * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--upstream-latency", type=float, default=0.2)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with patch("app.services.exchange_rates_service.Logger"), \
+            patch("app.api_clients.exchange_rates_api_client.Logger"), \
+            patch("app.core.cache.Logger"):
+        result = asyncio.run(run(
+            args.workers, args.concurrency, args.upstream_latency,
+            args.upstream_error_rate))
+
+    for name, value in result.items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""Per-request overhead of the request logging middleware.
+
+Drives a trivial endpoint straight through the ASGI app and reports CPU time
+per request (all threads, so shipping the logs counts too) for:
+
+- `none`: no middleware, the baseline;
+- `passthrough`: an `http` middleware that only awaits `call_next`, the
+  cost of the middleware layer itself;
+- `legacy`: the previous middleware, logging the header dict on the way in
+  and a second line on the way out through a `QueueHandler` on a
+  `multiprocessing.Queue`, as `logging_loki.LokiQueueHandler` did;
+- `batched`: the current ASGI middleware and the batching `LokiHandler`;
+- `batched_sampled`: the same with `LOG_REQUESTS_SAMPLE_RATE=0.1`.
+
+Loki is replaced by an in-process transport answering 204, so no network
+time is included and each mode is drained before its timer stops.
+
+Usage: python -m benchmarks.bench_request_logging --requests 20000
+"""
+import argparse
+import asyncio
+import logging
+import logging.handlers
+import multiprocessing
+import os
+from time import process_time, time
+from unittest.mock import patch
+
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("API_URL", "http://localhost/v1/latest")
+os.environ.setdefault("API_ACCESS_KEY", "benchmark")
+os.environ.setdefault("LOKI_URL", "http://localhost:3100")
+os.environ.setdefault("LOKI_USER", "admin")
+os.environ.setdefault("LOKI_PASSWORD", "admin")
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+
+from app.core.log_requets_midleware import \
+    LogRequestsMiddleware  # noqa: E402
+from app.core.logger import Logger  # noqa: E402
+from app.core.loki_handler import LokiHandler  # noqa: E402
+from app.core.settings import Settings  # noqa: E402
+
+HEADERS = [
+    (b"host", b"localhost:8000"),
+    (b"user-agent", b"Mozilla/5.0 (X11; Linux x86_64) Gecko/20100101"),
+    (b"accept", b"application/json"),
+    (b"accept-language", b"en-US,en;q=0.5"),
+    (b"accept-encoding", b"gzip, deflate, br"),
+    (b"connection", b"keep-alive"),
+    (b"content-type", b"application/json"),
+    (b"user-id", b"bench"),
+    (b"x-request-id", b"0f8fad5b-d9cb-469f-a165-70867728950e"),
+    (b"x-forwarded-for", b"203.0.113.7"),
+]
+
+
+class Sink(logging.Handler):
+    """Formats records the way a Loki handler would, without sending them."""
+
+    def emit(self, record: logging.LogRecord):
+        self.format(record)
+
+
+def legacy_logger() -> tuple[logging.Logger, logging.handlers.QueueListener]:
+    queue = multiprocessing.Queue(-1)
+    logger = logging.getLogger("benchmark.legacy")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(logging.handlers.QueueHandler(queue))
+    listener = logging.handlers.QueueListener(queue, Sink())
+    listener.start()
+    return logger, listener
+
+
+def legacy_log_requests(logger: logging.Logger):
+    async def log_requests(request: Request, call_next):
+        start_time = time()
+
+        method = request.method
+        url = request.url
+        headers = dict(request.headers)
+
+        logger.info(
+            f"Received HTTP request: {method} {url} - Headers: {headers}")
+
+        response = await call_next(request)
+        process_time = time() - start_time
+        logger.info(
+            f"Response: {method} {url} \
+            - Status: {response.status_code} \
+            - Processing Time: {process_time:.4f}s"
+        )
+
+        return response
+
+    return log_requests
+
+
+async def passthrough(request: Request, call_next):
+    return await call_next(request)
+
+
+def create_app(middleware=None, middleware_class=None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"status": "ok"}
+
+    if middleware is not None:
+        app.middleware("http")(middleware)
+    if middleware_class is not None:
+        app.add_middleware(middleware_class)
+    return app
+
+
+async def call(app: FastAPI) -> int:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": HEADERS,
+        "server": ("benchmark", 80),
+        "client": ("benchmark", 1)
+    }
+    response, messages = {}, [
+        {"type": "http.request", "body": b"", "more_body": False}]
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        # The client stays connected until the response is sent
+        await asyncio.Future()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+
+    await app(scope, receive, send)
+    return response["status"]
+
+
+async def cpu_per_request(app: FastAPI, requests: int, drain) -> float:
+    for _ in range(min(requests, 100)):
+        await call(app)
+
+    start = process_time()
+    for _ in range(requests):
+        status_code = await call(app)
+    drain()
+    elapsed = process_time() - start
+
+    assert status_code == 200
+    return round(elapsed / requests * 1_000_000, 1)
+
+
+async def run(requests: int) -> dict:
+    result = {
+        "none_cpu_us": await cpu_per_request(
+            create_app(), requests, lambda: None),
+        "passthrough_cpu_us": await cpu_per_request(
+            create_app(passthrough), requests, lambda: None)
+    }
+
+    logger, listener = legacy_logger()
+    result["legacy_cpu_us"] = await cpu_per_request(
+        create_app(legacy_log_requests(logger)), requests, listener.stop)
+
+    handler = LokiHandler(
+        url="http://loki/loki/api/v1/push",
+        labels={"application": "benchmark"},
+        auth=("admin", "admin"),
+        batch_size=Settings.LOG_BATCH_SIZE,
+        flush_interval=Settings.LOG_FLUSH_INTERVAL_SECONDS,
+        buffer_size=requests,
+        transport=httpx.MockTransport(lambda request: httpx.Response(204))
+    )
+    logger = logging.getLogger("benchmark.batched")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(handler)
+
+    with patch.object(Logger, "_logger_initialized", True), \
+            patch.object(Logger, "logger", logger, create=True):
+        for mode, sample_rate in (("batched", 1.0), ("batched_sampled", 0.1)):
+            with patch.object(Settings, "LOG_REQUESTS_SAMPLE_RATE", sample_rate):
+                result[f"{mode}_cpu_us"] = await cpu_per_request(
+                    create_app(middleware_class=LogRequestsMiddleware), requests,
+                    handler.flush)
+
+    handler.close()
+    result["batched_dropped"] = handler.dropped
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.requests))
+
+    for name, value in result.items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Mixed read/write throughput on SQLite, default versus tuned pragmas.
+
+For each profile a SQLite file is seeded with `--rows` conversions, then
+`--writers` tasks insert conversions (POST /convert's write) while
+`--readers` tasks read pages of a user's history (GET /conversions' read)
+for `--seconds`. The default profile is SQLite's rollback journal, the tuned
+one is `SQLITE_TUNED` (WAL, synchronous=NORMAL, mmap, cache and busy
+timeout), where readers no longer wait for the writer's commits.
+
+Usage: python -m benchmarks.bench_sqlite_mixed_workload --seconds 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+from datetime import UTC, datetime
+from statistics import quantiles
+from time import perf_counter
+from unittest.mock import patch
+
+# Sets the environment the app settings need, so it goes before app imports
+from benchmarks.bench_conversions_history import create_indexes, seed
+from sqlalchemy.exc import OperationalError
+
+from app.core.database import Database
+from app.core.settings import Settings
+from app.repositories.currency_conversions_repository import \
+    CurrencyConversionsRepository
+
+USERS = 1000
+
+
+def new_instance(cls):
+    """Builds an instance per profile, bypassing `SingletonMeta`."""
+    instance = cls.__new__(cls)
+    instance.__init__()
+    return instance
+
+
+async def workload(database: Database, writers: int, readers: int,
+                   seconds: float) -> dict:
+    deadline = perf_counter() + seconds
+    writes, write_latencies, read_latencies, errors = 0, [], [], 0
+
+    def repository() -> CurrencyConversionsRepository:
+        return CurrencyConversionsRepository(database.get_db_session())
+
+    async def write():
+        nonlocal writes, errors
+        while perf_counter() < deadline:
+            start = perf_counter()
+            try:
+                await repository().add_currency_conversion(
+                    user_id=f"user-{random.randrange(USERS)}",
+                    source_currency_code="USD",
+                    source_currency_value=10.0,
+                    target_currency_code="BRL",
+                    rate_value=5.0,
+                    datetime=datetime.now(UTC)
+                )
+                writes += 1
+                write_latencies.append(perf_counter() - start)
+            except OperationalError:
+                errors += 1
+
+    async def read():
+        nonlocal errors
+        while perf_counter() < deadline:
+            start = perf_counter()
+            try:
+                await repository().get_conversions_by_user(
+                    f"user-{random.randrange(USERS)}", limit=100)
+                read_latencies.append(perf_counter() - start)
+            except OperationalError:
+                errors += 1
+
+    await asyncio.gather(
+        *[write() for _ in range(writers)], *[read() for _ in range(readers)])
+
+    read_percentiles = quantiles(read_latencies, n=100)
+    write_percentiles = quantiles(write_latencies, n=100)
+    return {
+        "writes_per_second": round(writes / seconds, 1),
+        "reads_per_second": round(len(read_latencies) / seconds, 1),
+        "errors": errors,
+        "write_p99_ms": round(write_percentiles[98] * 1000, 2),
+        "read_p50_ms": round(read_percentiles[49] * 1000, 2),
+        "read_p99_ms": round(read_percentiles[98] * 1000, 2)
+    }
+
+
+async def run(path: str, tuned: bool, args: argparse.Namespace) -> dict:
+    with patch.object(Settings, "DATABASE_URL", f"sqlite:///{path}"), \
+            patch.object(Settings, "SQLITE_TUNED", tuned):
+        database = new_instance(Database)
+
+    result = await workload(
+        database, args.writers, args.readers, args.seconds)
+    await database.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+
+    for profile, tuned in (("default", False), ("tuned", True)):
+        path = os.path.join(tempfile.mkdtemp(), f"{profile}.db")
+        seed(path, args.rows, USERS, heavy_share=0)
+        create_indexes(path)
+
+        result = asyncio.run(run(path, tuned, args))
+        print(f"{profile}: " + ", ".join(
+            f"{name}={value}" for name, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Throughput and latency of the API versus the number of worker processes.
+
+For each `--workers` count, serves the app with `gunicorn -c gunicorn.conf.py`
+on a SQLite file seeded with conversions, then loads `--path` from
+`--clients` client processes (so the load generator is not the bottleneck on
+one core). The default path reads one page of a user's history, which needs
+neither Redis nor the upstream API. Workers are stopped with SIGTERM and the
+time the graceful drain took is reported too. Throughput should grow with the
+worker count up to the number of cores.
+
+Usage: python -m benchmarks.bench_worker_scaling --workers 1,2,4,8
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+from statistics import quantiles
+from time import perf_counter, sleep
+
+import httpx
+
+from benchmarks.bench_conversions_history import seed
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, port: int, database_path: str) -> subprocess.Popen:
+    env = os.environ | {
+        "DATABASE_URL": f"sqlite:///{database_path}",
+        "API_URL": "http://localhost/v1/latest",
+        "API_ACCESS_KEY": "benchmark",
+        "LOKI_URL": "http://127.0.0.1:9",
+        "LOKI_USER": "admin",
+        "LOKI_PASSWORD": "admin",
+        "RATE_REFRESHER_ENABLED": "false",
+        "RATE_LIMIT_ENABLED": "false",
+        "LOAD_SHED_ENABLED": "false",
+        "WEB_CONCURRENCY": str(workers),
+        "PORT": str(port),
+        "PROMETHEUS_MULTIPROC_DIR": tempfile.mkdtemp()
+    }
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+         "--bind", f"127.0.0.1:{port}", "app.main:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+
+    url = f"http://127.0.0.1:{port}/api/healthcheck"
+    for _ in range(300):
+        try:
+            if httpx.get(url).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        sleep(0.1)
+
+    server.kill()
+    raise RuntimeError("Server did not start")
+
+
+def stop_server(server: subprocess.Popen) -> float:
+    start = perf_counter()
+    server.send_signal(signal.SIGTERM)
+    server.wait(timeout=60)
+    return round(perf_counter() - start, 2)
+
+
+async def client_load(url: str, requests: int, concurrency: int) -> tuple:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def send(client: httpx.AsyncClient):
+        nonlocal errors
+        async with semaphore:
+            start = perf_counter()
+            response = await client.get(url, headers={"user-id": "user-1"})
+            latencies.append(perf_counter() - start)
+            errors += response.status_code != 200
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        await asyncio.gather(*[send(client) for _ in range(requests)])
+
+    return latencies, errors
+
+
+def run_client(arguments: tuple) -> tuple:
+    return asyncio.run(client_load(*arguments))
+
+
+def load(url: str, requests: int, concurrency: int, clients: int) -> dict:
+    arguments = [(url, requests // clients, max(concurrency // clients, 1))]
+    with multiprocessing.Pool(clients) as pool:
+        start = perf_counter()
+        results = pool.map(run_client, arguments * clients)
+        elapsed = perf_counter() - start
+
+    latencies = [latency for result in results for latency in result[0]]
+    percentiles = quantiles(latencies, n=100)
+    return {
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "errors": sum(result[1] for result in results),
+        "p50_ms": round(percentiles[49] * 1000, 2),
+        "p99_ms": round(percentiles[98] * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument(
+        "--path", default="/api/currencyConverter/v1/conversions?limit=100")
+    args = parser.parse_args()
+
+    database_path = os.path.join(tempfile.mkdtemp(), "scaling.db")
+    seed(database_path, args.rows, users=1000, heavy_share=0)
+
+    for workers in map(int, args.workers.split(",")):
+        port = free_port()
+        server = start_server(workers, port, database_path)
+        url = f"http://127.0.0.1:{port}{args.path}"
+        try:
+            load(url, args.clients * 10, args.clients, args.clients)
+            result = load(url, args.requests, args.concurrency, args.clients)
+        finally:
+            drain_seconds = stop_server(server)
+        result["drain_seconds"] = drain_seconds
+
+        print(f"workers_{workers}: " + ", ".join(
+            f"{name}={value}" for name, value in result.items()))
+
+
+if __name__ == "__main__":
+    main()
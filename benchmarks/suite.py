@@ -0,0 +1,147 @@
+"""Runs the benchmark suite, stores its results and diffs them to a baseline.
+
+Suites (`--suites`, all by default):
+
+- `hot_path`: micro-benchmarks of `bench_hot_path` (cache, rate lookup,
+  repository inserts and `convert_currency_transaction`);
+- `convert_load`: the HTTP load of `bench_convert_load` against
+  `app.main:app`, RPS and p50/p95/p99;
+- `request_logging`: the per-request CPU cost of `bench_request_logging`.
+
+Results are written as JSON to `--output`. `--save-baseline` also stores
+them as the baseline, and later runs print each metric next to the
+baseline's with the relative change. Changes for the worse beyond
+`--threshold` are flagged and make the exit status 1, so a regression can
+fail a CI job. Baselines are machine specific, keep one per machine (they
+are not meant to be committed).
+
+Usage: python -m benchmarks.suite --save-baseline
+       python -m benchmarks.suite --suites hot_path --threshold 0.15
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import UTC, datetime
+from typing import Optional
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(__file__), "baselines", "baseline.json")
+OUTPUT_PATH = os.path.join(os.path.dirname(__file__), "baselines", "latest.json")
+
+# Metrics matching none of these are parameters (requests, concurrency...)
+HIGHER_IS_BETTER = ("_per_second",)
+LOWER_IS_BETTER = ("_ms", "_us", "errors", "dropped")
+
+
+def run_suite(name: str, args: argparse.Namespace) -> dict:
+    from app.core.singleton import SingletonMeta
+
+    # Every suite starts cold, with its own cache, database and rate table
+    SingletonMeta._instances.clear()
+
+    # Imported here as each benchmark sets up its environment on import
+    if name == "hot_path":
+        from benchmarks import bench_hot_path
+        return asyncio.run(bench_hot_path.run(args.iterations))
+    if name == "convert_load":
+        from benchmarks import bench_convert_load
+        return asyncio.run(bench_convert_load.run(
+            args.requests, args.concurrency, args.upstream_latency, None))
+    if name == "request_logging":
+        from benchmarks import bench_request_logging
+        return asyncio.run(bench_request_logging.run(args.requests * 5))
+    raise ValueError(f"Unknown suite {name}")
+
+
+def revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, check=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def direction(metric: str) -> int:
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for suite, metrics in results.items():
+        for metric, value in metrics.items():
+            previous = baseline.get(suite, {}).get(metric)
+            sign = direction(metric)
+            if previous is None or sign == 0:
+                print(f"{suite}.{metric}: {value}")
+                continue
+
+            change = (value - previous) / previous if previous else 0.0
+            regressed = sign * change < -threshold
+            print(f"{suite}.{metric}: {value} (baseline {previous}, "
+                  f"{change:+.1%}){' REGRESSION' if regressed else ''}")
+            if regressed:
+                regressions.append(f"{suite}.{metric}")
+
+    return regressions
+
+
+def save(path: str, document: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2, sort_keys=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--suites", default="hot_path,convert_load,request_logging")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--upstream-latency", type=float, default=0.05)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    args = parser.parse_args()
+
+    results = {
+        name: run_suite(name, args) for name in args.suites.split(",")
+    }
+    document = {
+        "revision": revision(),
+        "created_at": datetime.now(UTC).isoformat(),
+        "machine": f"{platform.machine()} {platform.processor()}".strip(),
+        "python": platform.python_version(),
+        "results": results
+    }
+    save(args.output, document)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        print(f"baseline: {baseline.get('revision')} "
+              f"({baseline.get('created_at')})")
+    regressions = compare(results, baseline.get("results", {}), args.threshold)
+
+    if args.save_baseline:
+        save(args.baseline, document)
+        print(f"baseline saved: {args.baseline}")
+    if regressions:
+        print(f"regressions: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""Local stand-in for the Exchange Rates API, for offline performance tests.
+
+Serves `GET /v1/latest` with the payload `ExchangeRatesApiClient` expects
+(`CurrencyConversionRatesSchema`: EUR based `rates`, `date`, `timestamp`),
+with a configurable:
+
+- `latency_seconds`, plus up to `latency_jitter_seconds` at random;
+- `error_rate`: share of requests answered with `error_status_code`, which
+  the circuit breaker counts as failures;
+- `currencies`: number of rates in the payload, hence its size;
+- `drift`: relative standard deviation of the random walk the rates take at
+  every publication, and `publish_interval_seconds` between publications
+  (0 publishes new rates, and a new version, on every request).
+
+`GET /simulator/stats` returns the counters and `PATCH /simulator/config`
+changes the configuration of a running simulator, e.g. to make it fail
+halfway through a benchmark. In-process, mount it behind
+`httpx.ASGITransport(app=ExchangeRatesApiSimulator().create_app())`. As a
+server, point `API_URL` at it:
+
+    python -m benchmarks.upstream_simulator --port 8001 --latency 0.2
+    API_URL=http://127.0.0.1:8001/v1/latest uvicorn app.main:app
+
+Usage: python -m benchmarks.upstream_simulator --error-rate 0.1 --drift 0.001
+"""
+import argparse
+import asyncio
+import math
+import random
+import string
+from dataclasses import asdict, dataclass, fields
+from datetime import UTC, datetime
+from itertools import product
+from time import monotonic, time
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Query, status
+
+COMMON_RATES = {
+    "EUR": 1.0, "USD": 1.07, "BRL": 5.5, "JPY": 168.2, "GBP": 0.85,
+    "CHF": 0.98, "CAD": 1.46, "AUD": 1.63, "CNY": 7.74, "ARS": 941.5
+}
+
+
+@dataclass
+class SimulatorConfig:
+    latency_seconds: float = 0.05
+    latency_jitter_seconds: float = 0.0
+    error_rate: float = 0.0
+    error_status_code: int = status.HTTP_503_SERVICE_UNAVAILABLE
+    currencies: int = 170
+    drift: float = 0.0
+    publish_interval_seconds: float = 3600
+    access_key: Optional[str] = None
+    seed: int = 0
+
+
+class ExchangeRatesApiSimulator:
+    def __init__(self, config: Optional[SimulatorConfig] = None):
+        self.config = config or SimulatorConfig()
+        self.__random = random.Random(self.config.seed)
+        self.__rates = self.__initial_rates(self.config.currencies)
+        self.__timestamp = int(time())
+        self.__published_at = monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.publications = 1
+
+    def configure(self, **changes) -> SimulatorConfig:
+        for name, value in changes.items():
+            setattr(self.config, name, value)
+        if "currencies" in changes:
+            self.__rates = self.__initial_rates(self.config.currencies)
+        return self.config
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "publications": self.publications
+        }
+
+    def latest(self) -> dict:
+        if monotonic() - self.__published_at >= \
+                self.config.publish_interval_seconds:
+            self.__publish()
+
+        return {
+            "success": True,
+            "timestamp": self.__timestamp,
+            "base": "EUR",
+            "date": datetime.fromtimestamp(self.__timestamp, UTC)
+            .date().isoformat(),
+            "rates": dict(self.__rates)
+        }
+
+    def create_app(self) -> FastAPI:
+        app = FastAPI(title="Exchange Rates API simulator")
+
+        @app.get("/v1/latest")
+        async def latest(access_key: Optional[str] = Query(None)):
+            self.requests += 1
+            await asyncio.sleep(
+                self.config.latency_seconds
+                + self.__random.uniform(0, self.config.latency_jitter_seconds))
+
+            if self.config.access_key is not None \
+                    and access_key != self.config.access_key:
+                self.errors += 1
+                raise HTTPException(status.HTTP_401_UNAUTHORIZED)
+            if self.__random.random() < self.config.error_rate:
+                self.errors += 1
+                raise HTTPException(self.config.error_status_code)
+
+            return self.latest()
+
+        @app.get("/simulator/stats")
+        async def stats() -> dict[str, int]:
+            return self.stats()
+
+        @app.patch("/simulator/config")
+        async def configure(changes: dict) -> dict:
+            names = {field.name for field in fields(SimulatorConfig)}
+            unknown = set(changes) - names
+            if unknown:
+                raise HTTPException(
+                    status.HTTP_400_BAD_REQUEST,
+                    f"Unknown settings: {', '.join(sorted(unknown))}")
+            return asdict(self.configure(**changes))
+
+        return app
+
+    def __initial_rates(self, currencies: int) -> dict[str, float]:
+        rates = dict(list(COMMON_RATES.items())[:currencies])
+        codes = (
+            "".join(code)
+            for code in product(string.ascii_uppercase, repeat=3)
+        )
+        while len(rates) < currencies:
+            code = next(codes)
+            if code not in rates:
+                rates[code] = round(
+                    10 ** self.__random.uniform(-1, 4), 6)
+        return rates
+
+    def __publish(self):
+        drift = self.config.drift
+        if drift:
+            self.__rates = {
+                code: rate if code == "EUR"
+                else round(rate * math.exp(self.__random.gauss(0, drift)), 6)
+                for code, rate in self.__rates.items()
+            }
+        self.__timestamp = max(self.__timestamp + 1, int(time()))
+        self.__published_at = monotonic()
+        self.publications += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status-code", type=int, default=503)
+    parser.add_argument("--currencies", type=int, default=170)
+    parser.add_argument("--drift", type=float, default=0.0)
+    parser.add_argument("--publish-interval", type=float, default=3600)
+    parser.add_argument("--access-key", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    simulator = ExchangeRatesApiSimulator(SimulatorConfig(
+        latency_seconds=args.latency,
+        latency_jitter_seconds=args.latency_jitter,
+        error_rate=args.error_rate,
+        error_status_code=args.error_status_code,
+        currencies=args.currencies,
+        drift=args.drift,
+        publish_interval_seconds=args.publish_interval,
+        access_key=args.access_key,
+        seed=args.seed
+    ))
+    uvicorn.run(simulator.create_app(), host=args.host, port=args.port,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
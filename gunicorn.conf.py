@@ -0,0 +1,56 @@
+"""Gunicorn settings to serve the API with several Uvicorn worker processes.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+The app is not preloaded, so every worker imports it after the fork and
+builds its own Redis pool, database engine and HTTP client in the lifespan.
+The schema is created once by the master before any worker starts.
+"""
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = False
+keepalive = 5
+timeout = int(os.getenv("WORKER_TIMEOUT_SECONDS", 60))
+# On SIGTERM workers stop accepting connections and get this long to finish
+# the requests in flight and run the lifespan shutdown (write-behind and log
+# buffers flush, pools close) before they are killed
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT_SECONDS", 30))
+# Proxies whose X-Forwarded-For the workers trust as the client address, the
+# rate limit keys requests without a user_id header by that address. Only
+# widen it when the port is reachable through those proxies alone, any other
+# client could pick its own address
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+os.environ["DATABASE_INIT_ON_STARTUP"] = "false"
+os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "currency-converter-metrics")
+)
+
+
+def on_starting(server):
+    metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir)
+
+    subprocess.run([sys.executable, "-m", "app.init_db"], check=True)
+
+
+def post_fork(server, worker):
+    # Only matters with --preload, instances built in the master must not be
+    # shared with the workers
+    from app.core.singleton import SingletonMeta
+    SingletonMeta._instances.clear()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,52 @@
+from alembic import context
+from sqlalchemy import create_engine
+
+from app.core.database import Base, Database
+from app.core.settings import Settings
+from app.models import currency_conversions_daily_pair_model  # noqa: F401
+from app.models import currency_conversions_daily_user_model  # noqa: F401
+from app.models import currency_conversions_model  # noqa: F401
+from app.models import exchange_rates_history_model  # noqa: F401
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    context.configure(
+        url=Database.sync_url(Settings.DATABASE_URL),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=True
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # Database.init_db hands over a connection of the app's async engine,
+    # the alembic command line connects with the sync driver instead
+    connection = context.config.attributes.get("connection")
+    if connection is not None:
+        run_migrations(connection)
+        return
+
+    engine = create_engine(Database.sync_url(Settings.DATABASE_URL))
+    with engine.connect() as connection:
+        run_migrations(connection)
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
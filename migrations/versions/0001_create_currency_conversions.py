@@ -0,0 +1,51 @@
+"""Create CurrencyConversions
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-05-01 00:00:00
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "CurrencyConversions",
+        sa.Column("transaction_id", sa.Integer(), autoincrement=True,
+                  nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("source_currency_code", sa.String(length=3),
+                  nullable=False),
+        sa.Column("source_currency_value", sa.Float(), nullable=False),
+        sa.Column("target_currency_code", sa.String(length=3),
+                  nullable=False),
+        sa.Column("rate_value", sa.Float(), nullable=False),
+        sa.Column("datetime", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("transaction_id"),
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_currency_conversions_user_id_datetime",
+        "CurrencyConversions",
+        ["user_id", "datetime", "transaction_id"],
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_currency_conversions_datetime",
+        "CurrencyConversions",
+        ["datetime", "transaction_id"],
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index("ix_currency_conversions_datetime",
+                  table_name="CurrencyConversions")
+    op.drop_index("ix_currency_conversions_user_id_datetime",
+                  table_name="CurrencyConversions")
+    op.drop_table("CurrencyConversions")
@@ -0,0 +1,30 @@
+"""Create ExchangeRatesHistory
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-05-20 00:00:00
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "ExchangeRatesHistory",
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("base", sa.String(length=3), nullable=False),
+        sa.Column("version", sa.String(), nullable=False),
+        sa.Column("codes", sa.String(), nullable=False),
+        sa.Column("rates", sa.LargeBinary(), nullable=False),
+        sa.PrimaryKeyConstraint("date"),
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_table("ExchangeRatesHistory")
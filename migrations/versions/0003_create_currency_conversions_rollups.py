@@ -0,0 +1,106 @@
+"""Create the daily CurrencyConversions rollups
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-05-27 00:00:00
+
+Both rollups are backfilled from the conversions already stored. Inserts do
+not touch them, `ConversionsRollupRefresher` rebuilds in the background every
+CONVERSIONS_ROLLUP_INTERVAL_SECONDS the rows of today and of the
+CONVERSIONS_ROLLUP_LOOKBACK_DAYS before it.
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def rollup_columns() -> list[sa.Column]:
+    return [
+        sa.Column("conversions", sa.Integer(), nullable=False),
+        sa.Column("source_volume", sa.Float(), nullable=False),
+        sa.Column("target_volume", sa.Float(), nullable=False)
+    ]
+
+
+def conversion_day(dialect_name: str, column: sa.ColumnClause):
+    if dialect_name == "sqlite":
+        return sa.func.date(column)
+    return sa.cast(sa.func.timezone("UTC", column), sa.Date)
+
+
+def backfill(rollup: str, keys: list[str]):
+    conversions = sa.table(
+        "CurrencyConversions",
+        *[sa.column(name) for name in (
+            "user_id", "source_currency_code", "target_currency_code",
+            "source_currency_value", "rate_value", "datetime")]
+    )
+    day = conversion_day(op.get_bind().dialect.name, conversions.c.datetime)
+    key_columns = [day] + [conversions.c[key] for key in keys]
+
+    op.execute(
+        sa.table(rollup, *[sa.column(name) for name in (
+            ["day"] + keys
+            + ["conversions", "source_volume", "target_volume"])])
+        .insert()
+        .from_select(
+            ["day"] + keys + ["conversions", "source_volume", "target_volume"],
+            sa.select(
+                *key_columns,
+                sa.func.count(),
+                sa.func.sum(conversions.c.source_currency_value),
+                sa.func.sum(conversions.c.source_currency_value
+                            * conversions.c.rate_value)
+            ).group_by(*key_columns)
+        )
+    )
+
+
+def upgrade():
+    op.create_table(
+        "CurrencyConversionsDailyPair",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("source_currency_code", sa.String(length=3),
+                  nullable=False),
+        sa.Column("target_currency_code", sa.String(length=3),
+                  nullable=False),
+        *rollup_columns(),
+        sa.PrimaryKeyConstraint(
+            "day", "source_currency_code", "target_currency_code"),
+        if_not_exists=True
+    )
+    op.create_table(
+        "CurrencyConversionsDailyUser",
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=False),
+        sa.Column("source_currency_code", sa.String(length=3),
+                  nullable=False),
+        sa.Column("target_currency_code", sa.String(length=3),
+                  nullable=False),
+        *rollup_columns(),
+        sa.PrimaryKeyConstraint(
+            "day", "user_id", "source_currency_code", "target_currency_code"),
+        if_not_exists=True
+    )
+    op.create_index(
+        "ix_currency_conversions_daily_user_user_id_day",
+        "CurrencyConversionsDailyUser",
+        ["user_id", "day"],
+        if_not_exists=True
+    )
+
+    backfill("CurrencyConversionsDailyPair",
+             ["source_currency_code", "target_currency_code"])
+    backfill("CurrencyConversionsDailyUser",
+             ["user_id", "source_currency_code", "target_currency_code"])
+
+
+def downgrade():
+    op.drop_index("ix_currency_conversions_daily_user_user_id_day",
+                  table_name="CurrencyConversionsDailyUser")
+    op.drop_table("CurrencyConversionsDailyUser")
+    op.drop_table("CurrencyConversionsDailyPair")
@@ -1,6 +1,8 @@
 import os
 import sys
 
+import pytest
+
 sys.path.insert(0, os.path.abspath(
     os.path.join(os.path.dirname(__file__), '..')))
 
@@ -15,3 +17,9 @@ def pytest_configure():
     os.environ["LOKI_URL"] = "http://127.0.0.1:3100"
     os.environ["LOKI_USER"] = "admin"
     os.environ["LOKI_PASSWORD"] = "admin"
+    os.environ["RATE_REFRESHER_ENABLED"] = "false"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
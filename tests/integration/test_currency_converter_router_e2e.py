@@ -1,3 +1,6 @@
+import csv
+import io
+import json
 from datetime import UTC, datetime
 
 import pytest
@@ -12,21 +15,19 @@ from app.models.currency_conversions_model import CurrencyConversionsModel
 @pytest.fixture(scope="module")
 def test_client():
     # Setup
-    db = Database()
-    db.init_db()
-    cache = Cache()
-    fastapi_test_client = TestClient(app)
+    with TestClient(app) as fastapi_test_client:
+        fastapi_test_client.portal.call(Database().init_db)
 
-    # Act
-    yield fastapi_test_client
+        # Act
+        yield fastapi_test_client
 
-    # Teardown
-    db.drop_db()
-    cache.flush_all()
+        # Teardown
+        fastapi_test_client.portal.call(Database().drop_db)
+        fastapi_test_client.portal.call(Cache().flush_all)
 
 
 @pytest.fixture(scope="module")
-def setup_database():
+def setup_database(test_client):
     transaction1 = CurrencyConversionsModel()
     transaction1.user_id = "user_test1"
     transaction1.source_currency_code = "AUD"
@@ -43,9 +44,12 @@ def setup_database():
     transaction2.rate_value = 30.18965
     transaction2.datetime = datetime.now(UTC)
 
-    with Database().get_db_session() as db_session:
-        db_session.add_all([transaction1, transaction2])
-        db_session.commit()
+    async def add_transactions():
+        async with Database().get_db_session() as db_session:
+            db_session.add_all([transaction1, transaction2])
+            await db_session.commit()
+
+    test_client.portal.call(add_transactions)
 
 
 def test_get_conversions_user_success_with_user_id_one_transaction_found(test_client, setup_database):
@@ -87,6 +91,50 @@ def test_get_conversions_user_sucess_without_user_id_two_transactions_found(test
     assert response.json()[1].get("user_id") == "user_test2"
 
 
+def test_get_conversions_paginated_with_cursor(test_client, setup_database):
+    # Act
+    response_part1 = test_client.get(
+        "/currencyConverter/v1/conversions", params={"limit": 1})
+    response_part2 = test_client.get(
+        "/currencyConverter/v1/conversions",
+        params={"limit": 1, "cursor": response_part1.headers["X-Next-Cursor"]}
+    )
+
+    # Assert
+    assert response_part1.status_code == 200
+    assert [item.get("user_id") for item in response_part1.json()] == ["user_test1"]
+    assert response_part2.status_code == 200
+    assert [item.get("user_id") for item in response_part2.json()] == ["user_test2"]
+    assert "X-Next-Cursor" not in response_part2.headers
+
+
+def test_export_conversions_ndjson(test_client, setup_database):
+    # Act
+    response = test_client.get(
+        "/currencyConverter/v1/conversions/export",
+        headers={"user-id": "user_test2"}
+    )
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = response.text.splitlines()
+    assert len(lines) == 1
+    assert json.loads(lines[0]).get("target_currency_code") == "JPY"
+
+
+def test_export_conversions_csv(test_client, setup_database):
+    # Act
+    response = test_client.get(
+        "/currencyConverter/v1/conversions/export", params={"format": "csv"})
+
+    # Assert
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["user_id"] for row in rows] == ["user_test1", "user_test2"]
+
+
 def test_convert_currency_success_with_valid_currencies(test_client):
     # Arrange
     payload = {
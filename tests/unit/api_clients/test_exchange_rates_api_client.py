@@ -1,10 +1,11 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import httpx
 import pytest
 from pybreaker import CircuitBreakerError
-from requests.exceptions import RequestException
 
 from app.api_clients.exchange_rates_api_client import ExchangeRatesApiClient
+from app.core.http_circuit_breaker import HttpCircuitBreaker
 from app.schemas.currency_conversion_rates_schema import \
     CurrencyConversionRatesSchema
 
@@ -14,6 +15,11 @@ def mock_settings():
     with patch("app.api_clients.exchange_rates_api_client.Settings") as MockSettings:
         MockSettings.API_URL = "https://test_api"
         MockSettings.API_ACCESS_KEY = "fake_access_key"
+        MockSettings.API_MAX_CONNECTIONS = 10
+        MockSettings.API_MAX_KEEPALIVE_CONNECTIONS = 5
+        MockSettings.API_KEEPALIVE_EXPIRY_SECONDS = 30
+        MockSettings.API_TIMEOUT_SECONDS = 5
+        MockSettings.API_RETRIES = 2
         yield MockSettings
 
 
@@ -29,10 +35,12 @@ def mock_http_circuit_breaker():
         "app.api_clients.exchange_rates_api_client.HttpCircuitBreaker"
     ) as MockHttpCircuitBreaker:
         mock_breaker_instance = MockHttpCircuitBreaker.return_value
+        mock_breaker_instance.fetch_data = AsyncMock()
         yield mock_breaker_instance
 
 
-def test_fetch_all_conversion_rates_success(mock_settings, mock_logger, mock_http_circuit_breaker):
+@pytest.mark.anyio
+async def test_fetch_all_conversion_rates_success(mock_settings, mock_logger, mock_http_circuit_breaker):
     # Arrange
     mock_response_data = {
         "base": "BRL",
@@ -44,7 +52,7 @@ def test_fetch_all_conversion_rates_success(mock_settings, mock_logger, mock_htt
     client = ExchangeRatesApiClient()
 
     # Act
-    result = client.fetch_all_conversion_rates()
+    result = await client.fetch_all_conversion_rates()
 
     # Assert
     assert isinstance(result, CurrencyConversionRatesSchema)
@@ -56,13 +64,14 @@ def test_fetch_all_conversion_rates_success(mock_settings, mock_logger, mock_htt
         'Successfully fetched all currency conversion rates')
 
 
-def test_fetch_all_conversion_rates_circuit_breaker_error(mock_settings, mock_logger, mock_http_circuit_breaker):
+@pytest.mark.anyio
+async def test_fetch_all_conversion_rates_circuit_breaker_error(mock_settings, mock_logger, mock_http_circuit_breaker):
     # Arrange
     mock_http_circuit_breaker.fetch_data.side_effect = CircuitBreakerError
     client = ExchangeRatesApiClient()
 
     # Act
-    result = client.fetch_all_conversion_rates()
+    result = await client.fetch_all_conversion_rates()
 
     # Assert
     assert result is None
@@ -70,16 +79,93 @@ def test_fetch_all_conversion_rates_circuit_breaker_error(mock_settings, mock_lo
         "Exchange Rates API currently unavailable.")
 
 
-def test_fetch_all_conversion_rates_request_exception(mock_settings, mock_logger, mock_http_circuit_breaker):
+@pytest.mark.anyio
+async def test_fetch_all_conversion_rates_request_exception(mock_settings, mock_logger, mock_http_circuit_breaker):
     # Arrange
-    mock_http_circuit_breaker.fetch_data.side_effect = RequestException(
+    mock_http_circuit_breaker.fetch_data.side_effect = httpx.HTTPError(
         "An error occurred")
     client = ExchangeRatesApiClient()
 
     # Act
-    result = client.fetch_all_conversion_rates()
+    result = await client.fetch_all_conversion_rates()
 
     # Assert
     assert result is None
     mock_logger.error.assert_called_with(
         "An error occurred when fetch data: An error occurred")
+
+
+@pytest.mark.anyio
+async def test_get_http_client_pooled_keep_alive_client(mock_settings):
+    # Arrange
+    await ExchangeRatesApiClient.close()
+
+    # Act
+    client = ExchangeRatesApiClient.get_http_client()
+    stats = ExchangeRatesApiClient.pool_stats()
+    await ExchangeRatesApiClient.close()
+
+    # Assert
+    assert client.timeout.read == 5
+    assert stats == {"max_connections": 10, "connections": 0, "in_use": 0}
+
+
+@pytest.fixture
+def upstream(mock_settings):
+    """Stand-in for the Exchange Rates API answering with `status_code`, a
+    new publication of EUR based rates on every successful request."""
+    upstream = {"status_code": 200, "requests": []}
+
+    def latest(request: httpx.Request) -> httpx.Response:
+        upstream["requests"].append(request)
+        if upstream["status_code"] != 200:
+            return httpx.Response(upstream["status_code"])
+
+        published = len(upstream["requests"])
+        return httpx.Response(200, json={
+            "success": True,
+            "timestamp": 1714557600 + published,
+            "base": "EUR",
+            "date": "2024-05-01",
+            "rates": {"EUR": 1.0, "USD": 1.07 + published / 100, "BRL": 5.5}
+        })
+
+    mock_settings.API_URL = "http://upstream/v1/latest"
+    ExchangeRatesApiClient._http_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(latest))
+    HttpCircuitBreaker._breaker.close()
+    yield upstream
+    HttpCircuitBreaker._breaker.close()
+    ExchangeRatesApiClient._http_client = None
+
+
+@pytest.mark.anyio
+async def test_fetch_all_conversion_rates_from_upstream(upstream, mock_logger):
+    # Arrange
+    client = ExchangeRatesApiClient()
+
+    # Act
+    first = await client.fetch_all_conversion_rates()
+    second = await client.fetch_all_conversion_rates()
+
+    # Assert
+    assert first.rates["EUR"] == second.rates["EUR"] == 1.0
+    assert first.timestamp < second.timestamp
+    assert first.rates["USD"] != second.rates["USD"]
+    assert upstream["requests"][0].url.params["access_key"] == \
+        "fake_access_key"
+
+
+@pytest.mark.anyio
+async def test_circuit_breaker_opens_on_failing_upstream(upstream, mock_logger):
+    # Arrange
+    upstream["status_code"] = 503
+    client = ExchangeRatesApiClient()
+
+    # Act
+    results = [await client.fetch_all_conversion_rates() for _ in range(5)]
+
+    # Assert
+    assert results == [None] * 5
+    assert HttpCircuitBreaker.is_open()
+    assert len(upstream["requests"]) == 3
@@ -0,0 +1,189 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from prometheus_client import REGISTRY
+from redis.exceptions import RedisError
+
+from app.core.cache import Cache
+from app.core.singleton import SingletonMeta
+
+
+@pytest.fixture
+def mock_redis():
+    SingletonMeta._instances.pop(Cache, None)
+    with patch("app.core.cache.redis.Redis") as MockRedis, \
+            patch("app.core.cache.Logger"):
+        MockRedis.return_value = AsyncMock()
+        MockRedis.return_value.pipeline = MagicMock()
+        MockRedis.return_value.register_script = MagicMock()
+        yield MockRedis.return_value
+    SingletonMeta._instances.pop(Cache, None)
+
+
+@pytest.mark.anyio
+async def test_set_hash_replaces_table_atomically(mock_redis):
+    # Arrange
+    pipe = MagicMock(execute=AsyncMock())
+    mock_redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # Act
+    result = await Cache().set_hash("eur-rates", {"BRL": 5.5}, exp_seconds=30)
+
+    # Assert
+    assert result is True
+    mock_redis.pipeline.assert_called_once_with(transaction=True)
+    pipe.delete.assert_called_once_with("eur-rates")
+    pipe.hset.assert_called_once_with(name="eur-rates", mapping={"BRL": 5.5})
+    pipe.expire.assert_called_once_with(name="eur-rates", time=30)
+    pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_set_hash_redis_error(mock_redis):
+    # Arrange
+    pipe = MagicMock(execute=AsyncMock(side_effect=RedisError("down")))
+    mock_redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # Act
+    result = await Cache().set_hash("eur-rates", {"BRL": 5.5})
+
+    # Assert
+    assert result is False
+
+
+@pytest.mark.anyio
+async def test_get_hash_fields_single_round_trip(mock_redis):
+    # Arrange
+    mock_redis.hmget.return_value = [b"5.5", None]
+
+    # Act
+    result = await Cache().get_hash_fields("eur-rates", "BRL", "ZZZ")
+
+    # Assert
+    assert result == [b"5.5", None]
+    mock_redis.hmget.assert_called_once_with("eur-rates", ("BRL", "ZZZ"))
+
+
+@pytest.mark.anyio
+async def test_get_hash_fields_redis_error(mock_redis):
+    # Arrange
+    mock_redis.hmget.side_effect = RedisError("down")
+
+    # Act
+    result = await Cache().get_hash_fields("eur-rates", "BRL", "USD")
+
+    # Assert
+    assert result == [None, None]
+
+
+@pytest.mark.anyio
+async def test_get_hash_redis_error(mock_redis):
+    # Arrange
+    mock_redis.hgetall.side_effect = RedisError("down")
+
+    # Act
+    result = await Cache().get_hash("eur-rates")
+
+    # Assert
+    assert result == {}
+
+
+@pytest.mark.anyio
+async def test_increment_redis_error(mock_redis):
+    # Arrange
+    mock_redis.incrby.side_effect = RedisError("down")
+
+    # Act
+    result = await Cache().increment("conversion-ids", 1000)
+
+    # Assert
+    assert result is None
+
+
+@pytest.mark.anyio
+async def test_get_counts_hits_and_misses(mock_redis):
+    # Arrange
+    mock_redis.get.side_effect = [b"value", None]
+
+    def lookups(result):
+        return REGISTRY.get_sample_value(
+            "cache_lookups_total", {"operation": "get", "result": result}
+        ) or 0
+    hits, misses = lookups("hit"), lookups("miss")
+
+    # Act
+    await Cache().get("key")
+    await Cache().get("missing")
+
+    # Assert
+    assert lookups("hit") == hits + 1
+    assert lookups("miss") == misses + 1
+
+
+def test_pool_stats_bounded_pool(mock_redis):
+    # Act
+    result = Cache().pool_stats()
+
+    # Assert
+    assert result == {"max_connections": 50, "connections": 0, "in_use": 0}
+
+
+@pytest.mark.anyio
+async def test_take_token_limits_bucket_atomically():
+    # Arrange
+    SingletonMeta._instances.pop(Cache, None)
+    with patch("app.core.cache.redis.Redis", return_value=FakeRedis()):
+        cache = Cache()
+    SingletonMeta._instances.pop(Cache, None)
+
+    # Act
+    results = [await cache.take_token("rate-limit:user", 1, 2)
+               for _ in range(3)]
+
+    # Assert
+    assert results[:2] == [0, 0]
+    assert 0 < results[2] <= 1
+
+
+@pytest.mark.anyio
+async def test_take_token_redis_error(mock_redis):
+    # Arrange
+    mock_redis.register_script.return_value = AsyncMock(
+        side_effect=RedisError("down"))
+
+    # Act
+    result = await Cache().take_token("rate-limit:user", 1, 2)
+
+    # Assert
+    assert result is None
+
+
+@pytest.mark.anyio
+async def test_push_and_pop_list_in_order():
+    # Arrange
+    SingletonMeta._instances.pop(Cache, None)
+    with patch("app.core.cache.redis.Redis", return_value=FakeRedis()):
+        cache = Cache()
+    SingletonMeta._instances.pop(Cache, None)
+    await cache.push_list("dead-letter", ["a", "b", "c"])
+
+    # Act
+    first = await cache.pop_list("dead-letter", 2)
+    rest = await cache.pop_list("dead-letter", 2)
+    empty = await cache.pop_list("dead-letter", 2)
+
+    # Assert
+    assert (first, rest, empty) == ([b"a", b"b"], [b"c"], [])
+
+
+@pytest.mark.anyio
+async def test_push_list_redis_error(mock_redis):
+    # Arrange
+    mock_redis.rpush.side_effect = RedisError("down")
+
+    # Act
+    result = await Cache().push_list("dead-letter", ["a"])
+
+    # Assert
+    assert result is False
@@ -0,0 +1,52 @@
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.id_allocator import IdAllocator
+from app.exceptions.transaction_ids_unavailable_exception import \
+    TransactionIdsUnavailableException
+
+
+@pytest.fixture
+def cache():
+    return AsyncMock()
+
+
+@pytest.mark.anyio
+async def test_allocate_reserves_one_block_per_block_size_ids(cache):
+    # Arrange
+    cache.increment.side_effect = [10, 30]
+    allocator = IdAllocator(cache, "conversion-ids", block_size=10)
+
+    # Act
+    result = [await allocator.allocate() for _ in range(12)]
+
+    # Assert
+    assert result == list(range(1, 11)) + [21, 22]
+    assert cache.increment.await_count == 2
+
+
+@pytest.mark.anyio
+async def test_allocate_raises_counter_lost_by_redis(cache):
+    # Arrange
+    cache.increment.side_effect = [10, 60]
+    allocator = IdAllocator(cache, "conversion-ids", block_size=10)
+    await allocator.raise_floor(50)
+
+    # Act
+    result = await allocator.allocate()
+
+    # Assert
+    assert result == 51
+    cache.raise_counter.assert_awaited_with("conversion-ids", 50)
+
+
+@pytest.mark.anyio
+async def test_allocate_redis_unavailable(cache):
+    # Arrange
+    cache.increment.return_value = None
+    allocator = IdAllocator(cache, "conversion-ids", block_size=10)
+
+    # Act and Assert
+    with pytest.raises(TransactionIdsUnavailableException):
+        await allocator.allocate()
@@ -0,0 +1,64 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.core.load_shedder import LoadShedder
+from app.core.singleton import SingletonMeta
+
+
+@pytest.fixture
+def shedder():
+    SingletonMeta._instances.pop(LoadShedder, None)
+    with patch("app.core.load_shedder.Settings") as MockSettings:
+        MockSettings.LOAD_SHED_MAX_IN_FLIGHT = 2
+        MockSettings.LOAD_SHED_P99_SECONDS = 1
+        MockSettings.LOAD_SHED_WINDOW_SIZE = 100
+        MockSettings.LOAD_SHED_EVALUATE_INTERVAL_SECONDS = 0
+        MockSettings.LOAD_SHED_STEP = 0.5
+        MockSettings.LOAD_SHED_MAX_RATE = 0.5
+        yield LoadShedder()
+    SingletonMeta._instances.pop(LoadShedder, None)
+
+
+def test_admit_rejects_over_max_in_flight(shedder):
+    # Act
+    admitted = [shedder.admit() for _ in range(3)]
+    shedder.release(0.1)
+
+    # Assert
+    assert admitted == [True, True, False]
+    assert shedder.admit() is True
+    assert shedder.stats()["shed"] == 1
+
+
+def test_admit_adapts_shed_rate_to_p99(shedder):
+    # Arrange
+    shedder.admit()
+    shedder.release(2.0)
+
+    # Act
+    with patch("app.core.load_shedder.random.random", return_value=0.4):
+        shed = shedder.admit()
+        shed_rate = shedder.shed_rate
+        recovered = shedder.admit()
+
+    # Assert
+    assert shed is False
+    assert shed_rate == 0.5
+    assert recovered is True
+    assert shedder.shed_rate == 0
+
+
+def test_release_without_latency_leaves_p99_alone(shedder):
+    # Arrange
+    shedder.admit()
+    shedder.release(None)
+
+    # Act
+    admitted = shedder.admit()
+
+    # Assert
+    assert admitted is True
+    assert shedder.in_flight == 1
+    assert shedder.p99 == 0
+    assert shedder.shed_rate == 0
@@ -0,0 +1,55 @@
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.load_shedding_middleware import LoadSheddingMiddleware
+from app.core.settings import Settings
+
+app = FastAPI()
+app.add_middleware(LoadSheddingMiddleware)
+
+
+@app.get("/items")
+async def get_items():
+    return []
+
+
+@patch("app.core.load_shedding_middleware.LoadShedder")
+def test_load_shedding_middleware_rejects_when_overloaded(mock_shedder):
+    # Arrange
+    mock_shedder.return_value.admit.side_effect = [True, False]
+
+    # Act
+    with patch.object(Settings, "LOAD_SHED_ENABLED", True):
+        client = TestClient(app)
+        admitted = client.get("/items")
+        shed = client.get("/items")
+
+    # Assert
+    assert admitted.status_code == 200
+    assert shed.status_code == 503
+    assert shed.headers["Retry-After"] == "1"
+    mock_shedder.return_value.release.assert_called_once()
+
+
+@patch("app.core.load_shedding_middleware.LoadShedder")
+def test_load_shedding_middleware_leaves_untimed_paths_out_of_p99(mock_shedder):
+    # Arrange
+    mock_shedder.return_value.admit.return_value = True
+    untimed_app = FastAPI()
+    untimed_app.add_middleware(LoadSheddingMiddleware)
+    untimed_app.get("/export")(get_items)
+    untimed_app.get("/items")(get_items)
+
+    # Act
+    with patch.object(Settings, "LOAD_SHED_ENABLED", True), \
+            patch.object(Settings, "LOAD_SHED_UNTIMED_PATHS", {"/export"}):
+        client = TestClient(untimed_app)
+        client.get("/export")
+        client.get("/items")
+
+    # Assert
+    untimed, timed = mock_shedder.return_value.release.call_args_list
+    assert untimed.args == (None,)
+    assert timed.args[0] >= 0
@@ -0,0 +1,48 @@
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from app.core.log_requets_midleware import LogRequestsMiddleware
+from app.core.settings import Settings
+
+app = FastAPI()
+app.add_middleware(LogRequestsMiddleware)
+
+
+@app.get("/items/{item_id}")
+async def get_item(item_id: int):
+    if item_id == 0:
+        raise HTTPException(status_code=503)
+    return {"item_id": item_id}
+
+
+@pytest.fixture
+def logger():
+    with patch("app.core.log_requets_midleware.Logger") as logger, \
+            patch.object(Settings, "LOG_REQUESTS_SAMPLE_RATE", 1), \
+            patch.object(Settings, "LOG_REQUESTS_SAMPLE_RATES",
+                         {"/items/{item_id}": 0}):
+        yield logger
+
+
+def test_log_requests_skips_requests_sampled_out(logger):
+    # Act
+    response = TestClient(app).get("/items/1")
+
+    # Assert
+    assert response.status_code == 200
+    logger.info.assert_not_called()
+
+
+def test_log_requests_always_logs_server_errors(logger):
+    # Act
+    response = TestClient(app).get("/items/0", headers={"user-id": "123"})
+
+    # Assert
+    assert response.status_code == 503
+    fields = logger.info.call_args.kwargs
+    assert fields["path"] == "/items/{item_id}"
+    assert fields["status_code"] == 503
+    assert fields["user_id"] == "123"
@@ -0,0 +1,131 @@
+import json
+import logging
+
+import httpx
+import pytest
+
+from app.core.loki_handler import LokiHandler
+
+
+@pytest.fixture
+def pushes():
+    return []
+
+
+@pytest.fixture
+def handler(pushes):
+    def push(request: httpx.Request) -> httpx.Response:
+        pushes.append(json.loads(request.content))
+        return httpx.Response(204)
+
+    handler = LokiHandler(
+        url="http://loki/loki/api/v1/push",
+        labels={"application": "test"},
+        auth=("admin", "admin"),
+        batch_size=2,
+        flush_interval=60,
+        buffer_size=3,
+        transport=httpx.MockTransport(push)
+    )
+    yield handler
+    handler.close()
+
+
+def record(level: int, message: str, *args, **fields) -> logging.LogRecord:
+    record = logging.LogRecord(
+        "test", level, __file__, 1, message, args, None)
+    record.fields = fields
+    return record
+
+
+def test_flush_pushes_structured_lines_in_batches(handler, pushes):
+    # Arrange
+    handler.emit(record(logging.INFO, "Converted %s", "BRL", user_id="123"))
+    handler.emit(record(logging.ERROR, "Failed"))
+    handler.emit(record(logging.INFO, "Converted %s", "USD"))
+
+    # Act
+    handler.flush()
+
+    # Assert
+    assert len(pushes) == 2
+    streams = pushes[0]["streams"]
+    assert streams[0]["stream"] == {"application": "test", "severity": "info"}
+    assert json.loads(streams[0]["values"][0][1]) == {
+        "message": "Converted BRL", "logger": "test", "user_id": "123"}
+    assert streams[1]["stream"]["severity"] == "error"
+    assert handler.stats() == {
+        "pending": 0, "pushed": 3, "dropped": 0, "failed": 0}
+
+
+def test_emit_drops_records_when_buffer_is_full(handler, pushes):
+    # Arrange
+    handler.flush = lambda: None
+
+    # Act
+    for index in range(5):
+        handler.emit(record(logging.INFO, f"Message {index}"))
+
+    # Assert
+    assert handler.stats()["pending"] == 3
+    assert handler.stats()["dropped"] == 2
+
+
+def test_emit_defers_message_formatting_to_flush(handler, pushes):
+    # Arrange
+    class Value:
+        formatted = 0
+
+        def __str__(self):
+            Value.formatted += 1
+            return "value"
+
+    # Act
+    handler.emit(record(logging.INFO, "Message %s", Value()))
+    formatted_on_emit = Value.formatted
+    handler.flush()
+
+    # Assert
+    assert formatted_on_emit == 0
+    assert Value.formatted == 1
+
+
+def test_pushes_do_not_log_records_to_push(handler, pushes):
+    # Arrange
+    root = logging.getLogger()
+    level = root.level
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+    # Act
+    try:
+        logging.getLogger("test").info("Converted")
+        handler.flush()
+        handler.flush()
+    finally:
+        root.removeHandler(handler)
+        root.setLevel(level)
+
+    # Assert
+    assert len(pushes) == 1
+    assert handler.stats()["pending"] == 0
+
+
+def test_flush_leaves_records_logged_meanwhile_to_next_flush(handler, pushes):
+    # Arrange
+    handler.emit(record(logging.INFO, "First"))
+    format_record = handler.format
+
+    def format_and_log(logged):
+        if logged.getMessage() == "First":
+            handler.emit(record(logging.INFO, "Second"))
+        return format_record(logged)
+
+    handler.format = format_and_log
+
+    # Act
+    handler.flush()
+
+    # Assert
+    assert len(pushes) == 1
+    assert handler.stats()["pending"] == 1
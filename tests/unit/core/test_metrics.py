@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+from unittest.mock import Mock
+
+from prometheus_client import REGISTRY
+from pybreaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN
+
+from app.core.metrics import CircuitBreakerStateListener, render_metrics
+
+
+def breaker_state() -> float:
+    return REGISTRY.get_sample_value(
+        "circuit_breaker_state", {"name": "test"})
+
+
+def test_circuit_breaker_state_listener_tracks_state_changes():
+    # Arrange
+    listener = CircuitBreakerStateListener("test")
+    states = []
+
+    # Act
+    for old_state, new_state in (
+        (STATE_CLOSED, STATE_OPEN),
+        (STATE_OPEN, STATE_HALF_OPEN),
+        (STATE_HALF_OPEN, STATE_CLOSED)
+    ):
+        listener.state_change(
+            Mock(),
+            SimpleNamespace(name=old_state),
+            SimpleNamespace(name=new_state)
+        )
+        states.append(breaker_state())
+
+    # Assert
+    assert states == [2, 1, 0]
+
+
+def test_render_metrics_exposes_text_format():
+    # Act
+    content, media_type = render_metrics()
+
+    # Assert
+    assert media_type.startswith("text/plain")
+    assert b"circuit_breaker_state" in content
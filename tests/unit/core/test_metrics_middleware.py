@@ -0,0 +1,36 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.core.metrics_middleware import MetricsMiddleware
+
+app = FastAPI()
+app.add_middleware(MetricsMiddleware)
+
+
+@app.get("/items/{item_id}")
+async def get_item(item_id: int):
+    return {"item_id": item_id}
+
+
+def requests_count(route: str, status_code: str) -> float:
+    return REGISTRY.get_sample_value(
+        "http_request_duration_seconds_count",
+        {"method": "GET", "route": route, "status_code": status_code}
+    ) or 0
+
+
+def test_metrics_middleware_labels_requests_by_route_template():
+    # Arrange
+    client = TestClient(app)
+    matched = requests_count("/items/{item_id}", "200")
+    unmatched = requests_count("unmatched", "404")
+
+    # Act
+    client.get("/items/1")
+    client.get("/items/2")
+    client.get("/unknown")
+
+    # Assert
+    assert requests_count("/items/{item_id}", "200") == matched + 2
+    assert requests_count("unmatched", "404") == unmatched + 1
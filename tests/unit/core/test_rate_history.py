@@ -0,0 +1,71 @@
+from datetime import date
+
+import pytest
+
+from app.core.rate_history import HistoricalRates, RateHistoryStore
+from app.core.singleton import SingletonMeta
+
+
+@pytest.fixture
+def store():
+    SingletonMeta._instances.pop(RateHistoryStore, None)
+    yield RateHistoryStore()
+    SingletonMeta._instances.pop(RateHistoryStore, None)
+
+
+def historical_rates(store, rates_date, rates):
+    return HistoricalRates.unpack(
+        rates_date=rates_date,
+        base="EUR",
+        version=f"{rates_date}:0",
+        codes=store.codes_of(list(rates)),
+        packed_rates=HistoricalRates.pack(list(rates.values()))
+    )
+
+
+def test_historical_rates_cross_rate_from_packed_rates(store):
+    # Act
+    result = historical_rates(store, date(2024, 5, 1), {"USD": 1.25, "BRL": 5.0})
+
+    # Assert
+    assert result.rates.nbytes == 16
+    assert result.cross_rate("USD", "BRL") == 4.0
+
+
+def test_store_serves_latest_rates_on_or_before_date(store):
+    # Arrange
+    store.add(historical_rates(store, date(2024, 5, 3), {"USD": 1.0}))
+    store.add(historical_rates(store, date(2024, 5, 1), {"USD": 2.0}))
+    store.add(historical_rates(store, date(2024, 5, 3), {"USD": 3.0}))
+
+    # Act
+    before, between, exact = (
+        store.get_rates_on(date(2024, 4, 30)),
+        store.get_rates_on(date(2024, 5, 2)),
+        store.get_rates_on(date(2024, 5, 3))
+    )
+
+    # Assert
+    assert before is None
+    assert between.date == date(2024, 5, 1)
+    assert exact.rates[0] == 3.0
+    assert store.stats()["dates"] == 2
+    assert store.codes_of(["USD"]) is between.codes
+
+
+@pytest.mark.anyio
+async def test_store_only_syncs_lookups_of_latest_date(store):
+    # Arrange
+    async def load():
+        store.add(historical_rates(store, date(2024, 5, 3), {"USD": 1.0}))
+
+    # Act
+    needed_before = store.needs_sync(date(2024, 5, 1), sync_interval=60)
+    await store.sync(load)
+
+    # Assert
+    assert needed_before
+    assert not store.needs_sync(date(2024, 5, 1), sync_interval=0)
+    assert store.needs_sync(date(2024, 5, 3), sync_interval=0)
+    assert not store.needs_sync(date(2024, 5, 3), sync_interval=60)
+    assert store.syncs == 1
@@ -0,0 +1,71 @@
+from unittest.mock import AsyncMock, patch
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
+
+from app.core.rate_limit_middleware import RateLimitMiddleware
+from app.core.settings import Settings
+
+app = FastAPI()
+app.add_middleware(RateLimitMiddleware)
+
+
+@app.get("/items")
+async def get_items():
+    return []
+
+
+@app.get("/healthcheck")
+async def healthcheck():
+    return {"status": "Health"}
+
+
+@patch("app.core.rate_limit_middleware.Cache")
+@patch("app.core.rate_limit_middleware.RateLimiter")
+def test_rate_limit_middleware_limits_by_user_id(mock_limiter, mock_cache):
+    # Arrange
+    mock_limiter.return_value.acquire = AsyncMock(side_effect=[0, 1.2])
+
+    # Act
+    with patch.object(Settings, "RATE_LIMIT_ENABLED", True):
+        client = TestClient(app)
+        allowed = client.get("/items", headers={"user-id": "test_user"})
+        limited = client.get("/items", headers={"user-id": "test_user"})
+        exempt = client.get("/healthcheck", headers={"user-id": "test_user"})
+
+    # Assert
+    assert allowed.status_code == 200
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "2"
+    assert exempt.status_code == 200
+    mock_limiter.return_value.acquire.assert_awaited_with(
+        mock_cache.return_value, "user:test_user")
+    assert mock_limiter.return_value.acquire.await_count == 2
+
+
+@patch("app.core.rate_limit_middleware.Cache")
+@patch("app.core.rate_limit_middleware.RateLimiter")
+def test_rate_limit_middleware_limits_each_forwarded_client_apart(
+        mock_limiter, mock_cache):
+    # Arrange
+    taken = []
+
+    async def acquire(cache, key):
+        taken.append(key)
+        return 0 if taken.count(key) == 1 else 1.0
+
+    mock_limiter.return_value.acquire = AsyncMock(side_effect=acquire)
+    client = TestClient(ProxyHeadersMiddleware(app, trusted_hosts="*"))
+
+    # Act
+    with patch.object(Settings, "RATE_LIMIT_ENABLED", True):
+        responses = [
+            client.get("/items", headers={"X-Forwarded-For": address})
+            for address in ("203.0.113.1", "203.0.113.2", "203.0.113.1")
+        ]
+
+    # Assert
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert taken == [
+        "client:203.0.113.1", "client:203.0.113.2", "client:203.0.113.1"]
@@ -0,0 +1,91 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.rate_limiter import RateLimiter, TokenBuckets
+from app.core.singleton import SingletonMeta
+
+
+@pytest.fixture
+def limiter():
+    SingletonMeta._instances.pop(RateLimiter, None)
+    with patch("app.core.rate_limiter.Settings") as MockSettings:
+        MockSettings.RATE_LIMIT_PER_SECOND = 1
+        MockSettings.RATE_LIMIT_BURST = 2
+        MockSettings.RATE_LIMIT_KEY_PREFIX = "rate-limit"
+        MockSettings.RATE_LIMIT_MAX_LOCAL_KEYS = 100
+        yield RateLimiter()
+    SingletonMeta._instances.pop(RateLimiter, None)
+
+
+def test_token_buckets_refill_up_to_capacity():
+    # Arrange
+    buckets = TokenBuckets(rate=2, capacity=2, max_keys=10)
+
+    # Act
+    burst = [buckets.take("user", now=0) for _ in range(3)]
+    refilled = buckets.take("user", now=0.5)
+
+    # Assert
+    assert burst == [0, 0, 0.5]
+    assert refilled == 0
+
+
+def test_token_buckets_evicts_least_recently_used_key():
+    # Arrange
+    buckets = TokenBuckets(rate=1, capacity=1, max_keys=2)
+    buckets.take("user-1", now=0)
+    buckets.take("user-2", now=0)
+
+    # Act
+    buckets.take("user-3", now=0)
+
+    # Assert
+    assert len(buckets) == 2
+    assert buckets.take("user-1", now=0) == 0
+    assert buckets.take("user-3", now=0) == 1
+
+
+@pytest.mark.anyio
+async def test_acquire_limited_by_global_bucket(limiter):
+    # Arrange
+    cache = AsyncMock()
+    cache.take_token.return_value = 0.5
+
+    # Act
+    result = await limiter.acquire(cache, "user:test_user")
+
+    # Assert
+    assert result == 0.5
+    cache.take_token.assert_awaited_once_with("rate-limit:user:test_user", 1, 2)
+    assert limiter.stats()["limited"] == 1
+
+
+@pytest.mark.anyio
+async def test_acquire_limited_locally_without_redis(limiter):
+    # Arrange
+    cache = AsyncMock()
+    cache.take_token.return_value = 0
+
+    # Act
+    results = [await limiter.acquire(cache, "user:test_user") for _ in range(3)]
+
+    # Assert
+    assert results[:2] == [0, 0]
+    assert results[2] > 0
+    assert cache.take_token.await_count == 2
+    assert limiter.stats()["local_limited"] == 1
+
+
+@pytest.mark.anyio
+async def test_acquire_falls_back_to_local_bucket_when_redis_fails(limiter):
+    # Arrange
+    cache = AsyncMock()
+    cache.take_token.return_value = None
+
+    # Act
+    result = await limiter.acquire(cache, "user:test_user")
+
+    # Assert
+    assert result == 0
+    assert limiter.stats()["local_fallbacks"] == 1
@@ -0,0 +1,107 @@
+import math
+
+import pytest
+
+from app.core.rate_table import RateTable, RateTableStore
+from app.core.singleton import SingletonMeta
+from app.schemas.currency_conversion_rates_schema import \
+    CurrencyConversionRatesSchema
+
+
+@pytest.fixture
+def store():
+    SingletonMeta._instances.pop(RateTableStore, None)
+    yield RateTableStore()
+    SingletonMeta._instances.pop(RateTableStore, None)
+
+
+@pytest.fixture
+def conversion_rates():
+    return CurrencyConversionRatesSchema(
+        timestamp=1714521600,
+        date="2024-05-01",
+        rates={"BRL": 5.5, "USD": 1.07}
+    )
+
+
+def test_rate_table_from_schema_is_read_only(conversion_rates):
+    # Act
+    table = RateTable.from_schema(conversion_rates, ttl_seconds=60)
+
+    # Assert
+    assert table.version == "2024-05-01:1714521600"
+    assert table.rates["BRL"] == 5.5
+    assert not table.is_expired()
+    with pytest.raises(TypeError):
+        table.rates["BRL"] = 1.0
+
+
+def test_rate_table_renewed_keeps_rates(conversion_rates):
+    # Arrange
+    table = RateTable.from_schema(conversion_rates, ttl_seconds=0)
+
+    # Act
+    renewed = table.renewed(ttl_seconds=60)
+
+    # Assert
+    assert table.is_expired()
+    assert not renewed.is_expired()
+    assert renewed.rates is table.rates
+
+
+def test_rate_table_cross_rates(conversion_rates):
+    # Arrange
+    conversion_rates.rates["XXX"] = 0.0
+    table = RateTable.from_schema(conversion_rates, ttl_seconds=60)
+
+    # Act
+    cross_rates = table.cross_rates_between([("USD", "BRL"), ("BRL", "XXX")])
+
+    # Assert
+    assert table.cross_rate("USD", "BRL") == 5.5 / 1.07
+    assert cross_rates[0] == 5.5 / 1.07
+    assert math.isnan(cross_rates[1])
+    assert table.cross_rates_from("BRL") == {"BRL": 1.0, "USD": 1.07 / 5.5}
+    assert not table.cross_rates.flags.writeable
+
+
+def test_store_counts_miss_without_table(store):
+    # Act
+    result = store.get_fresh_table()
+
+    # Assert
+    assert result is None
+    assert store.stats()["misses"] == 1
+
+
+def test_store_counts_hits_and_refreshes(store, conversion_rates):
+    # Arrange
+    store.publish(RateTable.from_schema(conversion_rates, ttl_seconds=60))
+
+    # Act
+    store.get_fresh_table()
+    store.get_fresh_table()
+
+    # Assert
+    assert store.stats() == {
+        "version": "2024-05-01:1714521600",
+        "currencies": 2,
+        "hits": 2,
+        "misses": 0,
+        "stale_hits": 0,
+        "refreshes": 1,
+        "revalidations": 0,
+        "coalesced": 0
+    }
+
+
+def test_store_treats_expired_table_as_miss(store, conversion_rates):
+    # Arrange
+    store.publish(RateTable.from_schema(conversion_rates, ttl_seconds=0))
+
+    # Act
+    result = store.get_fresh_table()
+
+    # Assert
+    assert result is None
+    assert store.misses == 1
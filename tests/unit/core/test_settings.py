@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from app.core.settings import Settings
+
+
+def test_importing_the_app_reads_no_settings():
+    # Arrange
+    environment = {"PATH": os.environ.get("PATH", "")}
+
+    # Act
+    result = subprocess.run(
+        [sys.executable, "-c", "import app.main"],
+        cwd=os.path.join(os.path.dirname(__file__), "..", "..", ".."),
+        env=environment,
+        capture_output=True
+    )
+
+    # Assert
+    assert result.returncode == 0, result.stderr.decode()
+
+
+def test_load_validates_settings(monkeypatch):
+    # Arrange
+    monkeypatch.setattr(Settings, "_loaded", False)
+    monkeypatch.setattr(Settings, "CONVERSIONS_WRITE_MODE", "sync")
+    monkeypatch.setenv("CONVERSIONS_WRITE_MODE", "invalid")
+
+    # Act / Assert
+    with pytest.raises(ValueError):
+        Settings.load()
@@ -0,0 +1,75 @@
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.core.single_flight import SingleFlight
+
+
+@pytest.mark.anyio
+async def test_do_coalesces_concurrent_calls():
+    # Arrange
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "rates"
+
+    fn = AsyncMock(side_effect=load)
+
+    # Act
+    calls = [
+        asyncio.create_task(single_flight.do("key", fn)) for _ in range(10)
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*calls)
+
+    # Assert
+    fn.assert_awaited_once()
+    assert results[0] == ("rates", False)
+    assert all(result == ("rates", True) for result in results[1:])
+
+
+@pytest.mark.anyio
+async def test_do_propagates_error_and_forgets_call():
+    # Arrange
+    single_flight = SingleFlight()
+
+    # Act & Assert
+    with pytest.raises(ValueError):
+        await single_flight.do("key", AsyncMock(side_effect=ValueError("boom")))
+
+    assert not single_flight.in_flight("key")
+    assert await single_flight.do("key", AsyncMock(return_value="rates")) \
+        == ("rates", False)
+
+
+@pytest.mark.anyio
+async def test_do_keeps_call_running_for_others_when_first_caller_cancelled():
+    # Arrange
+    single_flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def load():
+        await release.wait()
+        return "rates"
+
+    fn = AsyncMock(side_effect=load)
+    first = asyncio.create_task(single_flight.do("key", fn))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(single_flight.do("key", fn))
+    await asyncio.sleep(0)
+
+    # Act
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    result = await follower
+
+    # Assert
+    assert first.cancelled()
+    assert result == ("rates", True)
+    fn.assert_awaited_once()
+    assert not single_flight.in_flight("key")
@@ -5,6 +5,7 @@ import pytest
 
 from app.core.utils import Utils
 from app.exceptions.invalid_currency_exception import InvalidCurrencyException
+from app.exceptions.invalid_cursor_exception import InvalidCursorException
 
 
 @patch('app.core.utils.datetime')
@@ -61,3 +62,20 @@ def test_validate_currency_valid_code_and_rate():
 
     # Assert
     assert result is None
+
+
+def test_cursor_round_trip():
+    # Arrange
+    position = datetime(2024, 5, 1, 10, 30, 15, 123456)
+
+    # Act
+    result = Utils.decode_cursor(Utils.encode_cursor(position, 42))
+
+    # Assert
+    assert result == (position, 42)
+
+
+def test_decode_cursor_invalid():
+    # Act & Assert
+    with pytest.raises(InvalidCursorException):
+        Utils.decode_cursor("not-a-cursor")
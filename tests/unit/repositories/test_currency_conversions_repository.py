@@ -0,0 +1,104 @@
+from datetime import UTC, date, datetime
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.database import Base
+from app.repositories.currency_conversions_repository import \
+    CurrencyConversionsRepository
+
+
+@pytest.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.mark.anyio
+async def test_add_currency_conversions_returns_aware_datetimes(session_factory):
+    # Arrange
+    repository = CurrencyConversionsRepository(session_factory())
+    now = datetime(2024, 5, 1, 10, 0, tzinfo=UTC)
+
+    # Act
+    result = await repository.add_currency_conversions([{
+        "user_id": "user-1",
+        "source_currency_code": "USD",
+        "source_currency_value": 10.0,
+        "target_currency_code": "BRL",
+        "rate_value": 5.0,
+        "datetime": now
+    }])
+
+    # Assert
+    assert [conversion.datetime for conversion in result] == [now]
+    assert result[0].transaction_id == 1
+
+
+@pytest.mark.anyio
+async def test_insert_with_explicit_ids_then_add_does_not_collide(session_factory):
+    # Arrange
+    conversion = {
+        "user_id": "user-1",
+        "source_currency_code": "USD",
+        "source_currency_value": 10.0,
+        "target_currency_code": "BRL",
+        "rate_value": 5.0,
+        "datetime": datetime(2024, 5, 1, 10, 0, tzinfo=UTC)
+    }
+    await CurrencyConversionsRepository(session_factory()) \
+        .insert_currency_conversions([{**conversion, "transaction_id": 500}])
+
+    # Act
+    result = await CurrencyConversionsRepository(session_factory()) \
+        .add_currency_conversion(**conversion)
+
+    # Assert
+    assert result.transaction_id == 501
+
+
+@pytest.mark.anyio
+async def test_refresh_rollups_rebuilds_days_in_range(session_factory):
+    # Arrange
+    conversion = {
+        "user_id": "user-1",
+        "source_currency_code": "USD",
+        "source_currency_value": 10.0,
+        "target_currency_code": "BRL",
+        "rate_value": 5.0,
+        "datetime": datetime(2024, 5, 1, 23, 30, tzinfo=UTC)
+    }
+    await CurrencyConversionsRepository(session_factory()) \
+        .add_currency_conversions([
+            conversion,
+            {**conversion, "user_id": "user-2", "source_currency_value": 2.0},
+            {**conversion, "datetime": datetime(2024, 5, 2, 0, 30, tzinfo=UTC)},
+            {**conversion, "datetime": datetime(2024, 5, 3, 0, 30, tzinfo=UTC)}
+        ])
+
+    # Act
+    for _ in range(2):
+        await CurrencyConversionsRepository(session_factory()) \
+            .refresh_rollups(date(2024, 5, 1), date(2024, 5, 3))
+    pairs = await CurrencyConversionsRepository(session_factory()) \
+        .get_conversion_volumes()
+    users = await CurrencyConversionsRepository(session_factory()) \
+        .get_conversion_volumes(group_by_user=True)
+
+    # Assert
+    assert [row._asdict() for row in pairs] == [
+        {"day": date(2024, 5, 1), "source_currency_code": "USD",
+         "target_currency_code": "BRL", "conversions": 2,
+         "source_volume": 12.0, "target_volume": 60.0},
+        {"day": date(2024, 5, 2), "source_currency_code": "USD",
+         "target_currency_code": "BRL", "conversions": 1,
+         "source_volume": 10.0, "target_volume": 50.0}
+    ]
+    assert [(row.day, row.user_id, row.conversions) for row in users] == [
+        (date(2024, 5, 1), "user-1", 1),
+        (date(2024, 5, 1), "user-2", 1),
+        (date(2024, 5, 2), "user-1", 1)
+    ]
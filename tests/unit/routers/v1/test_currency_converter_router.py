@@ -1,13 +1,22 @@
-from unittest.mock import Mock, patch
+from datetime import UTC, date, datetime
+from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 from fastapi import HTTPException, status
 from fastapi.testclient import TestClient
 
+from app.core.settings import Settings
 from app.exceptions.currency_code_doesnt_exist_exception import \
     CurrencyCodeDoesntExistException
+from app.exceptions.historical_rates_not_found_exception import \
+    HistoricalRatesNotFoundException
+from app.exceptions.idempotency_key_reused_exception import \
+    IdempotencyKeyReusedException
 from app.exceptions.invalid_currency_exception import InvalidCurrencyException
+from app.exceptions.invalid_cursor_exception import InvalidCursorException
 from app.routers.v1.currency_converter_router import router
+from app.schemas.currency_cross_rates_response_schema import \
+    CurrencyCrossRatesResponseSchema
 
 app = router
 
@@ -24,17 +33,53 @@ def test_get_conversions_success(
 ):
     # Arrange
     mock_converter_service_instance = mock_converter_service.return_value
-    mock_converter_service_instance.get_conversions = Mock(
-        return_value=[Mock(to_dict=lambda: {"key": "value"})]
+    mock_converter_service_instance.get_conversions = AsyncMock(
+        return_value=([Mock(to_dict=lambda: {"key": "value"})], "next")
     )
     client = TestClient(app)
 
     # Act
-    response = client.get("/conversions", headers={"user-id": "test_user"})
+    response = client.get(
+        "/conversions?limit=1&order=desc&start=2024-05-01T00:00:00Z",
+        headers={"user-id": "test_user"})
 
     # Assert
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == [{"key": "value"}]
+    assert response.headers["X-Next-Cursor"] == "next"
+    mock_converter_service_instance.get_conversions.assert_awaited_once_with(
+        "test_user", start=datetime(2024, 5, 1, tzinfo=UTC), end=None,
+        limit=1, cursor=None, descending=True)
+
+
+@patch("app.routers.v1.currency_converter_router.CurrencyConverterService")
+@patch("app.routers.v1.currency_converter_router.Database")
+@patch("app.routers.v1.currency_converter_router.Cache")
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesApiClient")
+def test_get_conversions_serialized_user_page(
+    mock_exchange_client,
+    mock_cache,
+    mock_db,
+    mock_converter_service
+):
+    # Arrange
+    mock_converter_service_instance = mock_converter_service.return_value
+    mock_converter_service_instance.get_serialized_conversions = AsyncMock(
+        return_value=(b'[{"key":"value"}]', "next")
+    )
+    client = TestClient(app)
+
+    # Act
+    response = client.get("/conversions?limit=1&order=desc",
+                          headers={"user-id": "test_user"})
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{"key": "value"}]
+    assert response.headers["X-Next-Cursor"] == "next"
+    mock_converter_service_instance.get_serialized_conversions.assert_awaited_once_with(
+        "test_user", limit=1, cursor=None, descending=True)
+    mock_converter_service_instance.get_conversions.assert_not_called()
 
 
 @patch("app.routers.v1.currency_converter_router.CurrencyConverterService")
@@ -49,8 +94,8 @@ def test_get_conversions_user_not_found(
 ):
     # Arrange
     mock_converter_service_instance = mock_converter_service.return_value
-    mock_converter_service_instance.get_conversions = Mock(
-        return_value=None
+    mock_converter_service_instance.get_serialized_conversions = AsyncMock(
+        return_value=(None, None)
     )
 
     client = TestClient(app)
@@ -76,7 +121,7 @@ def test_convert_currency_success(
 ):
     # Arrange
     mock_converter_service_instance = mock_converter_service.return_value
-    mock_converter_service_instance.convert_currency_transaction = Mock(
+    mock_converter_service_instance.convert_currency_transaction = AsyncMock(
         return_value=Mock(
             transaction_id=1234,
             user_id="test_user",
@@ -152,8 +197,8 @@ def test_convert_currency_invalid_currency_exception(
 ):
     # Arrange
     mock_converter_service_instance = mock_converter_service.return_value
-    mock_converter_service_instance.convert_currency_transaction.side_effect = InvalidCurrencyException(
-        "Invalid currency")
+    mock_converter_service_instance.convert_currency_transaction = AsyncMock(
+        side_effect=InvalidCurrencyException("Invalid currency"))
     client = TestClient(app)
     payload = {
         "source_currency_code": "INVALID",
@@ -182,8 +227,8 @@ def test_convert_currency_currency_code_doesnt_exist_exception(
 ):
     # Arrange
     mock_converter_service_instance = mock_converter_service.return_value
-    mock_converter_service_instance.convert_currency_transaction.side_effect = CurrencyCodeDoesntExistException(
-        "ZZZ")
+    mock_converter_service_instance.convert_currency_transaction = AsyncMock(
+        side_effect=CurrencyCodeDoesntExistException("ZZZ"))
     client = TestClient(app)
     payload = {
         "source_currency_code": "CAD",
@@ -198,3 +243,355 @@ def test_convert_currency_currency_code_doesnt_exist_exception(
     # Assert
     assert exception_raised.value.status_code == status.HTTP_404_NOT_FOUND
     assert exception_raised.value.detail == "Currency ZZZ does not exist"
+
+
+@patch("app.routers.v1.currency_converter_router.CurrencyConverterService")
+@patch("app.routers.v1.currency_converter_router.Database")
+@patch("app.routers.v1.currency_converter_router.Cache")
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesApiClient")
+def test_convert_currency_batch_success(
+    mock_exchange_client,
+    mock_cache,
+    mock_db,
+    mock_converter_service
+):
+    # Arrange
+    mock_converter_service_instance = mock_converter_service.return_value
+    mock_converter_service_instance.convert_currency_batch = AsyncMock(
+        return_value=[
+            Mock(
+                transaction_id=1234,
+                user_id="test_user",
+                source_currency_code="USD",
+                source_currency_value=100.0,
+                target_currency_code="EUR",
+                rate_value=0.85,
+                datetime=datetime(2024, 5, 1, 10, 0, tzinfo=UTC)
+            ),
+            CurrencyCodeDoesntExistException("ZZZ")
+        ]
+    )
+    client = TestClient(app)
+    payload = [
+        {
+            "source_currency_code": "USD",
+            "source_currency_value": 100.0,
+            "target_currency_code": "EUR",
+        },
+        {
+            "source_currency_code": "USD",
+            "source_currency_value": 100.0,
+            "target_currency_code": "ZZZ",
+        }
+    ]
+
+    # Act
+    response = client.post("/convert/batch", json=payload,
+                           headers={"user-id": "test_user"})
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()[0]["status_code"] == status.HTTP_200_OK
+    assert response.json()[0]["result"]["target_currency_value"] == 85.0
+    assert response.json()[0]["result"]["datetime"] == "2024-05-01T10:00:00Z"
+    assert response.json()[1] == {
+        "status_code": status.HTTP_404_NOT_FOUND,
+        "result": None,
+        "error": "Currency ZZZ does not exist"
+    }
+
+
+@patch("app.routers.v1.currency_converter_router.Settings")
+@patch("app.routers.v1.currency_converter_router.CurrencyConverterService")
+@patch("app.routers.v1.currency_converter_router.Database")
+@patch("app.routers.v1.currency_converter_router.Cache")
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesApiClient")
+def test_convert_currency_batch_too_large(
+    mock_exchange_client,
+    mock_cache,
+    mock_db,
+    mock_converter_service,
+    mock_settings
+):
+    # Arrange
+    mock_settings.CONVERT_BATCH_MAX_ITEMS = 1
+    client = TestClient(app)
+    payload = [{
+        "source_currency_code": "USD",
+        "source_currency_value": 100.0,
+        "target_currency_code": "EUR",
+    }] * 2
+
+    # Act
+    with pytest.raises(HTTPException) as exception_raised:
+        client.post("/convert/batch", json=payload,
+                    headers={"user-id": "test_user"})
+
+    # Assert
+    assert exception_raised.value.status_code == status.HTTP_400_BAD_REQUEST
+    mock_converter_service.return_value.convert_currency_batch.assert_not_called()
+
+
+@patch("app.routers.v1.currency_converter_router.CurrencyConverterService")
+@patch("app.routers.v1.currency_converter_router.Database")
+@patch("app.routers.v1.currency_converter_router.Cache")
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesApiClient")
+def test_get_conversions_invalid_cursor(
+    mock_exchange_client,
+    mock_cache,
+    mock_db,
+    mock_converter_service
+):
+    # Arrange
+    mock_converter_service_instance = mock_converter_service.return_value
+    mock_converter_service_instance.get_conversions = AsyncMock(
+        side_effect=InvalidCursorException("abc"))
+    client = TestClient(app)
+
+    # Act
+    with pytest.raises(HTTPException) as exception_raised:
+        client.get("/conversions?cursor=abc")
+
+    # Assert
+    assert exception_raised.value.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.parametrize("fast_json_responses", [False, True])
+@patch("app.routers.v1.currency_converter_router.CurrencyConverterService")
+@patch("app.routers.v1.currency_converter_router.Database")
+@patch("app.routers.v1.currency_converter_router.Cache")
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesApiClient")
+def test_convert_currency_same_payload_with_fast_json_responses(
+    mock_exchange_client,
+    mock_cache,
+    mock_db,
+    mock_converter_service,
+    fast_json_responses
+):
+    # Arrange
+    mock_converter_service_instance = mock_converter_service.return_value
+    mock_converter_service_instance.convert_currency_transaction = AsyncMock(
+        return_value=Mock(
+            transaction_id=1234,
+            user_id="test_user",
+            source_currency_code="USD",
+            source_currency_value=100.0,
+            target_currency_code="EUR",
+            rate_value=0.85,
+            datetime=datetime(2024, 5, 1, 10, 0, 0, 123456, tzinfo=UTC)
+        )
+    )
+    client = TestClient(app)
+    payload = {
+        "source_currency_code": "USD",
+        "source_currency_value": 100.0,
+        "target_currency_code": "EUR",
+    }
+
+    # Act
+    with patch.object(Settings, "FAST_JSON_RESPONSES", fast_json_responses):
+        response = client.post("/convert", json=payload,
+                               headers={"user-id": "test_user"})
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "transaction_id": 1234,
+        "user_id": "test_user",
+        "source_currency_code": "USD",
+        "source_currency_value": 100.0,
+        "target_currency_code": "EUR",
+        "target_currency_value": 85.0,
+        "rate_value": 0.85,
+        "datetime": "2024-05-01T10:00:00.123456Z"
+    }
+
+
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesService")
+@patch("app.routers.v1.currency_converter_router.Cache")
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesApiClient")
+def test_get_cross_rates_success(
+    mock_exchange_client,
+    mock_cache,
+    mock_exchange_rates_service
+):
+    # Arrange
+    mock_exchange_rates_service.return_value.get_cross_rates_from = AsyncMock(
+        return_value=CurrencyCrossRatesResponseSchema(
+            base="USD", version="2024-05-01:1714521600",
+            rates={"USD": 1.0, "BRL": 5.0})
+    )
+    client = TestClient(app)
+
+    # Act
+    response = client.get("/rates/usd")
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "base": "USD",
+        "version": "2024-05-01:1714521600",
+        "rates": {"USD": 1.0, "BRL": 5.0}
+    }
+    mock_exchange_rates_service.return_value.get_cross_rates_from.assert_awaited_once_with(
+        "USD")
+
+
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesService")
+@patch("app.routers.v1.currency_converter_router.Cache")
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesApiClient")
+def test_get_cross_rates_unknown_base(
+    mock_exchange_client,
+    mock_cache,
+    mock_exchange_rates_service
+):
+    # Arrange
+    mock_exchange_rates_service.return_value.get_cross_rates_from = AsyncMock(
+        side_effect=CurrencyCodeDoesntExistException("ZZZ"))
+    client = TestClient(app)
+
+    # Act
+    with pytest.raises(HTTPException) as exception_raised:
+        client.get("/rates/ZZZ")
+
+    # Assert
+    assert exception_raised.value.status_code == status.HTTP_404_NOT_FOUND
+
+
+@patch("app.routers.v1.currency_converter_router.CurrencyConverterService")
+@patch("app.routers.v1.currency_converter_router.Database")
+@patch("app.routers.v1.currency_converter_router.Cache")
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesApiClient")
+def test_convert_currency_as_of_without_stored_rates(
+    mock_exchange_client,
+    mock_cache,
+    mock_db,
+    mock_converter_service
+):
+    # Arrange
+    mock_converter_service_instance = mock_converter_service.return_value
+    mock_converter_service_instance.convert_currency_transaction = AsyncMock(
+        side_effect=HistoricalRatesNotFoundException(date(2024, 5, 1)))
+    client = TestClient(app)
+    payload = {
+        "source_currency_code": "USD",
+        "source_currency_value": 100.0,
+        "target_currency_code": "EUR",
+    }
+
+    # Act
+    with pytest.raises(HTTPException) as exception_raised:
+        client.post("/convert?as_of=2024-05-01", json=payload,
+                    headers={"user-id": "test_user"})
+
+    # Assert
+    assert exception_raised.value.status_code == status.HTTP_404_NOT_FOUND
+    assert mock_converter_service_instance.convert_currency_transaction.call_args.kwargs[
+        "as_of"] == date(2024, 5, 1)
+
+
+@patch("app.routers.v1.currency_converter_router.CurrencyConverterService")
+@patch("app.routers.v1.currency_converter_router.Database")
+@patch("app.routers.v1.currency_converter_router.Cache")
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesApiClient")
+def test_convert_currency_as_of_in_the_future(
+    mock_exchange_client,
+    mock_cache,
+    mock_db,
+    mock_converter_service
+):
+    # Arrange
+    client = TestClient(app)
+    payload = {
+        "source_currency_code": "USD",
+        "source_currency_value": 100.0,
+        "target_currency_code": "EUR",
+    }
+
+    # Act
+    with pytest.raises(HTTPException) as exception_raised:
+        client.post("/convert?as_of=2999-01-01", json=payload,
+                    headers={"user-id": "test_user"})
+
+    # Assert
+    assert exception_raised.value.status_code == status.HTTP_400_BAD_REQUEST
+    mock_converter_service.return_value.convert_currency_transaction.assert_not_called()
+
+
+@patch("app.routers.v1.currency_converter_router.CurrencyConverterService")
+@patch("app.routers.v1.currency_converter_router.Database")
+@patch("app.routers.v1.currency_converter_router.Cache")
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesApiClient")
+def test_get_conversion_volumes_success(
+    mock_exchange_client,
+    mock_cache,
+    mock_db,
+    mock_converter_service
+):
+    # Arrange
+    mock_converter_service_instance = mock_converter_service.return_value
+    mock_converter_service_instance.get_conversion_volumes = AsyncMock(
+        return_value=[{
+            "day": date(2024, 5, 1),
+            "source_currency_code": "USD",
+            "target_currency_code": "BRL",
+            "conversions": 2,
+            "source_volume": 12.0,
+            "target_volume": 60.0
+        }]
+    )
+    client = TestClient(app)
+
+    # Act
+    response = client.get("/conversions/volumes?start=2024-05-01&limit=5000")
+
+    # Assert
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{
+        "day": "2024-05-01",
+        "user_id": None,
+        "source_currency_code": "USD",
+        "target_currency_code": "BRL",
+        "conversions": 2,
+        "source_volume": 12.0,
+        "target_volume": 60.0
+    }]
+    mock_converter_service_instance.get_conversion_volumes.assert_awaited_once_with(
+        None, group_by="pair", interval="day", start=date(2024, 5, 1), end=None,
+        limit=Settings.CONVERSIONS_PAGE_MAX_LIMIT)
+
+
+@patch("app.routers.v1.currency_converter_router.IdempotencyService")
+@patch("app.routers.v1.currency_converter_router.CurrencyConverterService")
+@patch("app.routers.v1.currency_converter_router.Database")
+@patch("app.routers.v1.currency_converter_router.Cache")
+@patch("app.routers.v1.currency_converter_router.ExchangeRatesApiClient")
+def test_convert_currency_idempotency_key_reused(
+    mock_exchange_client,
+    mock_cache,
+    mock_db,
+    mock_converter_service,
+    mock_idempotency_service
+):
+    # Arrange
+    mock_idempotency_service.return_value.run = AsyncMock(
+        side_effect=IdempotencyKeyReusedException("key-1"))
+    client = TestClient(app)
+    payload = {
+        "source_currency_code": "USD",
+        "source_currency_value": 100.0,
+        "target_currency_code": "EUR",
+    }
+
+    # Act
+    with pytest.raises(HTTPException) as exception_raised:
+        client.post("/convert", json=payload,
+                    headers={"user-id": "test_user", "Idempotency-Key": "key-1"})
+
+    # Assert
+    assert exception_raised.value.status_code == \
+        status.HTTP_422_UNPROCESSABLE_ENTITY
+    run_arguments = mock_idempotency_service.return_value.run.call_args.kwargs
+    assert run_arguments["user_id"] == "test_user"
+    assert run_arguments["idempotency_key"] == "key-1"
+    mock_converter_service.return_value.convert_currency_transaction.assert_not_called()
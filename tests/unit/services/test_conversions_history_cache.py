@@ -0,0 +1,151 @@
+import json
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fakeredis.aioredis import FakeRedis
+from sqlalchemy.exc import OperationalError
+
+from app.core.cache import Cache
+from app.core.singleton import SingletonMeta
+from app.core.utils import Utils
+from app.models.currency_conversions_model import CurrencyConversionsModel
+from app.services.conversions_history_cache import ConversionsHistoryCache
+
+
+def conversions(*transaction_ids: int) -> list[CurrencyConversionsModel]:
+    return [
+        CurrencyConversionsModel(
+            transaction_id=transaction_id,
+            user_id="test_user",
+            source_currency_code="USD",
+            source_currency_value=10.0,
+            target_currency_code="BRL",
+            rate_value=5.0,
+            datetime=datetime(2024, 5, 1, 10, transaction_id, tzinfo=UTC)
+        )
+        for transaction_id in transaction_ids
+    ]
+
+
+@pytest.fixture
+def cache():
+    SingletonMeta._instances.pop(Cache, None)
+    with patch("app.core.cache.redis.Redis", return_value=FakeRedis()):
+        yield Cache()
+    SingletonMeta._instances.pop(Cache, None)
+
+
+@pytest.fixture
+def repository():
+    return AsyncMock()
+
+
+@pytest.fixture
+def history_cache(cache, repository):
+    with patch("app.services.conversions_history_cache.Settings") as MockSettings, \
+            patch("app.services.conversions_history_cache.Logger"):
+        MockSettings.CONVERSIONS_CACHE_ENABLED = True
+        MockSettings.CONVERSIONS_CACHE_KEY_PREFIX = "conversions"
+        MockSettings.CONVERSIONS_CACHE_TTL_SECONDS = 60
+        MockSettings.FAST_JSON_RESPONSES = False
+        yield ConversionsHistoryCache(
+            cache=cache, currency_conversions_repository=repository)
+
+
+@pytest.mark.anyio
+async def test_get_page_served_from_cache(history_cache, repository):
+    # Arrange
+    repository.get_conversions_by_user.return_value = conversions(3, 2, 1)
+
+    # Act
+    first = await history_cache.get_page("test_user", 2, descending=True)
+    second = await history_cache.get_page("test_user", 2, descending=True)
+
+    # Assert
+    assert second == first
+    body, next_cursor = second
+    assert [row["transaction_id"] for row in json.loads(body)] == [3, 2]
+    assert next_cursor is not None
+    repository.get_conversions_by_user.assert_awaited_once_with(
+        "test_user", limit=3, after=None, descending=True)
+
+
+@pytest.mark.anyio
+async def test_record_rewrites_pages_new_rows_land_on(history_cache, repository):
+    # Arrange
+    repository.get_conversions_by_user.return_value = conversions(2, 1)
+    await history_cache.get_page("test_user", 2, descending=True)
+    cursor = Utils.encode_cursor(datetime(2024, 5, 1, 10, 2, tzinfo=UTC), 2)
+    repository.get_conversions_by_user.return_value = conversions(1)
+    await history_cache.get_page("test_user", 2, cursor, descending=True)
+    repository.get_conversions_by_user.return_value = conversions(3, 2, 1)
+
+    # Act
+    await history_cache.record(["test_user"])
+    newest, next_cursor = await history_cache.get_page(
+        "test_user", 2, descending=True)
+    older, _ = await history_cache.get_page(
+        "test_user", 2, cursor, descending=True)
+
+    # Assert
+    assert [row["transaction_id"] for row in json.loads(newest)] == [3, 2]
+    assert next_cursor is not None
+    assert [row["transaction_id"] for row in json.loads(older)] == [1]
+    assert repository.get_conversions_by_user.await_count == 3
+
+
+@pytest.mark.anyio
+async def test_get_page_read_before_insert_is_not_stored(
+        history_cache, repository, cache):
+    # Arrange
+    async def read_then_insert(*args, **kwargs):
+        await cache.increment_hash_field(
+            "conversions:test_user", ConversionsHistoryCache.VERSION_FIELD, 60)
+        return conversions(1)
+
+    repository.get_conversions_by_user.side_effect = read_then_insert
+
+    # Act
+    await history_cache.get_page("test_user", 2)
+    await history_cache.get_page("test_user", 2)
+
+    # Assert
+    assert repository.get_conversions_by_user.await_count == 2
+
+
+@pytest.mark.anyio
+async def test_record_drops_pages_when_refresh_fails(
+        history_cache, repository, cache):
+    # Arrange
+    repository.get_conversions_by_user.return_value = conversions(1)
+    await history_cache.get_page("test_user", 2, descending=True)
+    repository.get_conversions_by_user.side_effect = OperationalError(
+        "SELECT", {}, Exception("database is locked"))
+
+    # Act
+    await history_cache.record(["test_user"])
+
+    # Assert
+    assert await cache.get_hash("conversions:test_user") == {}
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("fast_json_responses, value", [
+    (False, "1e-05"), (True, "0.00001")])
+async def test_get_page_renders_with_configured_json_response(
+        history_cache, repository, fast_json_responses, value):
+    # Arrange
+    page = conversions(1)
+    page[0].rate_value = 0.00001
+    repository.get_conversions_by_user.return_value = page
+
+    # Act
+    with patch("app.services.conversions_history_cache.Settings."
+               "FAST_JSON_RESPONSES", fast_json_responses):
+        uncached = ConversionsHistoryCache.render(page)
+        cached, _ = await history_cache.get_page("test_user", 2)
+
+    # Assert
+    assert cached == uncached
+    assert f'"rate_value":{value}'.encode() in cached
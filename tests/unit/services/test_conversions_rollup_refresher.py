@@ -0,0 +1,63 @@
+from datetime import UTC, date, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.services.conversions_rollup_refresher import \
+    ConversionsRollupRefresher
+
+
+@pytest.fixture
+def cache():
+    cache = AsyncMock()
+    cache.acquire_lock.return_value = object()
+    return cache
+
+
+@pytest.fixture
+def repository():
+    with patch(
+        "app.services.conversions_rollup_refresher.CurrencyConversionsRepository"
+    ) as MockRepository:
+        MockRepository.return_value = AsyncMock()
+        yield MockRepository.return_value
+
+
+@pytest.fixture
+def refresher(cache):
+    with patch("app.services.conversions_rollup_refresher.Settings") as MockSettings:
+        MockSettings.CONVERSIONS_ROLLUP_INTERVAL_SECONDS = 60
+        MockSettings.CONVERSIONS_ROLLUP_LOOKBACK_DAYS = 1
+        MockSettings.CONVERSIONS_ROLLUP_LOCK_KEY = "conversions-rollup-lock"
+        return ConversionsRollupRefresher(cache=cache, database=MagicMock())
+
+
+@pytest.mark.anyio
+@patch("app.services.conversions_rollup_refresher.datetime")
+async def test_refresh_rebuilds_today_and_lookback_days(
+        mock_datetime, refresher, repository, cache):
+    # Arrange
+    mock_datetime.now.return_value = datetime(2024, 5, 2, 0, 5, tzinfo=UTC)
+
+    # Act
+    result = await refresher.refresh()
+
+    # Assert
+    assert result is True
+    repository.refresh_rollups.assert_awaited_once_with(
+        date(2024, 5, 1), date(2024, 5, 3))
+    cache.acquire_lock.assert_awaited_once_with("conversions-rollup-lock", 60)
+
+
+@pytest.mark.anyio
+async def test_refresh_skipped_while_another_worker_holds_the_lock(
+        refresher, repository, cache):
+    # Arrange
+    cache.acquire_lock.return_value = None
+
+    # Act
+    result = await refresher.refresh()
+
+    # Assert
+    assert result is False
+    repository.refresh_rollups.assert_not_awaited()
@@ -0,0 +1,219 @@
+import asyncio
+import json
+from datetime import UTC, date, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.core.singleton import SingletonMeta
+from app.services.currency_conversions_writer import \
+    CurrencyConversionsWriter
+
+
+@pytest.fixture
+def repository():
+    with patch(
+        "app.services.currency_conversions_writer.CurrencyConversionsRepository"
+    ) as MockRepository:
+        MockRepository.return_value = AsyncMock()
+        MockRepository.return_value.get_max_transaction_id.return_value = 0
+        yield MockRepository.return_value
+
+
+@pytest.fixture
+def history_cache():
+    with patch(
+        "app.services.currency_conversions_writer.ConversionsHistoryCache"
+    ) as MockHistoryCache:
+        MockHistoryCache.return_value = AsyncMock()
+        yield MockHistoryCache.return_value
+
+
+@pytest.fixture
+def writer(repository, history_cache):
+    SingletonMeta._instances.pop(CurrencyConversionsWriter, None)
+    with patch("app.services.currency_conversions_writer.Settings") as MockSettings, \
+            patch("app.services.currency_conversions_writer.Logger"):
+        MockSettings.CONVERSIONS_WRITE_BATCH_SIZE = 3
+        MockSettings.CONVERSIONS_WRITE_FLUSH_INTERVAL_SECONDS = 0.05
+        MockSettings.CONVERSIONS_WRITE_QUEUE_SIZE = 10
+        MockSettings.CONVERSIONS_WRITE_RETRY_ATTEMPTS = 2
+        MockSettings.CONVERSIONS_WRITE_RETRY_BACKOFF_SECONDS = 0
+        MockSettings.CONVERSIONS_WRITE_DEAD_LETTER_KEY = "conversions-dead-letter"
+        MockSettings.CONVERSIONS_ID_KEY = "conversion-ids"
+        MockSettings.CONVERSIONS_ID_BLOCK_SIZE = 100
+        yield CurrencyConversionsWriter()
+    SingletonMeta._instances.pop(CurrencyConversionsWriter, None)
+
+
+@pytest.fixture
+def cache():
+    cache = AsyncMock()
+    cache.increment.return_value = 100
+    cache.pop_list.return_value = []
+    return cache
+
+
+async def wait_for_inserts(repository, count: int):
+    while repository.insert_currency_conversions.await_count < count:
+        await asyncio.sleep(0.01)
+
+
+def conversion(user_id: str) -> dict:
+    return {
+        "user_id": user_id,
+        "source_currency_code": "USD",
+        "source_currency_value": 10.0,
+        "target_currency_code": "BRL",
+        "rate_value": 5.0,
+        "datetime": datetime(2024, 5, 1, 10, 0, tzinfo=UTC)
+    }
+
+
+@pytest.mark.anyio
+async def test_add_returns_transactions_before_they_are_flushed(writer, repository, cache):
+    # Arrange
+    await writer.start(cache=cache, database=MagicMock())
+
+    # Act
+    result = await writer.add_currency_conversions(
+        [conversion("a"), conversion("b")])
+
+    # Assert
+    assert [transaction.transaction_id for transaction in result] == [1, 2]
+    repository.insert_currency_conversions.assert_not_awaited()
+    await writer.stop()
+
+
+@pytest.mark.anyio
+async def test_flushes_on_batch_size_and_interval(writer, repository, cache):
+    # Arrange
+    await writer.start(cache=cache, database=MagicMock())
+
+    # Act
+    await writer.add_currency_conversions(
+        [conversion(str(index)) for index in range(4)])
+    await asyncio.wait_for(wait_for_inserts(repository, 2), timeout=5)
+
+    # Assert
+    batches = [
+        call.args[0] for call in repository.insert_currency_conversions.await_args_list
+    ]
+    assert [len(batch) for batch in batches] == [3, 1]
+    assert writer.stats()["flushed"] == 4
+    await writer.stop()
+
+
+@pytest.mark.anyio
+async def test_stop_flushes_pending_conversions(writer, repository, cache, history_cache):
+    # Arrange
+    await writer.start(cache=cache, database=MagicMock())
+    await writer.add_currency_conversions([conversion("a")])
+
+    # Act
+    await writer.stop()
+
+    # Assert
+    repository.insert_currency_conversions.assert_awaited_once()
+    assert list(history_cache.record.call_args.args[0]) == ["a"]
+    assert not writer.is_running
+
+
+@pytest.mark.anyio
+async def test_failed_flush_is_retried(writer, repository, cache, history_cache):
+    # Arrange
+    repository.insert_currency_conversions.side_effect = [
+        OperationalError("INSERT", {}, Exception("database is locked")), None]
+    await writer.start(cache=cache, database=MagicMock())
+    await writer.add_currency_conversions([conversion("a")])
+
+    # Act
+    await writer.stop()
+
+    # Assert
+    assert repository.insert_currency_conversions.await_count == 2
+    assert writer.stats()["flushed"] == 1
+    cache.push_list.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_failed_flush_is_parked_in_dead_letter_list(
+        writer, repository, cache, history_cache):
+    # Arrange
+    repository.insert_currency_conversions.side_effect = OperationalError(
+        "INSERT", {}, Exception("database is locked"))
+    await writer.start(cache=cache, database=MagicMock())
+    await writer.add_currency_conversions([conversion("a")])
+
+    # Act
+    await writer.stop()
+
+    # Assert
+    key, rows = cache.push_list.await_args.args
+    assert key == "conversions-dead-letter"
+    assert json.loads(rows[0]) == {
+        **conversion("a"),
+        "transaction_id": 1,
+        "datetime": "2024-05-01T10:00:00+00:00"
+    }
+    assert writer.stats()["dead_lettered"] == 1
+    assert writer.stats()["dropped"] == 0
+    history_cache.record.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_start_inserts_dead_letters_again(writer, repository, cache):
+    # Arrange
+    parked = json.dumps(
+        {**conversion("a"), "transaction_id": 7}, default=datetime.isoformat)
+    cache.pop_list.side_effect = [[parked], []]
+
+    # Act
+    with patch("app.services.currency_conversions_writer."
+               "ConversionsRollupRefresher") as MockRollupRefresher:
+        MockRollupRefresher.return_value = AsyncMock()
+        await writer.start(cache=cache, database=MagicMock())
+        await writer.stop()
+
+    # Assert
+    repository.insert_currency_conversions.assert_awaited_once_with(
+        [{**conversion("a"), "transaction_id": 7}])
+    MockRollupRefresher.return_value.refresh_days.assert_awaited_once_with(
+        date(2024, 5, 1), date(2024, 5, 1))
+
+
+@pytest.mark.anyio
+async def test_writer_keeps_running_after_unexpected_error(
+        writer, repository, cache, history_cache):
+    # Arrange
+    history_cache.record.side_effect = [RuntimeError("boom"), None]
+    repository.insert_currency_conversions.side_effect = [
+        None, ValueError("unexpected")]
+    await writer.start(cache=cache, database=MagicMock())
+
+    # Act
+    await writer.add_currency_conversions([conversion("a")])
+    await asyncio.wait_for(wait_for_inserts(repository, 1), timeout=5)
+    await writer.add_currency_conversions([conversion("b")])
+    await asyncio.wait_for(wait_for_inserts(repository, 2), timeout=5)
+    running = writer.is_running
+    await writer.stop()
+
+    # Assert
+    assert running
+    cache.push_list.assert_awaited_once()
+    assert writer.stats()["flushed"] == 1
+
+
+def test_is_running_false_once_task_ended(writer):
+    # Arrange
+    task = MagicMock()
+    task.done.return_value = True
+    writer._CurrencyConversionsWriter__task = task
+
+    # Act
+    result = writer.is_running
+
+    # Assert
+    assert result is False
@@ -1,62 +1,110 @@
-from unittest.mock import MagicMock, Mock, patch
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
 import pytest
 
+from app.core.utils import Utils
+from app.exceptions.currency_code_doesnt_exist_exception import \
+    CurrencyCodeDoesntExistException
 from app.exceptions.invalid_currency_exception import InvalidCurrencyException
+from app.exceptions.invalid_currency_value_exception import \
+    InvalidCurrencyValueException
 from app.models.currency_conversions_model import CurrencyConversionsModel
-from app.schemas.currency_conversion_rates_schema import \
-    CurrencyConversionRatesSchema
+from app.schemas.currency_conversions_request_schema import \
+    CurrencyConversionsRequestSchema
 from app.services.currency_converter_service import CurrencyConverterService
 
 
 @pytest.fixture
-def mock_logger():
-    with patch("app.services.currency_converter_service.Logger") as MockLogger:
-        yield MockLogger
-
-
-@pytest.fixture
-def service(mock_logger):
+def service():
     cache = Mock()
     exchange_rates_api_client = MagicMock()
-    currency_conversions_repository = MagicMock()
-
-    with patch("app.services.currency_converter_service.Settings") as MockSettings:
-        MockSettings.CACHE_RATE_KEY_PREFIX.return_value = "eur-rate-"
+    currency_conversions_repository = AsyncMock()
+    rate_table_store = MagicMock()
+
+    with patch(
+        "app.services.currency_converter_service.ExchangeRatesService",
+        return_value=AsyncMock()
+    ), patch(
+        "app.services.currency_converter_service.ConversionsHistoryCache",
+        return_value=AsyncMock()
+    ):
         return CurrencyConverterService(
             cache=cache,
             exchange_rates_api_client=exchange_rates_api_client,
-            currency_conversions_repository=currency_conversions_repository
+            currency_conversions_repository=currency_conversions_repository,
+            rate_table_store=rate_table_store
         )
 
 
-def test_get_conversions_no_user_id(service):
+@pytest.mark.anyio
+async def test_get_conversions_no_user_id(service):
     # Arrange
     service._CurrencyConverterService__currency_conversions_repository.list_all_conversions.return_value = []
 
     # Act
-    result = service.get_conversions(user_id=None)
+    result = await service.get_conversions(user_id=None)
 
     # Assert
-    assert result == []
-    service._CurrencyConverterService__currency_conversions_repository.list_all_conversions.assert_called_once()
+    assert result == ([], None)
+    service._CurrencyConverterService__currency_conversions_repository.list_all_conversions.assert_awaited_once()
 
 
-def test_get_conversions_with_user_id(service):
+@pytest.mark.anyio
+async def test_get_conversions_with_user_id(service):
     # Arrange
     user_id = "123"
     service._CurrencyConverterService__currency_conversions_repository.get_conversions_by_user.return_value = []
 
     # Act
-    result = service.get_conversions(user_id=user_id)
+    result = await service.get_conversions(user_id=user_id)
+
+    # Assert
+    assert result == ([], None)
+    service._CurrencyConverterService__currency_conversions_repository.get_conversions_by_user.assert_awaited_once_with(
+        user_id, limit=101, after=None, start=None, end=None, descending=False)
+
+
+@pytest.mark.anyio
+async def test_get_conversions_returns_cursor_of_next_page(service):
+    # Arrange
+    conversions = [
+        CurrencyConversionsModel(transaction_id=index, datetime=datetime(2024, 5, 1, index))
+        for index in range(3)
+    ]
+    repository = service._CurrencyConverterService__currency_conversions_repository
+    repository.get_conversions_by_user.return_value = conversions
+
+    # Act
+    result, next_cursor = await service.get_conversions(
+        user_id="123", limit=2, cursor=Utils.encode_cursor(datetime(2024, 4, 1), 7))
+
+    # Assert
+    assert result == conversions[:2]
+    assert Utils.decode_cursor(next_cursor) == (datetime(2024, 5, 1, 1), 1)
+    assert repository.get_conversions_by_user.call_args.kwargs["after"] == (
+        datetime(2024, 4, 1), 7)
+
+
+@pytest.mark.anyio
+async def test_get_conversion_volumes_per_user_and_total(service):
+    # Arrange
+    repository = service._CurrencyConverterService__currency_conversions_repository
+    repository.get_conversion_volumes.return_value = [
+        Mock(_asdict=lambda: {"user_id": "123", "conversions": 2})]
+
+    # Act
+    result = await service.get_conversion_volumes(
+        None, group_by="user", interval="total", limit=10)
 
     # Assert
-    assert result == []
-    service._CurrencyConverterService__currency_conversions_repository.get_conversions_by_user.assert_called_once_with(
-        user_id)
+    assert result == [{"user_id": "123", "conversions": 2}]
+    repository.get_conversion_volumes.assert_awaited_once_with(
+        group_by_user=True, daily=False, user_id=None, start=None, end=None, limit=10)
 
 
-def test_convert_currency_transaction_invalid_currency(service):
+@pytest.mark.anyio
+async def test_convert_currency_transaction_invalid_currency(service):
     # Arrange
     source_currency_code = "BRL"
     source_currency_value = 100.50
@@ -65,7 +113,7 @@ def test_convert_currency_transaction_invalid_currency(service):
 
     # Act and Assert
     with pytest.raises(InvalidCurrencyException):
-        service.convert_currency_transaction(
+        await service.convert_currency_transaction(
             source_currency_code,
             source_currency_value,
             target_currency_code,
@@ -73,42 +121,102 @@ def test_convert_currency_transaction_invalid_currency(service):
         )
 
 
-def test_convert_currency_transaction_success(service):
+@pytest.mark.anyio
+async def test_convert_currency_transaction_success(service):
     # Arrange
-    service._CurrencyConverterService__fetch_and_validate_rates = Mock(
-        return_value=CurrencyConversionRatesSchema(rates={"USD": 1, "EUR": 0.85}))
+    service._CurrencyConverterService__exchange_rates_service.get_cross_rate.return_value = 0.85
     service._CurrencyConverterService__currency_conversions_repository.add_currency_conversion.return_value = CurrencyConversionsModel()
 
     # Act
-    result = service.convert_currency_transaction("USD", 100, "EUR", "123")
+    result = await service.convert_currency_transaction("USD", 100, "EUR", "123")
 
     # Assert
     assert isinstance(result, CurrencyConversionsModel)
-    service._CurrencyConverterService__currency_conversions_repository.add_currency_conversion.assert_called_once()
+    service._CurrencyConverterService__currency_conversions_repository.add_currency_conversion.assert_awaited_once()
+    service._CurrencyConverterService__conversions_history_cache.record.assert_awaited_once_with(["123"])
 
 
-def test_fetch_and_validate_rates_cache_hit(service):
+@pytest.mark.anyio
+async def test_convert_currency_batch_results_in_order(service):
     # Arrange
-    service._CurrencyConverterService__cache.get.return_value = 1.0
+    exchange_rates_service = service._CurrencyConverterService__exchange_rates_service
+    repository = service._CurrencyConverterService__currency_conversions_repository
+    exchange_rates_service.get_cross_rates.side_effect = lambda pairs: {
+        pair: CurrencyCodeDoesntExistException("ZZZ") if "ZZZ" in pair
+        else {("USD", "BRL"): 5.0, ("BRL", "USD"): 0.2}[pair]
+        for pair in pairs
+    }
+    repository.add_currency_conversions.side_effect = lambda conversions: [
+        CurrencyConversionsModel(transaction_id=index, **conversion)
+        for index, conversion in enumerate(conversions)
+    ]
+    requests = [
+        CurrencyConversionsRequestSchema(
+            source_currency_code="usd", source_currency_value=10, target_currency_code="BRL"),
+        CurrencyConversionsRequestSchema(
+            source_currency_code="USD", source_currency_value=0.01, target_currency_code="BRL"),
+        CurrencyConversionsRequestSchema(
+            source_currency_code="USD", source_currency_value=10, target_currency_code="ZZZ"),
+        CurrencyConversionsRequestSchema(
+            source_currency_code="BRL", source_currency_value=10, target_currency_code="USD"),
+        CurrencyConversionsRequestSchema(
+            source_currency_code="BRL", source_currency_value=10, target_currency_code="INVALID"),
+    ]
 
     # Act
-    result = service._CurrencyConverterService__fetch_and_validate_rates("USD")
+    result = await service.convert_currency_batch(requests, "123")
 
     # Assert
-    assert result.rates["USD"] == 1.0
-    service._CurrencyConverterService__cache.get.assert_called_once()
+    assert [type(item) for item in result] == [
+        CurrencyConversionsModel,
+        InvalidCurrencyValueException,
+        CurrencyCodeDoesntExistException,
+        CurrencyConversionsModel,
+        InvalidCurrencyException
+    ]
+    assert result[0].rate_value == 5.0
+    assert result[3].rate_value == 0.2
+    exchange_rates_service.get_cross_rates.assert_awaited_once()
+    assert exchange_rates_service.get_cross_rates.call_args.args[0] == {
+        ("USD", "BRL"), ("USD", "ZZZ"), ("BRL", "USD")}
+    repository.add_currency_conversions.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_convert_currency_transaction_write_behind(service):
+    # Arrange
+    writer = MagicMock(is_running=True)
+    writer.add_currency_conversions = AsyncMock(
+        return_value=[CurrencyConversionsModel(transaction_id=1)])
+    service._CurrencyConverterService__currency_conversions_writer = writer
+    service._CurrencyConverterService__exchange_rates_service.get_cross_rate.return_value = 0.85
+
+    # Act
+    result = await service.convert_currency_transaction("USD", 100, "EUR", "123")
+
+    # Assert
+    assert result.transaction_id == 1
+    writer.add_currency_conversions.assert_awaited_once()
+    service._CurrencyConverterService__currency_conversions_repository.add_currency_conversion.assert_not_awaited()
 
 
-def test_fetch_and_validate_rates_cache_miss(service):
+@pytest.mark.anyio
+async def test_export_conversions_csv_streams_header_and_chunks(service):
     # Arrange
-    service._CurrencyConverterService__cache.get.return_value = None
-    service._CurrencyConverterService__exchange_rates_api_client.fetch_all_conversion_rates.return_value = CurrencyConversionRatesSchema(
-        rates={"USD": 1.0}
-    )
+    async def stream_conversions(**kwargs):
+        yield [(1, "123", "USD", 100.0, "EUR", 0.85, datetime(2024, 5, 1))]
+        yield [(2, "123", "EUR", 10.0, "USD", 1.17, datetime(2024, 5, 2))]
+
+    service._CurrencyConverterService__currency_conversions_repository.stream_conversions = \
+        stream_conversions
 
     # Act
-    result = service._CurrencyConverterService__fetch_and_validate_rates("USD")
+    result = [chunk async for chunk in service.export_conversions("123", "csv")]
 
     # Assert
-    assert result.rates["USD"] == 1.0
-    service._CurrencyConverterService__exchange_rates_api_client.fetch_all_conversion_rates.assert_called_once()
+    assert result == [
+        "transaction_id,user_id,source_currency_code,source_currency_value,"
+        "target_currency_code,rate_value,datetime\r\n",
+        "1,123,USD,100.0,EUR,0.85,2024-05-01 00:00:00\r\n",
+        "2,123,EUR,10.0,USD,1.17,2024-05-02 00:00:00\r\n"
+    ]
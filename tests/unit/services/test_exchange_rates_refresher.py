@@ -0,0 +1,69 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core.rate_table import RateTableStore
+from app.core.singleton import SingletonMeta
+from app.services.exchange_rates_refresher import ExchangeRatesRefresher
+
+
+@pytest.fixture
+def rate_table_store():
+    SingletonMeta._instances.pop(RateTableStore, None)
+    yield RateTableStore()
+    SingletonMeta._instances.pop(RateTableStore, None)
+
+
+@pytest.fixture
+def refresher(rate_table_store):
+    with patch("app.services.exchange_rates_refresher.Settings") as MockSettings:
+        MockSettings.RATE_REFRESH_INTERVAL_SECONDS = 3600
+        MockSettings.RATE_REFRESH_JITTER_SECONDS = 30
+        MockSettings.RATE_REFRESH_RETRY_SECONDS = 15
+        return ExchangeRatesRefresher(
+            exchange_rates_service=AsyncMock(),
+            rate_table_store=rate_table_store
+        )
+
+
+@patch("app.services.exchange_rates_refresher.Utils")
+def test_next_delay_uses_interval_far_from_midnight(mock_utils, refresher):
+    # Arrange
+    mock_utils.seconds_until_next_day.return_value = 20000
+
+    # Act
+    result = refresher.next_delay()
+
+    # Assert
+    assert 3570 <= result <= 3600
+
+
+@patch("app.services.exchange_rates_refresher.Utils")
+def test_next_delay_refreshes_right_after_midnight(mock_utils, refresher):
+    # Arrange
+    mock_utils.seconds_until_next_day.return_value = 120
+
+    # Act
+    result = refresher.next_delay()
+
+    # Assert
+    assert 120 <= result <= 150
+
+
+@pytest.mark.anyio
+async def test_refresher_refreshes_on_start_and_on_request(refresher, rate_table_store):
+    # Arrange
+    service = refresher._ExchangeRatesRefresher__exchange_rates_service
+
+    # Act
+    refresher.start()
+    await asyncio.sleep(0.05)
+    requested = rate_table_store.request_refresh()
+    await asyncio.sleep(0.05)
+    await refresher.stop()
+
+    # Assert
+    assert requested is True
+    assert service.refresh_rates.await_count == 2
+    assert rate_table_store.request_refresh() is False
@@ -0,0 +1,301 @@
+from time import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.core.rate_table import RateTable, RateTableStore
+from app.core.singleton import SingletonMeta
+from app.exceptions.currency_code_doesnt_exist_exception import \
+    CurrencyCodeDoesntExistException
+from app.exceptions.exchange_rates_unavailable_exception import \
+    ExchangeRatesUnavailableException
+from app.exceptions.invalid_currency_exception import InvalidCurrencyException
+from app.schemas.currency_conversion_rates_schema import \
+    CurrencyConversionRatesSchema
+from app.services.exchange_rates_service import ExchangeRatesService
+
+
+@pytest.fixture
+def mock_logger():
+    with patch("app.services.exchange_rates_service.Logger") as MockLogger:
+        yield MockLogger
+
+
+@pytest.fixture
+def rate_table_store():
+    SingletonMeta._instances.pop(RateTableStore, None)
+    yield RateTableStore()
+    SingletonMeta._instances.pop(RateTableStore, None)
+
+
+@pytest.fixture
+def service(mock_logger, rate_table_store):
+    cache = AsyncMock()
+    exchange_rates_api_client = AsyncMock()
+
+    with patch("app.services.exchange_rates_service.Settings") as MockSettings:
+        MockSettings.CACHE_RATE_TABLE_KEY = "eur-rates"
+        MockSettings.RATE_TABLE_SNAPSHOT_TTL_SECONDS = 60
+        MockSettings.RATE_TABLE_MAX_STALENESS_SECONDS = 900
+        MockSettings.RATE_REFRESH_INTERVAL_SECONDS = 3600
+        MockSettings.RATE_REFRESH_LOCK_KEY = "eur-rates-refresh-lock"
+        MockSettings.RATE_REFRESH_LOCK_TIMEOUT_SECONDS = 10
+        MockSettings.RATE_REFRESH_WAIT_SECONDS = 1
+        MockSettings.RATE_REFRESH_POLL_INTERVAL_SECONDS = 0.01
+        return ExchangeRatesService(
+            cache=cache,
+            exchange_rates_api_client=exchange_rates_api_client,
+            rate_table_store=rate_table_store
+        )
+
+
+@pytest.mark.anyio
+async def test_get_rates_snapshot_hit(service, rate_table_store):
+    # Arrange
+    rate_table_store.publish(RateTable.from_schema(
+        CurrencyConversionRatesSchema(rates={"USD": 1.0}), ttl_seconds=60))
+
+    # Act
+    result = await service.get_rates("USD")
+
+    # Assert
+    assert result.rates["USD"] == 1.0
+    service._ExchangeRatesService__cache.get_hash_fields.assert_not_awaited()
+    assert rate_table_store.hits == 1
+
+
+@pytest.mark.anyio
+async def test_get_rates_cache_hit(service, rate_table_store):
+    # Arrange
+    service._ExchangeRatesService__cache.get_hash_fields.return_value = [
+        b"2024-05-01:1714521600", b"1714521600.0"]
+    service._ExchangeRatesService__cache.get_hash.return_value = {
+        b"_version": b"2024-05-01:1714521600",
+        b"_base": b"EUR",
+        b"_date": b"2024-05-01",
+        b"_timestamp": b"1714521600",
+        b"USD": b"1.0"
+    }
+
+    # Act
+    result = await service.get_rates("USD")
+
+    # Assert
+    assert result.rates["USD"] == 1.0
+    assert rate_table_store.table.version == "2024-05-01:1714521600"
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_get_rates_expired_snapshot_same_version(service, rate_table_store):
+    # Arrange
+    conversion_rates = CurrencyConversionRatesSchema(
+        date="2024-05-01", timestamp=1714521600, rates={"USD": 1.0})
+    rate_table_store.publish(
+        RateTable.from_schema(conversion_rates, ttl_seconds=0))
+    service._ExchangeRatesService__cache.get_hash_fields.return_value = [
+        RateTable.version_of(conversion_rates).encode(), None]
+
+    # Act
+    result = await service.get_rates("USD")
+
+    # Assert
+    assert result.rates["USD"] == 1.0
+    service._ExchangeRatesService__cache.get_hash_fields.assert_awaited_once_with(
+        "eur-rates", "_version", "_refreshed_at")
+    service._ExchangeRatesService__cache.get_hash.assert_not_awaited()
+    assert rate_table_store.revalidations == 1
+    assert not rate_table_store.table.is_expired()
+
+
+@pytest.mark.anyio
+async def test_get_rates_cache_miss(service, rate_table_store):
+    # Arrange
+    service._ExchangeRatesService__cache.get_hash_fields.return_value = [
+        None, None]
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.return_value = CurrencyConversionRatesSchema(
+        rates={"USD": 1.0}
+    )
+
+    # Act
+    result = await service.get_rates("USD")
+
+    # Assert
+    assert result.rates["USD"] == 1.0
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.assert_awaited_once()
+    service._ExchangeRatesService__cache.set_hash.assert_awaited_once()
+    service._ExchangeRatesService__cache.release_lock.assert_awaited_once()
+    mapping = service._ExchangeRatesService__cache.set_hash.call_args.kwargs["mapping"]
+    assert mapping["_version"] == "None:None"
+    assert mapping["USD"] == 1.0
+    assert rate_table_store.refreshes == 1
+
+
+@pytest.mark.anyio
+async def test_get_rates_waits_for_worker_holding_lock(service):
+    # Arrange
+    cache = service._ExchangeRatesService__cache
+    cache.acquire_lock.return_value = None
+    cache.get_hash_fields.side_effect = [
+        [None, None], [b"2024-05-01:1714521600", None]]
+    cache.get_hash.return_value = {
+        b"_version": b"2024-05-01:1714521600", b"USD": b"1.0"}
+
+    # Act
+    result = await service.get_rates("USD")
+
+    # Assert
+    assert result.rates["USD"] == 1.0
+    cache.release_lock.assert_not_awaited()
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_get_rates_fetches_when_lock_holder_gives_up(service):
+    # Arrange
+    cache = service._ExchangeRatesService__cache
+    cache.acquire_lock.return_value = None
+    cache.get_hash_fields.return_value = [None, None]
+    cache.is_locked.return_value = False
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.return_value = CurrencyConversionRatesSchema(
+        rates={"USD": 1.0}
+    )
+
+    # Act
+    result = await service.get_rates("USD")
+
+    # Assert
+    assert result.rates["USD"] == 1.0
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_get_rates_api_unavailable(service):
+    # Arrange
+    service._ExchangeRatesService__cache.get_hash_fields.return_value = [
+        None, None]
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.return_value = None
+
+    # Act and Assert
+    with pytest.raises(ExchangeRatesUnavailableException):
+        await service.get_rates("USD")
+
+
+@pytest.mark.anyio
+async def test_get_rates_unknown_currency(service, rate_table_store):
+    # Arrange
+    rate_table_store.publish(RateTable.from_schema(
+        CurrencyConversionRatesSchema(rates={"USD": 1.0}), ttl_seconds=60))
+
+    # Act and Assert
+    with pytest.raises(CurrencyCodeDoesntExistException):
+        await service.get_rates("USD", "ZZZ")
+
+
+@pytest.mark.anyio
+async def test_get_cross_rates_per_pair(service, rate_table_store):
+    # Arrange
+    rate_table_store.publish(RateTable.from_schema(
+        CurrencyConversionRatesSchema(rates={"USD": 1.0, "BRL": 5.0, "XXX": 0.0}),
+        ttl_seconds=60))
+
+    # Act
+    result = await service.get_cross_rates(
+        [("USD", "BRL"), ("USD", "ZZZ"), ("XXX", "USD")])
+
+    # Assert
+    assert result[("USD", "BRL")] == 5.0
+    assert isinstance(result[("USD", "ZZZ")], CurrencyCodeDoesntExistException)
+    assert isinstance(result[("XXX", "USD")], InvalidCurrencyException)
+    assert result[("XXX", "USD")].code == "XXX"
+    assert await service.get_cross_rate("BRL", "USD") == 0.2
+
+
+@pytest.mark.anyio
+async def test_get_rates_serves_stale_table_and_requests_refresh(service, rate_table_store):
+    # Arrange
+    rate_table_store.publish(RateTable.from_schema(
+        CurrencyConversionRatesSchema(rates={"USD": 1.0}), ttl_seconds=0))
+    trigger = Mock()
+    rate_table_store.set_refresh_trigger(trigger)
+    service._ExchangeRatesService__cache.get_hash_fields.return_value = [
+        None, None]
+
+    # Act
+    result = await service.get_rates("USD")
+
+    # Assert
+    assert result.rates["USD"] == 1.0
+    trigger.assert_called_once()
+    assert rate_table_store.stale_hits == 1
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_get_rates_serves_stale_table_while_circuit_is_open(service, rate_table_store):
+    # Arrange
+    rate_table_store.publish(RateTable.from_schema(
+        CurrencyConversionRatesSchema(rates={"USD": 1.0}), ttl_seconds=0))
+    service._ExchangeRatesService__cache.get_hash_fields.return_value = [
+        None, None]
+
+    # Act
+    with patch("app.services.exchange_rates_service.HttpCircuitBreaker") as MockBreaker:
+        MockBreaker.is_open.return_value = True
+        result = await service.get_rates("USD")
+
+    # Assert
+    assert result.rates["USD"] == 1.0
+    assert rate_table_store.stale_hits == 1
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_get_rates_serves_stale_table_when_api_unavailable(service, rate_table_store):
+    # Arrange
+    rate_table_store.publish(RateTable.from_schema(
+        CurrencyConversionRatesSchema(rates={"USD": 1.0}), ttl_seconds=0))
+    service._ExchangeRatesService__cache.get_hash_fields.return_value = [
+        None, None]
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.return_value = None
+
+    # Act
+    result = await service.get_rates("USD")
+
+    # Assert
+    assert result.rates["USD"] == 1.0
+    assert rate_table_store.stale_hits == 1
+
+
+@pytest.mark.anyio
+async def test_refresh_rates_skips_api_when_cache_recently_refreshed(service, rate_table_store):
+    # Arrange
+    service._ExchangeRatesService__cache.get_hash_fields.return_value = [
+        b"2024-05-01:1714521600", str(time()).encode()]
+    service._ExchangeRatesService__cache.get_hash.return_value = {
+        b"_version": b"2024-05-01:1714521600", b"USD": b"1.0"}
+
+    # Act
+    result = await service.refresh_rates()
+
+    # Assert
+    assert result.rates["USD"] == 1.0
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.assert_not_awaited()
+
+
+@pytest.mark.anyio
+async def test_refresh_rates_fetches_api_when_cache_is_old(service, rate_table_store):
+    # Arrange
+    service._ExchangeRatesService__cache.get_hash_fields.return_value = [
+        b"2024-05-01:1714521600", str(time() - 3600).encode()]
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.return_value = CurrencyConversionRatesSchema(
+        date="2024-05-02", timestamp=1714608000, rates={"USD": 1.1}
+    )
+
+    # Act
+    result = await service.refresh_rates()
+
+    # Assert
+    assert result.version == "2024-05-02:1714608000"
+    assert rate_table_store.table is result
+    service._ExchangeRatesService__exchange_rates_api_client.fetch_all_conversion_rates.assert_awaited_once()
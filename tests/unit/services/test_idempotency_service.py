@@ -0,0 +1,144 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from starlette.responses import JSONResponse
+
+from app.exceptions.idempotency_key_in_progress_exception import \
+    IdempotencyKeyInProgressException
+from app.exceptions.idempotency_key_reused_exception import \
+    IdempotencyKeyReusedException
+from app.services.idempotency_service import IdempotencyService
+
+KEY = "idempotency:test_user:key-1"
+
+
+@pytest.fixture
+def cache():
+    hashes = {}
+
+    async def set_hash(key, mapping, exp_seconds=None):
+        hashes[key] = {
+            field.encode(): value if isinstance(value, bytes)
+            else str(value).encode()
+            for field, value in mapping.items()
+        }
+        return True
+
+    cache = AsyncMock()
+    cache.hashes = hashes
+    cache.get_hash.side_effect = lambda key: hashes.get(key, {})
+    cache.set_hash.side_effect = set_hash
+    cache.acquire_lock.return_value = object()
+    return cache
+
+
+@pytest.fixture
+def service(cache):
+    with patch("app.services.idempotency_service.Settings") as MockSettings, \
+            patch("app.services.idempotency_service.Logger"):
+        MockSettings.IDEMPOTENCY_KEY_PREFIX = "idempotency"
+        MockSettings.IDEMPOTENCY_TTL_SECONDS = 60
+        MockSettings.IDEMPOTENCY_LOCK_TIMEOUT_SECONDS = 10
+        MockSettings.IDEMPOTENCY_WAIT_SECONDS = 0.05
+        MockSettings.IDEMPOTENCY_POLL_INTERVAL_SECONDS = 0.01
+        yield IdempotencyService(cache=cache)
+
+
+@pytest.mark.anyio
+async def test_run_replays_stored_response(service, cache):
+    # Arrange
+    execute = AsyncMock(return_value=JSONResponse({"transaction_id": 1}))
+
+    # Act
+    first = await service.run("test_user", "key-1", "abc", execute)
+    second = await service.run("test_user", "key-1", "abc", execute)
+
+    # Assert
+    execute.assert_awaited_once()
+    assert second.body == first.body
+    assert second.media_type == "application/json"
+    assert second.headers[IdempotencyService.REPLAYED_HEADER] == "true"
+    assert IdempotencyService.REPLAYED_HEADER not in first.headers
+    cache.release_lock.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_run_key_reused_with_different_request(service, cache):
+    # Arrange
+    execute = AsyncMock(return_value=JSONResponse({"transaction_id": 1}))
+    await service.run("test_user", "key-1", "abc", execute)
+
+    # Act / Assert
+    with pytest.raises(IdempotencyKeyReusedException):
+        await service.run("test_user", "key-1", "def", execute)
+    execute.assert_awaited_once()
+
+
+@pytest.mark.anyio
+async def test_run_does_not_store_error_responses(service, cache):
+    # Arrange
+    execute = AsyncMock(return_value=JSONResponse({}, status_code=503))
+
+    # Act
+    await service.run("test_user", "key-1", "abc", execute)
+
+    # Assert
+    assert KEY not in cache.hashes
+
+
+@pytest.mark.anyio
+async def test_run_concurrent_duplicates_execute_once(service, cache):
+    # Arrange
+    async def execute():
+        await asyncio.sleep(0.01)
+        return JSONResponse({"transaction_id": 1})
+
+    execute = AsyncMock(side_effect=execute)
+
+    # Act
+    responses = await asyncio.gather(
+        *[service.run("test_user", "key-1", "abc", execute) for _ in range(5)])
+
+    # Assert
+    execute.assert_awaited_once()
+    assert {response.body for response in responses} == \
+        {b'{"transaction_id":1}'}
+
+
+@pytest.mark.anyio
+async def test_run_waits_for_request_in_another_worker(service, cache):
+    # Arrange
+    cache.acquire_lock.return_value = None
+    cache.is_locked.return_value = True
+    execute = AsyncMock()
+
+    async def other_worker():
+        await asyncio.sleep(0.02)
+        await cache.set_hash(KEY, {
+            "fingerprint": "abc",
+            "status_code": 200,
+            "media_type": "application/json",
+            "body": b'{"transaction_id":1}'
+        })
+
+    # Act
+    response, _ = await asyncio.gather(
+        service.run("test_user", "key-1", "abc", execute), other_worker())
+
+    # Assert
+    execute.assert_not_awaited()
+    assert response.body == b'{"transaction_id":1}'
+
+
+@pytest.mark.anyio
+async def test_run_request_in_another_worker_still_in_progress(service, cache):
+    # Arrange
+    cache.acquire_lock.return_value = None
+    cache.is_locked.return_value = True
+    execute = AsyncMock()
+
+    # Act / Assert
+    with pytest.raises(IdempotencyKeyInProgressException):
+        await service.run("test_user", "key-1", "abc", execute)
+    execute.assert_not_awaited()
@@ -0,0 +1,86 @@
+from datetime import date
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app.core.rate_history import HistoricalRates, RateHistoryStore
+from app.core.singleton import SingletonMeta
+from app.exceptions.currency_code_doesnt_exist_exception import \
+    CurrencyCodeDoesntExistException
+from app.exceptions.historical_rates_not_found_exception import \
+    HistoricalRatesNotFoundException
+from app.schemas.currency_conversion_rates_schema import \
+    CurrencyConversionRatesSchema
+from app.services.rate_history_service import RateHistoryService
+
+
+@pytest.fixture
+def repository():
+    with patch(
+        "app.services.rate_history_service.ExchangeRatesHistoryRepository"
+    ) as MockRepository:
+        MockRepository.return_value = AsyncMock()
+        MockRepository.return_value.get_rates_since.return_value = []
+        yield MockRepository.return_value
+
+
+@pytest.fixture
+def store():
+    SingletonMeta._instances.pop(RateHistoryStore, None)
+    yield RateHistoryStore()
+    SingletonMeta._instances.pop(RateHistoryStore, None)
+
+
+@pytest.fixture
+def service(repository, store):
+    with patch("app.services.rate_history_service.Settings") as MockSettings, \
+            patch("app.services.rate_history_service.Logger"):
+        MockSettings.RATE_HISTORY_SYNC_INTERVAL_SECONDS = 60
+        yield RateHistoryService(database=MagicMock(), rate_history_store=store)
+
+
+@pytest.mark.anyio
+async def test_record_rates_saves_packed_rates(service, repository, store):
+    # Act
+    await service.record_rates(CurrencyConversionRatesSchema(
+        timestamp=1714521600, date="2024-05-01", rates={"USD": 1.25, "BRL": 5.0}))
+
+    # Assert
+    saved = repository.save_rates.call_args.kwargs
+    assert saved["date"] == date(2024, 5, 1)
+    assert saved["codes"] == "USD,BRL"
+    assert saved["rates"] == HistoricalRates.pack([1.25, 5.0])
+    assert store.get_rates_on(date(2024, 5, 1)).version == "2024-05-01:1714521600"
+
+
+@pytest.mark.anyio
+async def test_record_rates_skips_store_when_database_fails(service, repository, store):
+    # Arrange
+    repository.save_rates.side_effect = OperationalError("INSERT", {}, Exception())
+
+    # Act
+    await service.record_rates(CurrencyConversionRatesSchema(
+        date="2024-05-01", rates={"USD": 1.25}))
+
+    # Assert
+    assert store.latest_date is None
+
+
+@pytest.mark.anyio
+async def test_get_cross_rate_loads_history_from_database(service, repository):
+    # Arrange
+    repository.get_rates_since.return_value = [MagicMock(
+        date=date(2024, 5, 1), base="EUR", version="2024-05-01:0",
+        codes="USD,BRL", rates=HistoricalRates.pack([1.25, 5.0]))]
+
+    # Act
+    result = await service.get_cross_rate("USD", "BRL", date(2024, 5, 4))
+
+    # Assert
+    assert result == 4.0
+    with pytest.raises(CurrencyCodeDoesntExistException):
+        await service.get_cross_rate("USD", "ZZZ", date(2024, 5, 4))
+    with pytest.raises(HistoricalRatesNotFoundException):
+        await service.get_cross_rate("USD", "BRL", date(2024, 4, 30))
+    repository.get_rates_since.assert_awaited_once_with(None)